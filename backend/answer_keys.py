@@ -0,0 +1,85 @@
+"""Compiled quiz answer keys.
+
+A quiz document is compiled once into an ``AnswerKey``: question ids,
+correct option indexes, marks and the passing thresholds. Grading then
+turns the submitted answers into an index vector and compares it with the
+key, without touching the quiz document again. The same compile step also
+builds the public quiz payload, which has no answers in it.
+
+Questions are identified by their ``question_id`` or, for quizzes created
+before ids existed, by their position. Answers can be keyed by question id
+or by the question text the current frontend sends. Each answer can be the
+option text or the option index.
+
+A quiz without ``passing_marks`` passes at ``passing_score`` percent of its
+total marks, rounded up.
+"""
+from typing import List
+
+UNANSWERED = -1
+# Correct index for a question whose correct_answer is not among its options.
+# choices() only produces UNANSWERED or a valid index, so no answer can match it.
+NO_CORRECT_OPTION = -2
+
+
+class AnswerKey:
+    __slots__ = (
+        "quiz_id", "course_id", "question_ids", "positions", "option_indexes",
+        "correct", "marks", "total_marks", "passing_score", "passing_marks", "public",
+    )
+
+    def __init__(self, quiz: dict):
+        questions = quiz.get("questions", [])
+        self.quiz_id = quiz["quiz_id"]
+        self.course_id = quiz["course_id"]
+        self.question_ids = tuple(q.get("question_id") or str(i) for i, q in enumerate(questions))
+
+        self.positions = {}
+        for i, q in enumerate(questions):
+            self.positions[self.question_ids[i]] = i
+            self.positions.setdefault(q["question"], i)
+
+        self.option_indexes = tuple({option: j for j, option in enumerate(q.get("options", []))} for q in questions)
+        self.correct = tuple(
+            self.option_indexes[i].get(q.get("correct_answer"), NO_CORRECT_OPTION) for i, q in enumerate(questions)
+        )
+        self.marks = tuple(q.get("marks", 1) for q in questions)
+        self.total_marks = quiz.get("total_marks", sum(self.marks))
+        self.passing_score = quiz.get("passing_score", 60)
+        self.passing_marks = quiz.get("passing_marks")
+        if self.passing_marks is None:
+            self.passing_marks = -(-self.total_marks * self.passing_score // 100)
+
+        self.public = {k: v for k, v in quiz.items() if k != "questions"}
+        self.public["questions"] = [
+            {**{k: v for k, v in q.items() if k != "correct_answer"}, "question_id": self.question_ids[i]}
+            for i, q in enumerate(questions)
+        ]
+
+    def choices(self, answers: dict) -> List[int]:
+        """Index vector of the chosen options; -1 where a question wasn't answered or the answer isn't an option."""
+        chosen = [UNANSWERED] * len(self.correct)
+        for key, value in (answers or {}).items():
+            position = self.positions.get(key)
+            if position is None:
+                continue
+            if isinstance(value, int) and not isinstance(value, bool):
+                chosen[position] = value if 0 <= value < len(self.option_indexes[position]) else UNANSWERED
+            else:
+                chosen[position] = self.option_indexes[position].get(value, UNANSWERED)
+        return chosen
+
+    def grade(self, answers: dict) -> dict:
+        hits = [c == k for c, k in zip(self.choices(answers), self.correct)]
+        correct_answers = sum(hits)
+        total_questions = len(self.correct)
+        return {
+            "correct_answers": correct_answers,
+            "total_questions": total_questions,
+            "score": (correct_answers * 100) // total_questions if total_questions > 0 else 0,
+            "marks": sum(m for m, hit in zip(self.marks, hits) if hit)
+        }
+
+
+def compile_quiz(quiz: dict) -> AnswerKey:
+    return AnswerKey(quiz)
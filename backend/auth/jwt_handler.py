@@ -1,11 +1,15 @@
 from jose import JWTError, jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 import os
+import time
+
+from auth.token_cache import token_cache
 
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "edubridge-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 15
+REVOKED_TOKENS = "revoked_tokens"
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -17,9 +21,51 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[dict]:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+def _get_db(db):
+    if db is not None:
+        return db
+    from database import get_db
+    return get_db()
+
+async def verify_token(token: str, db=None) -> Optional[dict]:
+    """Claims of a valid, unrevoked ``token``, or None.
+
+    A cached token skips the decode and, until its revocation check is due,
+    the ``revoked_tokens`` lookup as well.
+    """
+    key = token_cache.digest(token)
+    if token_cache.is_revoked(key):
+        return None
+    payload = token_cache.get(key)
+    if payload is not None and not token_cache.revocation_check_due(key):
         return payload
-    except JWTError:
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+    if await _get_db(db)[REVOKED_TOKENS].find_one({"_id": key.hex()}, {"_id": 1}):
+        expires_at = payload.get("exp")
+        token_cache.revoke_key(key, expires_at if isinstance(expires_at, (int, float)) else None)
         return None
+    token_cache.set(key, payload)
+    return payload
+
+async def revoke_token(token: str, db=None):
+    """Stop accepting ``token`` on every worker until it expires.
+
+    The ``revoked_tokens`` TTL index drops the record at the token's ``exp``.
+    """
+    try:
+        expires_at = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return
+    if not isinstance(expires_at, (int, float)):
+        expires_at = None
+    token_cache.revoke(token, expires_at)
+    ttl_at = expires_at if expires_at is not None else time.time() + 86400 * 30
+    await _get_db(db)[REVOKED_TOKENS].update_one(
+        {"_id": token_cache.digest(token).hex()},
+        {"$set": {"expires_at": datetime.fromtimestamp(ttl_at, timezone.utc)}},
+        upsert=True
+    )
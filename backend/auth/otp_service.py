@@ -1,41 +1,174 @@
+"""One-time passwords for parent login.
+
+Where OTPs live is chosen by OTP_STORE:
+
+    memory   process-local dict (default). A background sweeper drops expired
+             entries every OTP_SWEEP_INTERVAL_SECONDS (default 60) and the
+             dict never holds more than OTP_MAX_ENTRIES (default 100000);
+             the oldest OTP is evicted first. Only correct with one worker.
+    mongo    the ``otp_codes`` collection, shared by every worker. A TTL
+             index on ``expires_at`` removes expired codes and attempts are
+             counted with one atomic ``find_one_and_update``.
+
+OTP_TTL_SECONDS (default 300) and OTP_MAX_ATTEMPTS (default 3) apply to both.
+"""
+import asyncio
+import logging
+import os
 import random
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 
-class OTPService:
-    def __init__(self):
-        self.otp_store = {}
-    
-    def generate_otp(self, mobile: str) -> str:
-        otp = str(random.randint(100000, 999999))
-        expires_at = datetime.utcnow() + timedelta(minutes=5)
-        self.otp_store[mobile] = {
-            'otp': otp,
-            'expires_at': expires_at,
-            'attempts': 0
-        }
-        return otp
-    
-    def verify_otp(self, mobile: str, otp: str) -> bool:
-        if mobile not in self.otp_store:
-            return False
-        
-        stored = self.otp_store[mobile]
-        
-        if datetime.utcnow() > stored['expires_at']:
-            del self.otp_store[mobile]
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+OTP_TTL_SECONDS = int(os.environ.get("OTP_TTL_SECONDS", "300"))
+OTP_MAX_ATTEMPTS = int(os.environ.get("OTP_MAX_ATTEMPTS", "3"))
+
+
+class MemoryOTPStore:
+    def __init__(self, max_entries: int = 100000, sweep_interval_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._entries = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.evicted = 0
+        self.expired = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            self.sweep()
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        stale = [mobile for mobile, entry in self._entries.items() if entry["expires_at"] <= now]
+        for mobile in stale:
+            del self._entries[mobile]
+        self.expired += len(stale)
+        return len(stale)
+
+    async def put(self, db, mobile: str, otp: str, ttl_seconds: int):
+        self._entries.pop(mobile, None)
+        self._entries[mobile] = {"otp": otp, "expires_at": time.monotonic() + ttl_seconds, "attempts": 0}
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    async def check(self, db, mobile: str, otp: str, max_attempts: int) -> bool:
+        entry = self._entries.get(mobile)
+        if entry is None:
             return False
-        
-        if stored['attempts'] >= 3:
-            del self.otp_store[mobile]
+        if time.monotonic() > entry["expires_at"] or entry["attempts"] >= max_attempts:
+            del self._entries[mobile]
             return False
-        
-        stored['attempts'] += 1
-        
-        if stored['otp'] == otp:
-            del self.otp_store[mobile]
+        entry["attempts"] += 1
+        if entry["otp"] == otp:
+            del self._entries[mobile]
             return True
-        
         return False
 
-otp_service = OTPService()
+    def stats(self) -> dict:
+        return {
+            "store": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+
+class MongoOTPStore:
+    collection = "otp_codes"
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def put(self, db, mobile: str, otp: str, ttl_seconds: int):
+        await db[self.collection].update_one(
+            {"mobile": mobile},
+            {"$set": {
+                "otp": otp,
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds),
+                "attempts": 0
+            }},
+            upsert=True
+        )
+
+    async def check(self, db, mobile: str, otp: str, max_attempts: int) -> bool:
+        # Claiming an attempt is atomic, so concurrent guesses on other workers
+        # can't get more than max_attempts comparisons between them.
+        entry = await db[self.collection].find_one_and_update(
+            {"mobile": mobile, "expires_at": {"$gt": datetime.utcnow()}, "attempts": {"$lt": max_attempts}},
+            {"$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if entry is None:
+            return False
+        if entry["otp"] == otp:
+            # Single use: only the request that deletes the code logs in.
+            result = await db[self.collection].delete_one({"_id": entry["_id"], "otp": otp})
+            return result.deleted_count == 1
+        if entry["attempts"] >= max_attempts:
+            await db[self.collection].delete_one({"_id": entry["_id"], "attempts": {"$gte": max_attempts}})
+        return False
+
+    def stats(self) -> dict:
+        return {"store": "mongo"}
+
+
+def make_store(kind: str):
+    if kind == "mongo":
+        return MongoOTPStore()
+    if kind != "memory":
+        logger.warning("Unknown OTP_STORE %r, using the in-memory store", kind)
+    return MemoryOTPStore(
+        max_entries=int(os.environ.get("OTP_MAX_ENTRIES", "100000")),
+        sweep_interval_seconds=float(os.environ.get("OTP_SWEEP_INTERVAL_SECONDS", "60")),
+    )
+
+
+class OTPService:
+    def __init__(self, store=None, ttl_seconds: int = OTP_TTL_SECONDS, max_attempts: int = OTP_MAX_ATTEMPTS):
+        self.store = store if store is not None else MemoryOTPStore()
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+
+    async def generate_otp(self, db, mobile: str) -> str:
+        otp = str(random.randint(100000, 999999))
+        await self.store.put(db, mobile, otp, self.ttl_seconds)
+        return otp
+
+    async def verify_otp(self, db, mobile: str, otp: str) -> bool:
+        return await self.store.check(db, mobile, otp, self.max_attempts)
+
+    def start(self):
+        self.store.start()
+
+    async def stop(self):
+        await self.store.stop()
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+otp_service = OTPService(make_store(os.environ.get("OTP_STORE", "memory")))
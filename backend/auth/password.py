@@ -1,9 +1,141 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import bcrypt
+from fastapi import HTTPException
+
+# Work factor for new hashes. Pick it per host with `python -m auth.password calibrate`.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
 
-def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """The cost stored in a modular-crypt bcrypt hash ("$2b$12$...")."""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed_password: str) -> bool:
+    return hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+
+class HashingPool:
+    """Runs bcrypt off the event loop on a small dedicated thread pool.
+
+    bcrypt releases the GIL, so ``workers`` hashes run in parallel while the
+    loop keeps serving other requests. At most ``queue_limit`` further calls
+    may wait for a worker. Past that, callers get an immediate 503 instead
+    of queueing behind a login storm.
+    """
+
+    def __init__(self, workers: int = 4, queue_limit: int = 32, enabled: bool = True):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.enabled = enabled
+        self._executor = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if not self.enabled:
+            return fn(*args)
+        if self.in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins right now, please retry",
+                headers={"Retry-After": "1"}
+            )
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+hashing_pool = HashingPool(
+    workers=int(os.environ.get("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    queue_limit=int(os.environ.get("BCRYPT_QUEUE_LIMIT", "32")),
+    enabled=os.environ.get("BCRYPT_OFFLOAD", "1") == "1",
+)
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+async def rehash_if_needed(plain_password: str, hashed_password: str) -> Optional[str]:
+    """After a successful login, a new hash at the configured cost if the stored one differs.
+
+    Returns None when no rehash is needed, or when the pool is saturated. The
+    login itself must never fail because of a rehash; it is retried on a
+    later login.
+    """
+    if not needs_rehash(hashed_password):
+        return None
+    try:
+        return await hash_password_async(plain_password)
+    except HTTPException:
+        return None
+
+
+def calibrate(target_ms: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> dict:
+    """Time bcrypt on this host and pick the highest cost whose hash time stays within ``target_ms``."""
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        salt = bcrypt.gensalt(rounds)
+        best = None
+        for _ in range(samples):
+            started = time.perf_counter()
+            bcrypt.hashpw(b"calibration-password", salt)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings[rounds] = round(best, 1)
+        if best > target_ms:
+            break
+        chosen = rounds
+    return {"target_ms": target_ms, "rounds": chosen, "timings_ms": timings}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost for this host")
+    parser.add_argument("command", choices=["calibrate"])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="longest acceptable time for one hash")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+
+    result = calibrate(args.target_ms, args.min_rounds, args.max_rounds)
+    print(json.dumps(result, indent=2))
+    print("BCRYPT_ROUNDS=%d" % result["rounds"])
@@ -0,0 +1,77 @@
+import copy
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class PrincipalCache:
+    """Bounded TTL cache of authenticated student documents, keyed by student_id.
+
+    Saves the students.find_one that get_current_student would otherwise run on
+    every request. Anything that writes to a student document must call
+    invalidate() so this worker stops serving the old copy; other workers
+    catch up within the TTL.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 30.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, student_id: str) -> Optional[dict]:
+        if not self.enabled or not student_id:
+            return None
+        entry = self._entries.get(student_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, student = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[student_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(student_id)
+        self.hits += 1
+        # Handlers add keys to the principal and may mutate nested values, so never hand out the cached dict itself.
+        return copy.deepcopy(student)
+
+    def set(self, student_id: str, student: dict):
+        if not self.enabled or not student_id:
+            return
+        self._entries[student_id] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(student))
+        self._entries.move_to_end(student_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, student_id: str):
+        if self._entries.pop(student_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+principal_cache = PrincipalCache(
+    max_entries=int(os.environ.get("PRINCIPAL_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", "30")),
+    enabled=os.environ.get("PRINCIPAL_CACHE_ENABLED", "1") == "1",
+)
@@ -0,0 +1,125 @@
+import hashlib
+import heapq
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class TokenCache:
+    """Bounded LRU of verified JWTs, keyed by the SHA-256 of the token.
+
+    verify_token checks here before running a full HS256 decode. An entry is
+    served until the token's own ``exp`` and never longer, so a cached token
+    expires exactly when a decoded one would. Tokens without ``exp`` are not
+    cached.
+
+    Revocations are stored in the ``revoked_tokens`` collection (see
+    jwt_handler), so every worker sees them. A decoded token is checked
+    against it before it is cached, and a cached one again once its last
+    check is ``revocation_check_seconds`` old. revoke() also refuses the
+    token on this worker at once, until it would have expired anyway.
+    Those local revocations are pruned in expiry order.
+    """
+
+    def __init__(self, max_entries: int = 10000, enabled: bool = True, revocation_check_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.revocation_check_seconds = revocation_check_seconds
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self._revoked_by_expiry = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revocations = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def is_revoked(self, key: bytes) -> bool:
+        expires_at = self._revoked.get(key)
+        if expires_at is None:
+            return False
+        if time.time() >= expires_at:
+            del self._revoked[key]
+            return False
+        return True
+
+    def get(self, key: bytes) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, claims, _ = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(claims)
+
+    def revocation_check_due(self, key: bytes) -> bool:
+        """True unless ``key`` is cached and was checked for revocation recently."""
+        entry = self._entries.get(key)
+        return entry is None or time.time() - entry[2] >= self.revocation_check_seconds
+
+    def set(self, key: bytes, claims: dict):
+        expires_at = claims.get("exp")
+        if not self.enabled or not isinstance(expires_at, (int, float)):
+            return
+        self._entries[key] = (expires_at, dict(claims), time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def revoke(self, token: str, expires_at: Optional[float] = None):
+        """Refuse ``token`` on this worker from now on.
+
+        ``expires_at`` defaults to the cached ``exp``, or to 30 days (twice the
+        token lifetime) when the token isn't cached.
+        """
+        self.revoke_key(self.digest(token), expires_at)
+
+    def revoke_key(self, key: bytes, expires_at: Optional[float] = None):
+        entry = self._entries.pop(key, None)
+        if expires_at is None:
+            expires_at = entry[0] if entry else time.time() + 86400 * 30
+        self._revoked[key] = expires_at
+        heapq.heappush(self._revoked_by_expiry, (expires_at, key))
+        self.revocations += 1
+        now = time.time()
+        # Revoked tokens past their exp would be rejected anyway.
+        while self._revoked_by_expiry and self._revoked_by_expiry[0][0] <= now:
+            expired_at, expired = heapq.heappop(self._revoked_by_expiry)
+            if self._revoked.get(expired) == expired_at:
+                del self._revoked[expired]
+
+    def clear(self):
+        self._entries.clear()
+        self._revoked.clear()
+        self._revoked_by_expiry.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "revoked": len(self._revoked),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "revocations": self.revocations,
+        }
+
+token_cache = TokenCache(
+    max_entries=int(os.environ.get("TOKEN_CACHE_MAX_ENTRIES", "10000")),
+    enabled=os.environ.get("TOKEN_CACHE_ENABLED", "1") == "1",
+    revocation_check_seconds=float(os.environ.get("TOKEN_REVOCATION_CHECK_SECONDS", "30")),
+)
@@ -0,0 +1,173 @@
+"""Set-based badge awarding.
+
+Badge ``criteria`` documents are compiled once into predicates over the
+student's stats. A passed quiz then costs at most two queries however large
+the catalog is: one to read which qualifying badges the student already
+holds, and one bulk insert for the rest.
+
+Each worker keeps the compiled rules. Writes to ``badges`` must call
+``bump_version``, which drops this worker's copy and increments a stamp in
+``catalog_meta``; other workers read the stamp at most every
+BADGE_VERSION_CHECK_SECONDS (default 5) and reload when it moves. The rules
+are also reloaded every BADGE_RULES_TTL_SECONDS (default 300) to pick up
+direct edits to the collection.
+
+New criteria types register a predicate factory:
+
+    @criterion("streak")
+    def _streak(threshold):
+        return lambda stats: stats.get("streak", 0) >= threshold
+"""
+from datetime import datetime, timezone
+from pymongo.errors import BulkWriteError
+from typing import Callable, Dict, List
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+META_ID = "badge_rules"
+
+CRITERIA: Dict[str, Callable] = {}
+
+
+def criterion(name: str):
+    def register(factory):
+        CRITERIA[name] = factory
+        return factory
+    return register
+
+
+@criterion("credits")
+def _credits(threshold):
+    return lambda stats: stats.get("total_credits", 0) >= threshold
+
+
+@criterion("level")
+def _level(threshold):
+    return lambda stats: stats.get("level", 1) >= threshold
+
+
+def compile_badges(badges: List[dict]) -> List[tuple]:
+    """Turn badge documents into (badge_id, predicate) pairs, skipping unknown criteria."""
+    rules = []
+    for badge in badges:
+        criteria = badge.get("criteria") or {}
+        factory = CRITERIA.get(criteria.get("type"))
+        if factory is None:
+            logger.warning("Badge %s has unsupported criteria %r", badge.get("badge_id"), criteria)
+            continue
+        rules.append((badge["badge_id"], factory(criteria.get("threshold", 0))))
+    return rules
+
+
+class BadgeEngine:
+    def __init__(self, ttl_seconds: float = 300.0, version_check_seconds: float = 5.0):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.invalidate()
+
+    def invalidate(self):
+        self._rules = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    async def _read_version(self, db) -> int:
+        meta = await db.catalog_meta.find_one({"_id": META_ID})
+        return meta.get("version", 0) if meta else 0
+
+    async def rules(self, db) -> List[tuple]:
+        now = time.monotonic()
+        if self._rules is not None and now - self._loaded_at < self.ttl_seconds:
+            if now - self._checked_at < self.version_check_seconds:
+                return self._rules
+            version = await self._read_version(db)
+            self._checked_at = now
+            if version == self._version:
+                return self._rules
+        else:
+            version = await self._read_version(db)
+
+        badges = await db.badges.find({}, {"_id": 0, "badge_id": 1, "criteria": 1}).to_list(None)
+        self._rules = compile_badges(badges)
+        self._version = version
+        self._loaded_at = self._checked_at = now
+        return self._rules
+
+    async def evaluate(self, db, stats: dict) -> List[str]:
+        return [badge_id for badge_id, qualifies in await self.rules(db) if qualifies(stats)]
+
+    async def award(self, db, student_id: str, stats: dict) -> List[str]:
+        """Insert every badge the student now qualifies for and does not hold yet.
+
+        Returns the badge ids awarded by this call. Safe to race: the unique
+        (student_id, badge_id) index turns a concurrent double award into a
+        duplicate-key error that is ignored.
+        """
+        return (await self.award_many(db, {student_id: stats})).get(student_id, [])
+
+    async def award_many(self, db, stats_by_student: Dict[str, dict]) -> Dict[str, List[str]]:
+        """Set-based award for several students: one read and one bulk insert in total."""
+        rules = await self.rules(db)
+        qualifying = {}
+        for student_id, stats in stats_by_student.items():
+            badge_ids = [badge_id for badge_id, qualifies in rules if qualifies(stats)]
+            if badge_ids:
+                qualifying[student_id] = badge_ids
+        if not qualifying:
+            return {}
+
+        candidate_ids = list({badge_id for badge_ids in qualifying.values() for badge_id in badge_ids})
+        held = set()
+        async for sb in db.student_badges.find(
+            {"student_id": {"$in": list(qualifying)}, "badge_id": {"$in": candidate_ids}},
+            {"_id": 0, "student_id": 1, "badge_id": 1}
+        ):
+            held.add((sb["student_id"], sb["badge_id"]))
+
+        earned_at = datetime.now(timezone.utc).isoformat()
+        docs = [{
+            "id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "badge_id": badge_id,
+            "earned_at": earned_at
+        } for student_id, badge_ids in qualifying.items()
+            for badge_id in badge_ids if (student_id, badge_id) not in held]
+        if not docs:
+            return {}
+
+        try:
+            await db.student_badges.insert_many(docs, ordered=False)
+            inserted = docs
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+            failed = {err["index"] for err in errors}
+            inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+
+        awarded = {}
+        for doc in inserted:
+            awarded.setdefault(doc["student_id"], []).append(doc["badge_id"])
+        return awarded
+
+
+async def bump_version(db):
+    """Call after any write to badges."""
+    badge_engine.invalidate()
+    await db.catalog_meta.update_one({"_id": META_ID}, {"$inc": {"version": 1}}, upsert=True)
+
+
+badge_engine = BadgeEngine(
+    ttl_seconds=float(os.environ.get("BADGE_RULES_TTL_SECONDS", "300")),
+    version_check_seconds=float(os.environ.get("BADGE_VERSION_CHECK_SECONDS", "5")),
+)
+
+
+async def check_and_award_badges(db, student_id: str, total_credits: int, level: int) -> List[str]:
+    return await badge_engine.award(db, student_id, {"total_credits": total_credits, "level": level})
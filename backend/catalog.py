@@ -0,0 +1,121 @@
+"""In-memory course catalog shared by the course and quiz read paths.
+
+Courses and quizzes change rarely, so each worker keeps the whole catalog
+indexed by course_id, standard and quiz_id, and hot reads don't touch Mongo.
+Freshness is kept by a version stamp stored in ``catalog_meta``:
+
+* writes go through ``bump_version``, which drops this worker's copy and
+  increments the stamp so other workers reload on their next check;
+* the stamp is read at most every CATALOG_VERSION_CHECK_SECONDS (default 5);
+* the catalog is reloaded every CATALOG_REFRESH_SECONDS (default 600) even if
+  the stamp hasn't moved, to pick up direct edits to the collections.
+
+Quizzes are compiled into answer keys and answer-free public payloads as
+they are loaded, so both are invalidated together with the catalog.
+"""
+from answer_keys import AnswerKey, compile_quiz
+from typing import List, Optional
+import asyncio
+import copy
+import os
+import time
+
+META_ID = "course_catalog"
+
+
+class CourseCatalog:
+    def __init__(self, refresh_seconds: float = 600.0, version_check_seconds: float = 5.0):
+        self.refresh_seconds = refresh_seconds
+        self.version_check_seconds = version_check_seconds
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.version = None
+        self.loaded_at = 0.0
+        self.checked_at = 0.0
+        self.courses_by_id = {}
+        self.courses_by_standard = {}
+        self.quizzes_by_course = {}
+        self.answer_keys = {}
+
+    def invalidate(self):
+        self._reset()
+
+    async def _read_version(self, db) -> int:
+        meta = await db.catalog_meta.find_one({"_id": META_ID})
+        return meta.get("version", 0) if meta else 0
+
+    async def _load(self, db, version: int):
+        courses = await db.courses.find({}, {"_id": 0}).to_list(None)
+        quizzes = await db.quizzes.find({}, {"_id": 0}).to_list(None)
+
+        by_standard = {}
+        for course in courses:
+            by_standard.setdefault(course.get("standard"), []).append(course)
+
+        self.courses_by_id = {c["course_id"]: c for c in courses}
+        self.courses_by_standard = by_standard
+        self.quizzes_by_course = {}
+        for quiz in quizzes:
+            # Keep the first quiz per course, matching find_one({"course_id": ...}).
+            self.quizzes_by_course.setdefault(quiz["course_id"], quiz)
+        self.answer_keys = {q["quiz_id"]: compile_quiz(q) for q in quizzes}
+        self.version = version
+        self.loaded_at = self.checked_at = time.monotonic()
+
+    async def ensure_fresh(self, db):
+        now = time.monotonic()
+        if self.version is not None and now - self.checked_at < self.version_check_seconds \
+                and now - self.loaded_at < self.refresh_seconds:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self.version is not None and now - self.checked_at < self.version_check_seconds \
+                    and now - self.loaded_at < self.refresh_seconds:
+                return
+            version = await self._read_version(db)
+            if version != self.version or now - self.loaded_at >= self.refresh_seconds:
+                await self._load(db, version)
+            else:
+                self.checked_at = now
+
+    async def get_course(self, db, course_id: str) -> Optional[dict]:
+        await self.ensure_fresh(db)
+        course = self.courses_by_id.get(course_id)
+        # Copies all the way down: callers add and edit fields on what they get back.
+        return copy.deepcopy(course) if course else None
+
+    async def courses_for_standard(self, db, standard: str) -> List[dict]:
+        await self.ensure_fresh(db)
+        return copy.deepcopy(self.courses_by_standard.get(standard, []))
+
+    async def count(self, db) -> int:
+        await self.ensure_fresh(db)
+        return len(self.courses_by_id)
+
+    async def count_for_standard(self, db, standard: str) -> int:
+        await self.ensure_fresh(db)
+        return len(self.courses_by_standard.get(standard, []))
+
+    async def get_answer_key(self, db, quiz_id: str) -> Optional[AnswerKey]:
+        await self.ensure_fresh(db)
+        return self.answer_keys.get(quiz_id)
+
+    async def get_public_quiz(self, db, course_id: str) -> Optional[dict]:
+        """The quiz a student sees: question ids and options, no answers."""
+        await self.ensure_fresh(db)
+        quiz = self.quizzes_by_course.get(course_id)
+        return copy.deepcopy(self.answer_keys[quiz["quiz_id"]].public) if quiz else None
+
+
+async def bump_version(db):
+    """Call after any write to courses or quizzes."""
+    course_catalog.invalidate()
+    await db.catalog_meta.update_one({"_id": META_ID}, {"$inc": {"version": 1}}, upsert=True)
+
+
+course_catalog = CourseCatalog(
+    refresh_seconds=float(os.environ.get("CATALOG_REFRESH_SECONDS", "600")),
+    version_check_seconds=float(os.environ.get("CATALOG_VERSION_CHECK_SECONDS", "5")),
+)
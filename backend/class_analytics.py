@@ -0,0 +1,180 @@
+"""Precomputed class analytics for the teacher dashboard.
+
+For each institution the job reads its students' profiles and progress in
+bulk, then computes with pandas/NumPy:
+
+* per course: learners, video completion and quiz pass rates, the average
+  score and watch time, and a score histogram;
+* institution-wide: the score distribution and a credit histogram by level.
+
+One document per institution is stored in ``class_analytics``. The teacher
+endpoint only reads that document. Refreshes are incremental: only
+institutions with progress written since the last run are recomputed.
+The run watermark is kept in ``analytics_meta``. Run it from cron:
+
+    python class_analytics.py refresh          # institutions changed since the last run
+    python class_analytics.py refresh --all    # every institution with a teacher
+"""
+from datetime import datetime, timezone
+from typing import List, Optional
+import asyncio
+import logging
+
+from catalog import course_catalog
+from quiz_submission import CREDITS_PER_LEVEL
+
+logger = logging.getLogger(__name__)
+
+META_ID = "class_analytics"
+SCORE_BINS = list(range(0, 101, 10))
+
+
+async def _load(db, institution_id: str):
+    user_ids = await db.users.distinct("user_id", {"role": "student", "institution_id": institution_id})
+    students = await db.students.find(
+        {"user_id": {"$in": user_ids}},
+        {"_id": 0, "student_id": 1, "total_credits": 1}
+    ).to_list(None)
+    progress = await db.progress.find(
+        {"student_id": {"$in": [s["student_id"] for s in students]}},
+        {"_id": 0, "student_id": 1, "course_id": 1, "video_completed": 1, "quiz_completed": 1,
+         "quiz_passed": 1, "score": 1, "quiz_score": 1, "watch_duration": 1}
+    ).to_list(None)
+    return students, progress
+
+
+def _histogram(scores) -> List[int]:
+    import numpy as np
+    return [int(n) for n in np.histogram(scores, bins=SCORE_BINS)[0]]
+
+
+def compute(students: List[dict], progress: List[dict], courses: dict, total_marks: Optional[dict] = None) -> dict:
+    """Aggregate one institution's rows.
+
+    ``courses`` maps course_id to the course document and ``total_marks``
+    maps course_id to its quiz's total marks, used to turn v1 raw marks into
+    percentages.
+    """
+    # Imported here so that loading the teacher router doesn't pull in pandas.
+    import numpy as np
+    import pandas as pd
+
+    credits = np.array([s.get("total_credits", 0) or 0 for s in students], dtype=np.int64)
+    credit_counts = np.bincount(credits // CREDITS_PER_LEVEL) if len(credits) else np.array([], dtype=np.int64)
+
+    df = pd.DataFrame(progress, columns=[
+        "student_id", "course_id", "video_completed", "quiz_completed", "quiz_passed", "score", "quiz_score", "watch_duration"
+    ])
+    # v2 progress stores a percentage as score, v1 raw marks as quiz_score. v1 marks are
+    # scaled by the quiz's total; without a known total the score is left out.
+    totals = pd.to_numeric(df["course_id"].map(total_marks or {}), errors="coerce")
+    v1_percent = pd.to_numeric(df["quiz_score"], errors="coerce") * 100 / totals.where(totals > 0)
+    df["score"] = pd.to_numeric(df["score"], errors="coerce").fillna(v1_percent)
+    for flag in ("video_completed", "quiz_completed", "quiz_passed"):
+        df[flag] = df[flag].fillna(False).astype(bool)
+    df["watch_duration"] = pd.to_numeric(df["watch_duration"], errors="coerce").fillna(0)
+    attempted = df[df["quiz_completed"] & df["score"].notna()]
+
+    per_course = []
+    if len(df):
+        summary = df.groupby("course_id").agg(
+            learners=("student_id", "count"),
+            videos_completed=("video_completed", "sum"),
+            passed=("quiz_passed", "sum"),
+            avg_watch_minutes=("watch_duration", "mean"),
+        )
+        avg_scores = attempted.groupby("course_id")["score"].mean()
+        for course_id, row in summary.iterrows():
+            course = courses.get(course_id) or {}
+            scores = attempted.loc[attempted["course_id"] == course_id, "score"].to_numpy()
+            per_course.append({
+                "course_id": course_id,
+                "title": course.get("title", "Unknown Course"),
+                "subject": course.get("subject", ""),
+                "learners": int(row["learners"]),
+                "video_completion_rate": round(float(row["videos_completed"] / row["learners"]), 3),
+                "completion_rate": round(float(row["passed"] / row["learners"]), 3),
+                "avg_score": round(float(avg_scores[course_id]), 1) if course_id in avg_scores.index else None,
+                "avg_watch_minutes": round(float(row["avg_watch_minutes"]), 1),
+                "score_histogram": _histogram(scores)
+            })
+
+    return {
+        "students": len(students),
+        "active_students": int((credits > 0).sum()),
+        "courses": per_course,
+        "score_distribution": {"bins": [int(b) for b in SCORE_BINS], "counts": _histogram(attempted["score"].to_numpy())},
+        "credit_histogram": {"bucket_size": CREDITS_PER_LEVEL, "counts": [int(n) for n in credit_counts]}
+    }
+
+
+async def refresh_institution(db, institution_id: str) -> dict:
+    students, progress = await _load(db, institution_id)
+    await course_catalog.ensure_fresh(db)
+    total_marks = {
+        course_id: course_catalog.answer_keys[quiz["quiz_id"]].total_marks
+        for course_id, quiz in course_catalog.quizzes_by_course.items()
+    }
+    # pandas work is CPU-bound; keep it off the event loop that serves requests.
+    stats = await asyncio.get_running_loop().run_in_executor(
+        None, compute, students, progress, course_catalog.courses_by_id, total_marks
+    )
+    doc = {
+        "institution_id": institution_id,
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+        **stats
+    }
+    await db.class_analytics.replace_one({"institution_id": institution_id}, doc, upsert=True)
+    doc.pop("_id", None)
+    return doc
+
+
+async def changed_institutions(db, since: str) -> List[str]:
+    """Institutions whose students have progress written after ``since``."""
+    student_ids = await db.progress.distinct(
+        "student_id", {"$or": [{"updated_at": {"$gt": since}}, {"last_accessed": {"$gt": since}}]}
+    )
+    if not student_ids:
+        return []
+    user_ids = await db.students.distinct("user_id", {"student_id": {"$in": student_ids}})
+    return await db.users.distinct("institution_id", {"role": "student", "user_id": {"$in": user_ids}})
+
+
+async def refresh(db, full: bool = False) -> List[str]:
+    """Recompute changed institutions (or all of them) and advance the watermark."""
+    started = datetime.now(timezone.utc).isoformat()
+    meta: Optional[dict] = await db.analytics_meta.find_one({"_id": META_ID})
+    if full or not meta:
+        institutions = await db.users.distinct("institution_id", {"role": "teacher"})
+    else:
+        institutions = await changed_institutions(db, meta["last_run"])
+
+    for institution_id in institutions:
+        await refresh_institution(db, institution_id)
+    # The watermark is the start time, so writes made during the run are picked up next time.
+    await db.analytics_meta.update_one({"_id": META_ID}, {"$set": {"last_run": started}}, upsert=True)
+    logger.info("Refreshed class analytics for %d institution(s)", len(institutions))
+    return institutions
+
+
+async def _main(full: bool):
+    from dotenv import load_dotenv
+    from pathlib import Path
+    import database
+
+    load_dotenv(Path(__file__).parent / '.env')
+    db = database.connect()
+    try:
+        refreshed = await refresh(db, full=full)
+    finally:
+        database.close()
+    print("Refreshed %d institution(s)" % len(refreshed))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recompute precomputed class analytics")
+    parser.add_argument("command", choices=["refresh"])
+    parser.add_argument("--all", action="store_true", help="recompute every institution, not just changed ones")
+    asyncio.run(_main(parser.parse_args().all))
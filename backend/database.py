@@ -0,0 +1,181 @@
+"""Shared MongoDB connection for the API.
+
+One AsyncIOMotorClient per worker process, opened and closed by the FastAPI
+lifespan. Routers get the database through the ``get_db`` dependency instead
+of building their own clients at import time.
+
+Pool settings come from the environment:
+
+    MONGO_MAX_POOL_SIZE                  max sockets per mongod (default 50)
+    MONGO_MIN_POOL_SIZE                  connections kept warm (default 5)
+    MONGO_MAX_IDLE_TIME_MS               close idle sockets after (default 60000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS    fail fast when mongod is down (default 5000)
+    MONGO_ENSURE_INDEXES                 apply the index manifest on startup (default 1)
+
+The client also reports command latencies and pool check-out waits to
+metrics.py, served at /api/metrics.
+
+The lifespan also runs the video heartbeat flusher (see heartbeat_buffer.py)
+and drains it before the client is closed, and the OTP store's sweeper
+(see auth/otp_service.py).
+"""
+from contextlib import asynccontextmanager
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from typing import Optional
+import logging
+import os
+
+import query_budget
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so the pool can be sized per worker."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.pools = {}
+
+    def _pool(self, address):
+        key = "%s:%s" % address
+        if key not in self.pools:
+            self.pools[key] = {
+                "created": 0,
+                "closed": 0,
+                "checked_out": 0,
+                "checked_in": 0,
+                "checkout_failed": 0,
+                "cleared": 0,
+            }
+        return self.pools[key]
+
+    def pool_created(self, event):
+        self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._pool(event.address)["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._pool(event.address)["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._pool(event.address)["checkout_failed"] += 1
+
+    def connection_checked_out(self, event):
+        self._pool(event.address)["checked_out"] += 1
+
+    def connection_checked_in(self, event):
+        self._pool(event.address)["checked_in"] += 1
+
+    def snapshot(self) -> dict:
+        servers = {}
+        for address, counts in self.pools.items():
+            open_connections = counts["created"] - counts["closed"]
+            in_use = counts["checked_out"] - counts["checked_in"]
+            servers[address] = {
+                **counts,
+                "open": open_connections,
+                "in_use": in_use,
+                "idle": max(0, open_connections - in_use),
+            }
+        return servers
+
+
+pool_stats = PoolStatsListener()
+
+_client: Optional[AsyncIOMotorClient] = None
+_db: Optional[AsyncIOMotorDatabase] = None
+
+
+def pool_options() -> dict:
+    return {
+        "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "5")),
+        "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "60000")),
+        "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    }
+
+
+def connect() -> AsyncIOMotorDatabase:
+    global _client, _db
+    if _db is None:
+        from metrics import command_metrics, pool_wait_metrics
+        _client = AsyncIOMotorClient(
+            os.environ['MONGO_URL'],
+            event_listeners=[pool_stats, command_metrics, pool_wait_metrics],
+            **pool_options()
+        )
+        _db = _client[os.environ['DB_NAME']]
+    return _db
+
+
+def close():
+    global _client, _db
+    if _client is not None:
+        _client.close()
+    _client = None
+    _db = None
+
+
+def get_db() -> AsyncIOMotorDatabase:
+    if _db is None:
+        raise RuntimeError("Database is not connected; the app lifespan has not started")
+    if query_budget.mode != "off":
+        return query_budget.trace(_db)
+    return _db
+
+
+def get_pool_stats() -> dict:
+    return {
+        "options": pool_options(),
+        "connected": _client is not None,
+        "servers": pool_stats.snapshot(),
+    }
+
+
+@asynccontextmanager
+async def lifespan(app):
+    db = connect()
+    try:
+        # Opens the first sockets; minPoolSize keeps the rest warm in the background.
+        await db.command("ping")
+    except Exception as e:
+        logger.warning("MongoDB warm-up ping failed: %s", e)
+    if os.environ.get("MONGO_ENSURE_INDEXES", "1") == "1":
+        from indexes import ensure_indexes
+        try:
+            await ensure_indexes(db)
+        except Exception as e:
+            logger.warning("Index bootstrap failed: %s", e)
+    from heartbeat_buffer import heartbeat_buffer
+    heartbeat_buffer.start(db)
+    from auth.otp_service import otp_service
+    otp_service.start()
+    try:
+        yield
+    finally:
+        await otp_service.stop()
+        try:
+            await heartbeat_buffer.stop()
+        except Exception as e:
+            logger.warning("Heartbeat buffer drain failed: %s", e)
+        close()
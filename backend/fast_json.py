@@ -0,0 +1,61 @@
+"""Opt-in fast path for list responses.
+
+With ``response_model=List[Model]``, FastAPI validates every row of a list
+endpoint through Pydantic and then serializes it with the stdlib encoder.
+The rows are already plain dicts from a Mongo projection. With
+FAST_JSON_RESPONSES=1, list endpoints return those dicts encoded straight
+to bytes with orjson instead. Each row is still cut down to the fields of
+the endpoint's response model, so extra Mongo fields never leak. Types are
+then enforced where documents are written (the create endpoints and seed
+scripts validate through the models) and in the tests, which check the fast
+output against the response models.
+
+orjson is optional. Without it the fast path falls back to a compact
+stdlib encoding, which still skips the per-row validation.
+"""
+from fastapi import Response
+from pydantic import BaseModel
+from typing import Optional, Type
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only where orjson isn't installed
+    orjson = None
+
+enabled = os.environ.get("FAST_JSON_RESPONSES", "0") == "1"
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=str, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def project(rows: list, model: Type[BaseModel]) -> list:
+    """Keep only ``model``'s fields, as response_model filtering would."""
+    fields = tuple(model.model_fields)
+    return [{field: row[field] for field in fields if field in row} for row in rows]
+
+
+def list_response(rows: list, response: Optional[Response] = None, model: Optional[Type[BaseModel]] = None):
+    """``rows`` as-is for the validated path, or pre-encoded when the fast path is on.
+
+    Pass the endpoint's response model as ``model`` so the fast path drops
+    the same fields FastAPI would. Headers already set on the injected
+    ``response`` (e.g. X-Next-Cursor) are carried over, since FastAPI drops
+    them when a Response is returned directly.
+    """
+    if not enabled:
+        return rows
+    if model is not None:
+        rows = project(rows, model)
+    return FastJSONResponse(rows, headers=dict(response.headers) if response is not None else None)
@@ -0,0 +1,178 @@
+"""Write-behind buffer for video watch-progress heartbeats.
+
+The player reports watch progress every few seconds. Writing each report
+straight to Mongo made these upserts the largest share of peak-hour write
+load. Instead, each worker keeps only the latest ``watch_duration`` per
+(student, course) in memory and flushes all of them with one unordered
+``bulk_write``:
+
+* at most every HEARTBEAT_FLUSH_INTERVAL_SECONDS (default 5);
+* as soon as the oldest unflushed heartbeat is HEARTBEAT_MAX_LOSS_SECONDS old
+  (default 15). That bounds what a crashed worker can lose;
+* as soon as HEARTBEAT_MAX_PENDING pairs (default 10000) are waiting;
+* on shutdown, when the lifespan drains the buffer.
+
+Completing the video is written through synchronously, so the quiz unlocks
+on the same request. Buffered writes never touch ``video_completed``, so a
+late heartbeat can't lock a quiz again. The buffer only holds data while
+its flusher runs. Without it (scripts, tests, HEARTBEAT_BUFFER_ENABLED=0)
+every heartbeat is written through.
+"""
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer:
+    def __init__(self, flush_interval_seconds: float = 5.0, max_loss_seconds: float = 15.0,
+                 max_pending: int = 10000, enabled: bool = True):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_loss_seconds = max_loss_seconds
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pending = {}
+        self._oldest = None
+        # Pairs this worker already marked complete; later heartbeats for them are buffered.
+        self._completed = OrderedDict()
+        self.received = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.sync_writes = 0
+        self.failed_flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, db):
+        if not self.enabled or self._task is not None:
+            return
+        self._db = db
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=min(self.flush_interval_seconds, self.max_loss_seconds)
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.warning("Heartbeat flush failed, will retry: %s", e)
+
+    async def record(self, db, student_id: str, course_id: str, watch_duration: int, completed: bool,
+                     timestamp_field: str = "updated_at", upsert: bool = True):
+        """Accept one heartbeat. Completions are written now, the rest are coalesced."""
+        self.received += 1
+        now = datetime.now(timezone.utc).isoformat()
+        key = (student_id, course_id)
+
+        if (completed and key not in self._completed) or not self.running:
+            self._pending.pop(key, None)
+            self.sync_writes += 1
+            update = {"$set": {"watch_duration": watch_duration, timestamp_field: now}}
+            if completed:
+                update["$set"]["video_completed"] = True
+            elif upsert:
+                update["$setOnInsert"] = {"video_completed": False}
+            await db.progress.update_one(
+                {"student_id": student_id, "course_id": course_id}, update, upsert=upsert
+            )
+            if completed:
+                self._completed[key] = True
+                if len(self._completed) > self.max_pending:
+                    self._completed.popitem(last=False)
+            return
+
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending[key] = (watch_duration, timestamp_field, upsert)
+        if len(self._pending) >= self.max_pending or time.monotonic() - self._oldest >= self.max_loss_seconds:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write every buffered heartbeat in one bulk_write. Returns how many were written."""
+        if not self._pending or self._db is None:
+            return 0
+        batch, self._pending = self._pending, {}
+        oldest, self._oldest = self._oldest, None
+
+        # Stamped at flush time, not when recorded, so a change scan that starts
+        # meanwhile (class_analytics watermarks) can't skip these writes.
+        flushed_at = datetime.now(timezone.utc).isoformat()
+        keys = list(batch)
+        ops = []
+        for student_id, course_id in keys:
+            watch_duration, timestamp_field, upsert = batch[(student_id, course_id)]
+            update = {"$set": {"watch_duration": watch_duration, timestamp_field: flushed_at}}
+            if upsert:
+                update["$setOnInsert"] = {"progress_id": str(uuid.uuid4()), "video_completed": False}
+            ops.append(UpdateOne({"student_id": student_id, "course_id": course_id}, update, upsert=upsert))
+
+        failed = set()
+        try:
+            await self._db.progress.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed = {keys[err["index"]] for err in e.details.get("writeErrors", [])}
+        except BaseException:
+            # Includes cancellation by stop(); the batch goes back and is flushed there.
+            failed = set(keys)
+            raise
+        finally:
+            # Put back what didn't land, unless a newer heartbeat already replaced it.
+            for key in failed:
+                self._pending.setdefault(key, batch[key])
+            if failed:
+                self._oldest = oldest if self._oldest is None else min(oldest, self._oldest)
+            self.flushes += 1
+            self.flushed += len(keys) - len(failed)
+        return len(keys) - len(failed)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "received": self.received,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "sync_writes": self.sync_writes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+heartbeat_buffer = HeartbeatBuffer(
+    flush_interval_seconds=float(os.environ.get("HEARTBEAT_FLUSH_INTERVAL_SECONDS", "5")),
+    max_loss_seconds=float(os.environ.get("HEARTBEAT_MAX_LOSS_SECONDS", "15")),
+    max_pending=int(os.environ.get("HEARTBEAT_MAX_PENDING", "10000")),
+    enabled=os.environ.get("HEARTBEAT_BUFFER_ENABLED", "1") == "1",
+)
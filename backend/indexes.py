@@ -0,0 +1,177 @@
+"""Index manifest for every query shape the routers issue.
+
+Applied idempotently on startup (set MONGO_ENSURE_INDEXES=0 to skip) or from
+the command line:
+
+    python indexes.py apply     # create anything missing
+    python indexes.py check     # report missing, unmanaged and unused indexes
+"""
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+# v1 student profiles have no username, so the unique keys only cover documents that set them.
+_HAS_USERNAME = {"username": {"$type": "string"}}
+
+INDEXES = {
+    "students": [
+        IndexModel([("student_id", ASCENDING)], name="student_id_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True,
+                   partialFilterExpression=_HAS_USERNAME),
+        IndexModel([("mobile", ASCENDING)], name="mobile"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("parent_mobile", ASCENDING)], name="parent_mobile"),
+        IndexModel([("institution_name", ASCENDING), ("total_credits", DESCENDING)], name="institution_credits"),
+        IndexModel([("total_credits", DESCENDING)], name="total_credits"),
+    ],
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("institution_id", ASCENDING)], name="institution_id"),
+        IndexModel([("email", ASCENDING)], name="email"),
+        # Serves (role, institution_id) lookups and the teacher roster's name-ordered keyset pages.
+        IndexModel([("role", ASCENDING), ("institution_id", ASCENDING), ("full_name", ASCENDING), ("user_id", ASCENDING)],
+                   name="role_institution_name"),
+    ],
+    "progress": [
+        IndexModel([("student_id", ASCENDING), ("course_id", ASCENDING)], name="student_course_unique", unique=True),
+        IndexModel([("student_id", ASCENDING), ("updated_at", DESCENDING)], name="student_updated_at"),
+        IndexModel([("student_id", ASCENDING), ("last_accessed", DESCENDING)], name="student_last_accessed"),
+        # class_analytics.changed_institutions scans both timestamps with an $or; each branch needs its own index.
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+        IndexModel([("last_accessed", ASCENDING)], name="last_accessed"),
+    ],
+    "courses": [
+        IndexModel([("course_id", ASCENDING)], name="course_id_unique", unique=True),
+        IndexModel([("standard", ASCENDING)], name="standard"),
+        IndexModel([("grade_level", ASCENDING), ("order", ASCENDING)], name="grade_level_order"),
+    ],
+    "quizzes": [
+        IndexModel([("quiz_id", ASCENDING)], name="quiz_id_unique", unique=True),
+        IndexModel([("course_id", ASCENDING)], name="course_id"),
+    ],
+    "badges": [
+        IndexModel([("badge_id", ASCENDING)], name="badge_id_unique", unique=True),
+    ],
+    "student_badges": [
+        IndexModel([("student_id", ASCENDING), ("badge_id", ASCENDING)], name="student_badge_unique", unique=True),
+        IndexModel([("student_id", ASCENDING), ("earned_at", DESCENDING)], name="student_earned_at"),
+    ],
+    "certificates": [
+        IndexModel([("student_id", ASCENDING), ("certificate_id", ASCENDING)], name="student_certificate"),
+    ],
+    "resources": [
+        IndexModel([("resource_id", ASCENDING)], name="resource_id_unique", unique=True),
+        IndexModel([("grade_level", ASCENDING), ("type", ASCENDING), ("subject", ASCENDING)], name="grade_type_subject"),
+    ],
+    "career_roadmaps": [
+        IndexModel([("roadmap_id", ASCENDING)], name="roadmap_id_unique", unique=True),
+    ],
+    "class_analytics": [
+        IndexModel([("institution_id", ASCENDING)], name="institution_id_unique", unique=True),
+    ],
+    "otp_codes": [
+        IndexModel([("mobile", ASCENDING)], name="mobile_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "revoked_tokens": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+def _key(spec) -> tuple:
+    return tuple((field, int(direction)) for field, direction in spec.items())
+
+
+async def ensure_indexes(db, manifest: dict = None) -> dict:
+    """Create every index in the manifest. Returns the names created or failed per collection."""
+    manifest = INDEXES if manifest is None else manifest
+    report = {}
+    for collection, models in manifest.items():
+        existing = await db[collection].index_information()
+        existing_keys = {_key(dict(info["key"])) for info in existing.values()}
+        created, failed = [], []
+        for model in models:
+            name = model.document["name"]
+            if name in existing or _key(model.document["key"]) in existing_keys:
+                continue
+            try:
+                await db[collection].create_indexes([model])
+                created.append(name)
+            except OperationFailure as e:
+                # Usually duplicate data under a unique key; keep going so one bad index can't block startup.
+                logger.error("Could not create index %s.%s: %s", collection, name, e)
+                failed.append({"name": name, "error": str(e)})
+        report[collection] = {"created": created, "failed": failed}
+    return report
+
+
+async def check_indexes(db, manifest: dict = None) -> dict:
+    """Compare the live indexes with the manifest.
+
+    missing    declared in the manifest but not present (by name or key)
+    unmanaged  present on the server but not declared here
+    unused     present with zero recorded accesses since the server started
+    """
+    manifest = INDEXES if manifest is None else manifest
+    report = {}
+    for collection, models in manifest.items():
+        existing = await db[collection].index_information()
+        declared_names = {m.document["name"] for m in models}
+        declared_keys = {_key(m.document["key"]) for m in models}
+        existing_keys = {_key(dict(info["key"])) for info in existing.values()}
+
+        missing = [
+            m.document["name"] for m in models
+            if m.document["name"] not in existing and _key(m.document["key"]) not in existing_keys
+        ]
+        unmanaged = [
+            name for name, info in existing.items()
+            if name != "_id_" and name not in declared_names and _key(dict(info["key"])) not in declared_keys
+        ]
+
+        unused = []
+        try:
+            async for stats in db[collection].aggregate([{"$indexStats": {}}]):
+                if stats["name"] != "_id_" and stats.get("accesses", {}).get("ops", 0) == 0:
+                    unused.append(stats["name"])
+        except OperationFailure as e:
+            logger.warning("$indexStats unavailable for %s: %s", collection, e)
+
+        report[collection] = {"missing": missing, "unmanaged": unmanaged, "unused": sorted(unused)}
+    return report
+
+
+async def _main(command: str):
+    from dotenv import load_dotenv
+    from pathlib import Path
+    import database
+    import json
+
+    load_dotenv(Path(__file__).parent / '.env')
+    db = database.connect()
+    try:
+        if command == "apply":
+            report = await ensure_indexes(db)
+        else:
+            report = await check_indexes(db)
+    finally:
+        database.close()
+
+    print(json.dumps(report, indent=2))
+    if command == "check" and any(r["missing"] for r in report.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Apply or verify the MongoDB index manifest")
+    parser.add_argument("command", choices=["apply", "check"])
+    asyncio.run(_main(parser.parse_args().command))
@@ -0,0 +1,268 @@
+"""Prometheus-style metrics for this worker, served at GET /api/metrics.
+
+    edubridge_http_request_duration_seconds{method,route}    histogram per route template
+    edubridge_http_requests_total{method,route,status}       responses by status code
+    edubridge_http_requests_in_flight                        requests being served now
+    edubridge_mongo_command_duration_seconds{collection,command}
+    edubridge_mongo_command_failures_total{collection,command}
+    edubridge_mongo_pool_checkout_wait_seconds{server}       time spent waiting for a pooled socket
+
+Routes are labelled by their template (``/api/students/{student_id}``), never
+the raw path; unmatched paths share the label ``unmatched``. Mongo timings
+come from pymongo's CommandListener, pool waits from a
+ConnectionPoolListener, both registered on the client in database.py.
+
+Each worker keeps its own numbers, so scrape every worker. With
+METRICS_ENABLED=0 nothing is recorded.
+"""
+from collections import defaultdict
+from typing import Dict, Tuple
+import os
+import threading
+import time
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+enabled = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+
+def _labels(names, values) -> str:
+    pairs = ",".join('%s="%s"' % (n, str(v).replace("\\", "\\\\").replace('"', '\\"')) for n, v in zip(names, values))
+    return "{%s}" % pairs if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label tuple.
+
+    Observations can arrive from Motor's executor threads, hence the lock.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values: tuple, seconds: float):
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                # One counter per bucket, then +Inf, then the running sum.
+                series = self._series[values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def count(self, values: tuple) -> int:
+        series = self._series.get(values)
+        return series[-2] if series else 0
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list:
+        lines = ["# HELP %s %s" % (self.name, self.help), "# TYPE %s histogram" % self.name]
+        with self._lock:
+            items = sorted(self._series.items())
+        for values, series in items:
+            for bound, n in zip(self.buckets + ("+Inf",), series):
+                lines.append("%s_bucket%s %d" % (self.name, _labels(self.labels + ("le",), values + (bound,)), n))
+            lines.append("%s_count%s %d" % (self.name, _labels(self.labels, values), series[-2]))
+            lines.append("%s_sum%s %.6f" % (self.name, _labels(self.labels, values), series[-1]))
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, values: tuple, amount: int = 1):
+        with self._lock:
+            self._values[values] += amount
+
+    def get(self, values: tuple) -> int:
+        return self._values.get(values, 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list:
+        lines = ["# HELP %s %s" % (self.name, self.help), "# TYPE %s counter" % self.name]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend("%s%s %d" % (self.name, _labels(self.labels, values), n) for values, n in items)
+        return lines
+
+
+http_request_duration = Histogram(
+    "edubridge_http_request_duration_seconds", "Request latency by route template.", ("method", "route"))
+http_requests = Counter(
+    "edubridge_http_requests_total", "Responses by route template and status code.", ("method", "route", "status"))
+mongo_command_duration = Histogram(
+    "edubridge_mongo_command_duration_seconds", "MongoDB command latency by collection and command.",
+    ("collection", "command"))
+mongo_command_failures = Counter(
+    "edubridge_mongo_command_failures_total", "Failed MongoDB commands by collection and command.",
+    ("collection", "command"))
+mongo_pool_checkout_wait = Histogram(
+    "edubridge_mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool.",
+    ("server",))
+
+in_flight = 0
+
+ALL = (http_request_duration, http_requests, mongo_command_duration, mongo_command_failures, mongo_pool_checkout_wait)
+
+
+def render() -> str:
+    lines = []
+    for metric in ALL[:2]:
+        lines.extend(metric.render())
+    lines.extend([
+        "# HELP edubridge_http_requests_in_flight Requests being served by this worker.",
+        "# TYPE edubridge_http_requests_in_flight gauge",
+        "edubridge_http_requests_in_flight %d" % in_flight,
+    ])
+    for metric in ALL[2:]:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    global in_flight
+    in_flight = 0
+    for metric in ALL:
+        metric.clear()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._templates = None
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._templates is None or endpoint not in self._templates:
+            # Routing has stored the matched endpoint in the scope; map it back to its path template.
+            self._templates = {
+                getattr(route, "endpoint", None): route.path
+                for route in getattr(scope.get("app"), "routes", [])
+            }
+        return self._templates.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        global in_flight
+        if scope["type"] != "http" or not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight -= 1
+            route = self._route(scope)
+            http_request_duration.observe((scope["method"], route), time.perf_counter() - started)
+            http_requests.inc((scope["method"], route, str(status[0])))
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        if not enabled:
+            return
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        collection = target if isinstance(target, str) else ""
+        self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event) -> tuple:
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        return collection, event.command_name
+
+    def succeeded(self, event):
+        if enabled:
+            mongo_command_duration.observe(self._finish(event), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        if enabled:
+            labels = self._finish(event)
+            mongo_command_duration.observe(labels, event.duration_micros / 1e6)
+            mongo_command_failures.inc(labels)
+
+
+class PoolWaitMetrics(monitoring.ConnectionPoolListener):
+    """Times check-out started -> checked out (or failed).
+
+    pymongo 4.5 events carry no duration, but a check-out starts and ends on
+    the same thread, so the start time is kept thread-locally.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def _observe(self, event):
+        started = getattr(self._local, "started", None)
+        if started is None or not enabled:
+            return
+        self._local.started = None
+        mongo_pool_checkout_wait.observe(("%s:%s" % event.address,), time.perf_counter() - started)
+
+    def connection_checked_out(self, event):
+        self._observe(event)
+
+    def connection_check_out_failed(self, event):
+        self._observe(event)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+command_metrics = CommandMetrics()
+pool_wait_metrics = PoolWaitMetrics()
@@ -103,6 +103,16 @@ class Quiz(QuizBase):
 class QuizSubmission(BaseModel):
     quiz_id: str
     answers: dict
+    idempotency_key: Optional[str] = None
+
+class OfflineQuizRecord(BaseModel):
+    student_id: str
+    quiz_id: str
+    answers: dict
+    idempotency_key: Optional[str] = None
+
+class OfflineQuizBatch(BaseModel):
+    records: List[OfflineQuizRecord]
 
 class ProgressBase(BaseModel):
     student_id: str
@@ -60,6 +60,7 @@ class QuizModel(BaseModel):
 class QuizSubmission(BaseModel):
     quiz_id: str
     answers: dict
+    idempotency_key: Optional[str] = None
 
 class ProgressModel(BaseModel):
     model_config = ConfigDict(extra="ignore")
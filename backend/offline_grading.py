@@ -0,0 +1,277 @@
+"""Bulk grading for quiz answers collected offline.
+
+Schools without connectivity upload thousands of (student, quiz, answers)
+records at once. Records are grouped by quiz and graded as one NumPy batch
+against the compiled answer key. The results are then folded into a
+single progress update per (student, course). The database work is a
+fixed handful of calls however many records arrive: three lookups, one
+progress ``bulk_write``, one credit ``bulk_write``, a level fix-up and a
+set-based badge award.
+
+This is a v1 endpoint: teachers and institutions only exist in the v1
+schema. Uploads are scoped to the uploader's institution through the
+students' ``users`` documents. A record for a student outside it gets
+``forbidden`` and changes nothing. Grading and the progress fields written
+follow ``routers/progress.py``: marks against ``passing_marks``, stored as
+``quiz_score`` with ``quiz_attempts`` and ``last_accessed``.
+
+Credits follow ``quiz_submission.record_submission``. They are awarded only
+when a quiz goes from not passed to passed. A retake keeps the best
+score. One rule differs on purpose: the online path only accepts a quiz
+once the video is complete, but offline sheets are attested by the
+uploading teacher. Video progress is not synced from offline devices, so
+the video rule is not applied. A first upload creates the progress
+document with ``video_completed: False``, and an existing flag is left as
+it is. A record whose idempotency key was already applied is replayed
+with the result stored for that key, not graded again.
+"""
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import TYPE_CHECKING, Dict, List
+import uuid
+
+from answer_keys import AnswerKey
+from auth.principal_cache import principal_cache
+from badge_engine import badge_engine, DUPLICATE_KEY
+from catalog import course_catalog
+from quiz_submission import KEEP_SUBMISSION_KEYS, level_for
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def grade_batch(answer_key: AnswerKey, answers_list: List[dict]) -> Dict[str, "np.ndarray"]:
+    """Grade many answer sheets for one quiz as a single matrix comparison."""
+    # Imported here so that loading the sync router doesn't pull in NumPy.
+    import numpy as np
+
+    n_questions = len(answer_key.correct)
+    choices = np.array(
+        [answer_key.choices(answers) for answers in answers_list], dtype=np.int32
+    ).reshape(len(answers_list), n_questions)
+    hits = choices == np.asarray(answer_key.correct, dtype=np.int32)
+    correct = hits.sum(axis=1)
+    if n_questions:
+        score = (correct * 100) // n_questions
+    else:
+        score = np.zeros(len(answers_list), dtype=np.int64)
+    marks = hits.astype(np.int64) @ np.asarray(answer_key.marks, dtype=np.int64)
+    return {
+        "correct_answers": correct,
+        "score": score,
+        "marks": marks,
+        "passed": marks >= answer_key.passing_marks,
+    }
+
+
+async def grade_and_apply(db, records: List[dict], institution_id: str) -> List[dict]:
+    """Grade ``records`` for students of ``institution_id`` and apply them.
+
+    Returns one result per record, in input order.
+    """
+    results: List[dict] = [None] * len(records)
+
+    # 1. Grade every quiz's records as one batch.
+    by_quiz = {}
+    for i, record in enumerate(records):
+        by_quiz.setdefault(record["quiz_id"], []).append(i)
+
+    for quiz_id, indexes in by_quiz.items():
+        answer_key = await course_catalog.get_answer_key(db, quiz_id)
+        course = await course_catalog.get_course(db, answer_key.course_id) if answer_key else None
+        if not answer_key or not course:
+            for i in indexes:
+                results[i] = {"status": "error", "detail": "Quiz not found"}
+            continue
+        graded = grade_batch(answer_key, [records[i].get("answers") or {} for i in indexes])
+        total_questions = len(answer_key.correct)
+        for row, i in enumerate(indexes):
+            passed = bool(graded["passed"][row])
+            results[i] = {
+                "status": "graded",
+                "course_id": answer_key.course_id,
+                "score": int(graded["marks"][row]),
+                "total": answer_key.total_marks,
+                "passed": passed,
+                "credits_earned": course.get("credits", 10) if passed else 0,
+                "correct_answers": int(graded["correct_answers"][row]),
+                "total_questions": total_questions
+            }
+
+    # 2. Check students and their institution.
+    student_ids = list({records[i]["student_id"] for i, r in enumerate(results) if r["status"] == "graded"})
+    user_ids = {}
+    if student_ids:
+        async for student in db.students.find(
+            {"student_id": {"$in": student_ids}}, {"_id": 0, "student_id": 1, "user_id": 1}
+        ):
+            user_ids[student["student_id"]] = student.get("user_id")
+    in_scope = set()
+    if user_ids:
+        in_scope = set(await db.users.distinct("user_id", {
+            "role": "student",
+            "institution_id": institution_id,
+            "user_id": {"$in": [u for u in user_ids.values() if u]}
+        }))
+
+    pairs = {}
+    for i, record in enumerate(records):
+        result = results[i]
+        if result["status"] != "graded":
+            continue
+        if record["student_id"] not in user_ids:
+            results[i] = {"status": "error", "detail": "Student not found"}
+            continue
+        if user_ids[record["student_id"]] not in in_scope:
+            results[i] = {"status": "forbidden", "detail": "Student is not in your institution"}
+            continue
+        pairs.setdefault((record["student_id"], result["course_id"]), []).append(i)
+
+    if not pairs:
+        return [_public(r) for r in results]
+
+    # 3. Read current progress state for every (student, course) touched.
+    state = {}
+    async for progress in db.progress.find(
+        {
+            "student_id": {"$in": list({sid for sid, _ in pairs})},
+            "course_id": {"$in": list({cid for _, cid in pairs})}
+        },
+        {"_id": 0, "student_id": 1, "course_id": 1, "quiz_passed": 1, "submission_keys": 1, "submission_results": 1}
+    ):
+        state[(progress["student_id"], progress["course_id"])] = progress
+
+    # 4. Fold each pair's records into one update.
+    now = datetime.now(timezone.utc).isoformat()
+    ops, op_pairs, transitions, replays = [], [], {}, []
+    for pair, indexes in pairs.items():
+        prior = state.get(pair, {})
+        seen_keys = set(prior.get("submission_keys", []))
+        passed_already = bool(prior.get("quiz_passed"))
+        new_keys, applied = {}, []
+
+        for i in indexes:
+            key = records[i].get("idempotency_key")
+            result = results[i]
+            if key and key in seen_keys:
+                # Resolved once the batch is applied: the key may belong to an earlier record of this batch.
+                results[i] = {"status": "replayed"}
+                replays.append((i, prior, new_keys.get(key), key))
+                continue
+            if key:
+                seen_keys.add(key)
+                new_keys[key] = i
+            if passed_already:
+                result.update(status="already_passed", credits_earned=0)
+            elif result["passed"]:
+                passed_already = True
+                transitions[pair] = i
+            applied.append(i)
+
+        if not applied:
+            continue
+
+        best_score = max(results[i]["score"] for i in applied)
+        last_result = _stored(results[applied[-1]])
+        update = {}
+        if new_keys:
+            update["$push"] = {
+                "submission_keys": {"$each": list(new_keys), "$slice": -KEEP_SUBMISSION_KEYS},
+                "submission_results": {
+                    "$each": [{"key": key, "result": _stored(results[i])} for key, i in new_keys.items()],
+                    "$slice": -KEEP_SUBMISSION_KEYS
+                }
+            }
+
+        update["$inc"] = {"quiz_attempts": len(applied)}
+
+        if prior.get("quiz_passed"):
+            update["$max"] = {"quiz_score": best_score}
+            update["$set"] = {"last_quiz_result": last_result, "last_accessed": now}
+            ops.append(UpdateOne({"student_id": pair[0], "course_id": pair[1]}, update))
+        else:
+            passed = pair in transitions
+            update["$set"] = {
+                "quiz_completed": True,
+                "quiz_passed": passed,
+                "quiz_score": best_score if passed else results[applied[-1]]["score"],
+                "credits_earned": results[transitions[pair]]["credits_earned"] if passed else 0,
+                "completed_at": now if passed else None,
+                "last_quiz_result": last_result,
+                "last_accessed": now
+            }
+            # No video rule offline (see the module docstring); a new document just starts unwatched.
+            update["$setOnInsert"] = {
+                "progress_id": str(uuid.uuid4()),
+                "video_completed": False,
+                "watch_duration": 0
+            }
+            # Matches only while the quiz is still unpassed. If another request passed it
+            # meanwhile, the upsert hits the unique (student_id, course_id) index instead.
+            ops.append(UpdateOne(
+                {"student_id": pair[0], "course_id": pair[1], "quiz_passed": {"$ne": True}},
+                update,
+                upsert=True
+            ))
+        op_pairs.append(pair)
+
+    # 5. Apply progress in one round trip; pairs that lost a race award nothing.
+    lost = set()
+    if ops:
+        try:
+            await db.progress.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+            lost = {op_pairs[err["index"]] for err in errors}
+    for pair in lost:
+        for i in pairs[pair]:
+            if results[i]["status"] == "graded":
+                results[i].update(status="already_passed", credits_earned=0)
+        transitions.pop(pair, None)
+    for i, prior, source, key in replays:
+        if source is not None:
+            stored = _stored(results[source])
+        else:
+            stored = next((r["result"] for r in prior.get("submission_results", []) if r["key"] == key), {})
+        results[i] = {"status": "replayed", **stored}
+
+    # 6. Credits, levels and badges for every student that passed something new.
+    credits = {}
+    for (student_id, _), i in transitions.items():
+        credits[student_id] = credits.get(student_id, 0) + results[i]["credits_earned"]
+    credits = {sid: amount for sid, amount in credits.items() if amount > 0}
+    if credits:
+        await db.students.bulk_write(
+            [UpdateOne({"student_id": sid}, {"$inc": {"total_credits": amount}}) for sid, amount in credits.items()],
+            ordered=False
+        )
+        stats = {}
+        level_ops = []
+        async for student in db.students.find(
+            {"student_id": {"$in": list(credits)}}, {"_id": 0, "student_id": 1, "total_credits": 1, "level": 1}
+        ):
+            level = level_for(student.get("total_credits", 0))
+            if level > student.get("level", 1):
+                level_ops.append(UpdateOne({"student_id": student["student_id"]}, {"$max": {"level": level}}))
+            stats[student["student_id"]] = {
+                "total_credits": student.get("total_credits", 0),
+                "level": max(level, student.get("level", 1))
+            }
+        if level_ops:
+            await db.students.bulk_write(level_ops, ordered=False)
+        for sid in credits:
+            principal_cache.invalidate(sid)
+        await badge_engine.award_many(db, stats)
+
+    return [_public(r) for r in results]
+
+
+def _stored(result: dict) -> dict:
+    return {k: v for k, v in result.items() if k not in ("status", "course_id")}
+
+
+def _public(result: dict) -> dict:
+    return {k: v for k, v in result.items() if k != "course_id"}
@@ -0,0 +1,116 @@
+"""Keyset pagination helpers.
+
+A page is requested with ``limit`` and an opaque ``cursor``. The cursor is
+the sort key of the last row already returned, base64-encoded JSON. The
+next page is the rows that sort strictly after it, so there is no skip
+cost however deep the client pages. Every sort must end in a unique field
+(``user_id``, ``course_id``, ...) so ties can't drop or repeat rows. The
+other sort fields may be null or missing. Those rows sort first, as they do
+in MongoDB.
+
+List endpoints that return a bare JSON array keep that body and put the
+next cursor in the ``X-Next-Cursor`` response header. The header is absent
+on the last page. Pages go out through ``fast_json.list_response``, so they
+take the fast encoding path when it is switched on.
+"""
+from fastapi import HTTPException, Query, Response
+from fast_json import list_response
+from typing import List, Optional, Tuple
+import base64
+import json
+
+Sort = List[Tuple[str, int]]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Authored order; course_id only breaks ties between courses created together.
+COURSE_ORDER: Sort = [("created_at", 1), ("course_id", 1)]
+
+
+def limit_query(default: int = DEFAULT_PAGE_SIZE):
+    return Query(default, ge=1, le=MAX_PAGE_SIZE)
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], sort: Sort) -> Optional[list]:
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def after(sort: Sort, values: Optional[list]) -> dict:
+    """Match every row that sorts strictly after ``values`` under ``sort``.
+
+    A comparison with null matches nothing in MongoDB, so null keys get their
+    own clauses: everything non-null sorts after a null in ascending order,
+    and nulls sort after every value in descending order.
+    """
+    if values is None:
+        return {}
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        prefix = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        if values[i] is None:
+            if direction > 0:
+                clauses.append({**prefix, field: {"$ne": None}})
+            continue
+        clauses.append({**prefix, field: {"$gt" if direction > 0 else "$lt": values[i]}})
+        if direction < 0:
+            clauses.append({**prefix, field: None})
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def page(rows: list, sort: Sort, limit: int) -> Tuple[list, Optional[str]]:
+    """Trim a ``limit + 1`` fetch to ``limit`` rows and the cursor for the next page."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([_get(rows[-1], field) for field, _ in sort])
+
+
+def _nulls_first(value) -> tuple:
+    return (False, 0) if value is None else (True, value)
+
+
+def _get(row: dict, field: str):
+    for part in field.split("."):
+        row = row.get(part) if isinstance(row, dict) else None
+    return row
+
+
+async def find_page(collection, query: dict, sort: Sort, cursor: Optional[str], limit: int,
+                    projection: Optional[dict] = None) -> Tuple[list, Optional[str]]:
+    """One keyset page of ``collection.find(query)``, fetched with a single bounded query."""
+    rows = await collection.find(
+        {**query, **after(sort, decode_cursor(cursor, sort))},
+        {"_id": 0} if projection is None else projection
+    ).sort(sort).limit(limit + 1).to_list(limit + 1)
+    return page(rows, sort, limit)
+
+
+def page_list(items: list, sort: Sort, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """The same contract over an in-memory list, for ascending sorts."""
+    values = decode_cursor(cursor, sort)
+    # (is-not-null, value) pairs order nulls first and never compare None with a value.
+    key = lambda item: tuple(_nulls_first(_get(item, field)) for field, _ in sort)
+    items = sorted(items, key=key)
+    if values is not None:
+        items = [item for item in items if key(item) > tuple(_nulls_first(v) for v in values)]
+    return page(items[:limit + 1], sort, limit)
+
+
+def with_next_cursor(response: Response, rows: list, next_cursor: Optional[str], model=None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return list_response(rows, response, model)
@@ -0,0 +1,98 @@
+"""Streaming export of an institution's progress records.
+
+Exports can run to hundreds of thousands of rows, so nothing is buffered
+whole. Students are read from one aggregation cursor (users joined with
+their profiles). For every EXPORT_BATCH_SIZE students (default 1000),
+their progress is read through a second cursor with the same batch size.
+Course fields come from the in-memory catalog. Each batch is rendered and
+yielded as one NDJSON or CSV chunk. Memory stays bounded by the batch size,
+and the CSV header goes out before the first query returns.
+"""
+from typing import AsyncIterator, List
+import csv
+import io
+import json
+import os
+
+from catalog import course_catalog
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+
+COLUMNS = [
+    "student_id", "student_name", "grade", "stream",
+    "course_id", "course_title", "subject",
+    "video_completed", "watch_duration", "quiz_completed", "quiz_passed",
+    "score", "credits_earned", "completed_at", "updated_at",
+]
+
+
+async def _students(db, institution_id: str, batch_size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    async for student in db.users.aggregate([
+        {"$match": {"role": "student", "institution_id": institution_id}},
+        {"$lookup": {"from": "students", "localField": "user_id", "foreignField": "user_id", "as": "student"}},
+        {"$unwind": "$student"},
+        {"$project": {
+            "_id": 0,
+            "student_id": "$student.student_id",
+            "student_name": "$full_name",
+            "grade": "$student.grade",
+            "stream": "$student.stream"
+        }}
+    ], batchSize=batch_size):
+        batch.append(student)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def rows(db, institution_id: str, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+    """Yield lists of at most ``batch_size`` joined export rows."""
+    await course_catalog.ensure_fresh(db)
+    async for students in _students(db, institution_id, batch_size):
+        by_id = {s["student_id"]: s for s in students}
+        chunk = []
+        async for progress in db.progress.find(
+            {"student_id": {"$in": list(by_id)}}, {"_id": 0}
+        ).batch_size(batch_size):
+            student = by_id[progress["student_id"]]
+            course = course_catalog.courses_by_id.get(progress["course_id"]) or {}
+            chunk.append({
+                **student,
+                "course_id": progress["course_id"],
+                "course_title": course.get("title"),
+                "subject": course.get("subject"),
+                "video_completed": progress.get("video_completed", False),
+                "watch_duration": progress.get("watch_duration", 0),
+                "quiz_completed": progress.get("quiz_completed", False),
+                "quiz_passed": progress.get("quiz_passed", False),
+                # v1 progress uses quiz_score/last_accessed, v2 score/updated_at
+                "score": progress.get("score", progress.get("quiz_score")),
+                "credits_earned": progress.get("credits_earned", 0),
+                "completed_at": progress.get("completed_at"),
+                "updated_at": progress.get("updated_at", progress.get("last_accessed"))
+            })
+            if len(chunk) >= batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+async def ndjson(db, institution_id: str, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[str]:
+    async for chunk in rows(db, institution_id, batch_size):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in chunk)
+
+
+async def csv_chunks(db, institution_id: str, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue()
+    async for chunk in rows(db, institution_id, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
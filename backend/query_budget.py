@@ -0,0 +1,145 @@
+"""Per-request Mongo query budgets and N+1 detection, for development and tests.
+
+QUERY_BUDGET_MODE turns it on:
+
+    off      default; nothing is wrapped or recorded
+    log      log a warning for every request that breaks a rule
+    raise    raise QueryBudgetExceeded, so the test or dev server fails loudly
+
+While it is on, get_db() hands out a tracing wrapper that files every Motor
+call (find, aggregate, update_one, ...) under the current request, and
+QueryBudgetMiddleware checks each request when it finishes:
+
+* the command count must not exceed the route's budget, declared next to
+  the route with ``@budget(n)`` below the router decorator. Routes without
+  one get QUERY_BUDGET_DEFAULT (default 10). Budgets include the
+  ``revoked_tokens`` lookup verify_token makes when the token's revocation
+  check is due;
+* the same query shape (collection, method and filter keys, ignoring
+  values) must not repeat QUERY_BUDGET_REPEAT_LIMIT (default 3) or more
+  times. That is the signature of a find_one inside a loop.
+
+Tests that override get_db can wrap their database with trace(db).
+"""
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+mode = os.environ.get("QUERY_BUDGET_MODE", "off")
+DEFAULT_BUDGET = int(os.environ.get("QUERY_BUDGET_DEFAULT", "10"))
+REPEAT_LIMIT = int(os.environ.get("QUERY_BUDGET_REPEAT_LIMIT", "3"))
+
+QUERY_METHODS = {
+    "find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "find_one_and_update", "find_one_and_replace", "find_one_and_delete", "bulk_write",
+}
+
+_current: ContextVar[Optional["RequestQueries"]] = ContextVar("query_budget_request", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def budget(limit: int):
+    """Declare how many Mongo commands one request to this route may issue."""
+    def declare(endpoint):
+        endpoint.__query_budget__ = limit
+        return endpoint
+    return declare
+
+
+def shape(value) -> str:
+    """A filter with its values blanked out, so repeated lookups compare equal."""
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join(
+            "%s: %s" % (key, shape(item) if key.startswith("$") or isinstance(item, dict) else "?")
+            for key, item in sorted(value.items())
+        )
+    if isinstance(value, list):
+        return "[%s]" % ", ".join(sorted({shape(item) for item in value}))
+    return "?"
+
+
+class RequestQueries:
+    def __init__(self):
+        self.commands = []
+
+    def record(self, collection: str, method: str, args: tuple, kwargs: dict):
+        query = args[0] if args else kwargs.get("filter", kwargs.get("pipeline"))
+        self.commands.append((collection, method, shape(query) if query is not None else ""))
+
+    def problems(self, limit: int) -> list:
+        problems = []
+        if len(self.commands) > limit:
+            problems.append("%d Mongo commands, budget is %d" % (len(self.commands), limit))
+        for (collection, method, query), n in Counter(self.commands).items():
+            if n >= REPEAT_LIMIT:
+                problems.append("%s.%s(%s) ran %d times; batch it with $in" % (collection, method, query, n))
+        return problems
+
+
+class TracingCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in QUERY_METHODS:
+            return attr
+
+        def call(*args, **kwargs):
+            queries = _current.get()
+            if queries is not None:
+                queries.record(self._collection.name, name, args, kwargs)
+            return attr(*args, **kwargs)
+        return call
+
+
+class TracingDatabase:
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        return TracingCollection(attr) if hasattr(attr, "find_one") else attr
+
+    def __getitem__(self, name):
+        return TracingCollection(self._db[name])
+
+
+def trace(db) -> TracingDatabase:
+    return TracingDatabase(db)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app, mode: Optional[str] = None):
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope, receive, send):
+        current_mode = self.mode or mode
+        if scope["type"] != "http" or current_mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = _current.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+
+        endpoint = scope.get("endpoint")
+        problems = queries.problems(getattr(endpoint, "__query_budget__", DEFAULT_BUDGET))
+        if not problems:
+            return
+        message = "%s %s: %s" % (scope["method"], scope["path"], "; ".join(problems))
+        if current_mode == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget: %s", message)
@@ -0,0 +1,142 @@
+"""Atomic, idempotent recording of a graded quiz attempt.
+
+Every submit_quiz handler grades the answers and then calls
+``record_submission``. The happy path costs two round trips:
+
+1. one ``find_one_and_update`` on the progress document. It only matches
+   while the video is complete, the quiz is not yet passed and the
+   idempotency key is unseen. In the same write it stores the result and
+   remembers the key together with that result;
+2. when that attempt turned the quiz from not-passed into passed, one
+   ``$inc`` of the student's credits. The level is derived from the
+   returned document.
+
+Credits are only awarded on the not-passed -> passed transition, so races
+and re-submissions can never award twice. A retry carrying a key that was
+already applied gets the result stored for that key back instead of being
+graded again.
+"""
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from typing import Optional
+from auth.principal_cache import principal_cache
+
+CREDITS_PER_LEVEL = 500
+
+# Keys remembered per (student, course); enough to cover any client retry loop.
+KEEP_SUBMISSION_KEYS = 20
+
+
+def level_for(total_credits: int) -> int:
+    return (total_credits // CREDITS_PER_LEVEL) + 1
+
+
+async def _award_credits(db, student_id: str, credits: int) -> dict:
+    student = await db.students.find_one_and_update(
+        {"student_id": student_id},
+        {"$inc": {"total_credits": credits}},
+        projection={"_id": 0, "total_credits": 1, "level": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if student is None:
+        raise HTTPException(status_code=404, detail="Student profile not found")
+
+    total_credits = student.get("total_credits", 0)
+    level = level_for(total_credits)
+    if level > student.get("level", 1):
+        # $max keeps concurrent level-ups monotonic without another read.
+        await db.students.update_one({"student_id": student_id}, {"$max": {"level": level}})
+    principal_cache.invalidate(student_id)
+    return {"total_credits": total_credits, "level": max(level, student.get("level", 1))}
+
+
+async def record_submission(
+    db,
+    student_id: str,
+    course_id: str,
+    result: dict,
+    passed: bool,
+    credits: int,
+    idempotency_key: Optional[str] = None,
+    score_field: str = "score",
+    timestamp_field: str = "updated_at",
+    inc: Optional[dict] = None,
+    not_found: Optional[str] = None,
+) -> dict:
+    """Store a graded attempt and award credits at most once.
+
+    ``result`` is the grading outcome stored on the progress document so a
+    replayed request can return it. Returns a dict with ``status`` set to
+    ``recorded``, ``already_passed`` or ``replayed``. When credits were
+    awarded it also carries ``credits_awarded``, ``total_credits`` and
+    ``level``. A student with no progress document gets a 400 like an
+    unwatched video, or a 404 with ``not_found`` as the detail when given.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    key_filter = {"submission_keys": {"$ne": idempotency_key}} if idempotency_key else {}
+
+    def key_push(stored: dict) -> dict:
+        # Parallel arrays, trimmed alike: the keys back the $ne filter, the results answer replays.
+        return {
+            "submission_keys": {"$each": [idempotency_key], "$slice": -KEEP_SUBMISSION_KEYS},
+            "submission_results": {"$each": [{"key": idempotency_key, "result": stored}], "$slice": -KEEP_SUBMISSION_KEYS},
+        }
+
+    update = {"$set": {
+        "quiz_completed": True,
+        "quiz_passed": passed,
+        score_field: result["score"],
+        "credits_earned": credits if passed else 0,
+        "completed_at": now if passed else None,
+        "last_quiz_result": result,
+        timestamp_field: now
+    }}
+    if inc:
+        update["$inc"] = inc
+    if idempotency_key:
+        update["$push"] = key_push(result)
+
+    applied = await db.progress.find_one_and_update(
+        {
+            "student_id": student_id,
+            "course_id": course_id,
+            "video_completed": True,
+            "quiz_passed": {"$ne": True},
+            **key_filter
+        },
+        update,
+        projection={"_id": 1}
+    )
+
+    if applied is not None:
+        if not passed or credits <= 0:
+            return {"status": "recorded", "credits_awarded": 0}
+        return {"status": "recorded", "credits_awarded": credits, **await _award_credits(db, student_id, credits)}
+
+    # Off the happy path: find out why the conditional update didn't match.
+    progress = await db.progress.find_one(
+        {"student_id": student_id, "course_id": course_id},
+        {"_id": 0, "video_completed": 1, "quiz_passed": 1, "submission_keys": 1, "submission_results": 1}
+    )
+    if not progress and not_found:
+        raise HTTPException(status_code=404, detail=not_found)
+    if not progress or not progress.get("video_completed"):
+        raise HTTPException(status_code=400, detail="Complete the video first")
+
+    if idempotency_key and idempotency_key in progress.get("submission_keys", []):
+        stored = next((r["result"] for r in progress.get("submission_results", []) if r["key"] == idempotency_key), None)
+        return {"status": "replayed", "credits_awarded": 0, "result": stored}
+
+    # Retaking a passed quiz keeps the best score but never awards credits again.
+    retake_result = {**result, "credits_earned": 0}
+    retake = {
+        "$max": {score_field: result["score"]},
+        "$set": {"last_quiz_result": retake_result, timestamp_field: now}
+    }
+    if inc:
+        retake["$inc"] = inc
+    if idempotency_key:
+        retake["$push"] = key_push(retake_result)
+    await db.progress.update_one({"student_id": student_id, "course_id": course_id}, retake)
+    return {"status": "already_passed", "credits_awarded": 0}
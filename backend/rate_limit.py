@@ -0,0 +1,316 @@
+"""Throttling for the unauthenticated auth endpoints.
+
+Every login costs a bcrypt verification and every OTP request a students
+query, so a scripted client can saturate a worker cheaply. RateLimitMiddleware
+sits in front of the routers. It reads the (small) JSON body itself and
+answers 429 with Retry-After before any route, database or crypto work runs.
+The real payloads are tiny, so a body over MAX_BODY_BYTES is answered with
+413 instead of reaching the app without its username or mobile limits.
+
+Each route has one limit per key. ``ip`` is the client address; any other
+key names a field of the JSON body (``username``, ``mobile``, ...) and is
+skipped when the body doesn't carry it. A limit is "<requests>/<seconds>".
+Counting uses a sliding window: the previous fixed window's count is
+weighted by how much of it still overlaps the last ``seconds``. Under the
+IP every attempt counts, including rejected ones, so a client has to back
+off to get through again. Body keys only count attempts that were let
+through. Otherwise anyone could keep a victim's account locked by sending
+its username from other addresses. Concurrent requests can overshoot a
+body-key limit by the number in flight.
+
+Configuration:
+
+    RATE_LIMIT_ENABLED          default 1
+    RATE_LIMIT_STORE            memory (one worker) or mongo (shared by all workers)
+    RATE_LIMIT_MAX_KEYS         memory store size cap (default 100000)
+    RATE_LIMIT_TRUST_FORWARDED  take the client IP from X-Forwarded-For (default 0)
+    RATE_LIMITS                 JSON merged over DEFAULT_LIMITS, e.g.
+                                {"/api/auth/login": {"ip": "30/60", "username": "5/300"}}
+                                (null for a route turns its limits off)
+
+If the Mongo store fails, requests are let through and the error is logged.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    "/api/auth/login": {"ip": "60/60", "username": "10/300", "institution_id": "10/300"},
+    "/api/auth/register": {"ip": "30/600"},
+    "/api/auth/parent/send-otp": {"ip": "20/600", "mobile": "3/600"},
+    "/api/auth/parent/verify-otp": {"ip": "30/600", "mobile": "10/600"},
+}
+
+# Limited routes reject bodies larger than this with 413.
+MAX_BODY_BYTES = 16 * 1024
+
+
+def parse_limit(spec: str) -> tuple:
+    requests, seconds = spec.split("/")
+    return int(requests), float(seconds)
+
+
+def load_limits(overrides: Optional[str] = None) -> dict:
+    limits = {path: dict(keys) for path, keys in DEFAULT_LIMITS.items()}
+    if overrides:
+        for path, keys in json.loads(overrides).items():
+            if keys is None:
+                limits.pop(path, None)
+            else:
+                limits[path] = keys
+    return {
+        path: {key: parse_limit(spec) for key, spec in keys.items()}
+        for path, keys in limits.items()
+    }
+
+
+def _window(now: float, period: float) -> tuple:
+    index = math.floor(now / period)
+    return index, (now - index * period) / period
+
+
+class MemoryRateLimitStore:
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self.evicted = 0
+
+    def _counts(self, key: str, index: int) -> tuple:
+        window, current, previous = self._counters.get(key, (index, 0, 0))
+        if window != index:
+            previous = current if window == index - 1 else 0
+            current = 0
+        return current, previous
+
+    async def peek(self, key: str, period: float, now: float) -> float:
+        """The sliding-window total without counting an attempt."""
+        index, elapsed = _window(now, period)
+        current, previous = self._counts(key, index)
+        return previous * (1 - elapsed) + current
+
+    async def hit(self, key: str, period: float, now: float) -> float:
+        """Count one attempt; return the sliding-window total including it."""
+        index, elapsed = _window(now, period)
+        current, previous = self._counts(key, index)
+        current += 1
+        self._counters.pop(key, None)
+        self._counters[key] = (index, current, previous)
+        while len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+            self.evicted += 1
+        return previous * (1 - elapsed) + current
+
+    def clear(self):
+        self._counters.clear()
+
+    def stats(self) -> dict:
+        return {"store": "memory", "keys": len(self._counters), "max_keys": self.max_keys, "evicted": self.evicted}
+
+
+class MongoRateLimitStore:
+    """One counter document per key and fixed window in ``rate_limits``.
+
+    Documents carry ``expires_at`` two windows out, so the TTL index in
+    indexes.py removes them once they can no longer be the previous window.
+    """
+    collection = "rate_limits"
+
+    def __init__(self, db=None):
+        self._db = db
+
+    def _get_db(self):
+        if self._db is not None:
+            return self._db
+        from database import get_db
+        return get_db()
+
+    async def peek(self, key: str, period: float, now: float) -> float:
+        db = self._get_db()
+        index, elapsed = _window(now, period)
+        counts = {}
+        async for doc in db[self.collection].find({"_id": {"$in": ["%s|%d" % (key, index), "%s|%d" % (key, index - 1)]}}):
+            counts[doc["_id"]] = doc["count"]
+        return counts.get("%s|%d" % (key, index - 1), 0) * (1 - elapsed) + counts.get("%s|%d" % (key, index), 0)
+
+    async def hit(self, key: str, period: float, now: float) -> float:
+        from pymongo import ReturnDocument
+
+        db = self._get_db()
+        index, elapsed = _window(now, period)
+        expires_at = datetime.fromtimestamp((index + 2) * period, timezone.utc) + timedelta(seconds=1)
+        current, previous = await asyncio.gather(
+            db[self.collection].find_one_and_update(
+                {"_id": "%s|%d" % (key, index)},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            ),
+            db[self.collection].find_one({"_id": "%s|%d" % (key, index - 1)}),
+        )
+        return (previous["count"] if previous else 0) * (1 - elapsed) + current["count"]
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"store": "mongo"}
+
+
+class RateLimiter:
+    def __init__(self, limits: dict, store=None, enabled: bool = True, trust_forwarded: bool = False,
+                 clock=time.time):
+        self.limits = limits
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self.enabled = enabled
+        self.trust_forwarded = trust_forwarded
+        self.clock = clock
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def client_ip(self, scope) -> str:
+        if self.trust_forwarded:
+            for name, value in scope.get("headers", []):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def check(self, path: str, ip: str, body: Optional[dict]) -> Optional[int]:
+        """Count the attempt under the route's limits.
+
+        The IP counts every attempt. Body keys are only read here and are
+        counted once the attempt is allowed. Returns None when it is allowed,
+        or the seconds until the busiest exceeded window rolls over.
+        """
+        now = self.clock()
+        retry_after = None
+        allowed_hits = []
+        for key, (requests, period) in self.limits[path].items():
+            if key == "ip":
+                value = ip
+            else:
+                value = body.get(key) if body else None
+                if not isinstance(value, str) or not value:
+                    continue
+            store_key = "%s|%s|%s" % (path, key, value.lower())
+            try:
+                if key == "ip":
+                    count = await self.store.hit(store_key, period, now)
+                else:
+                    # Counted as this attempt, without recording it yet.
+                    count = await self.store.peek(store_key, period, now) + 1
+                    allowed_hits.append((store_key, period))
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Rate limit store failed, letting the request through: %s", e)
+                return None
+            if count > requests:
+                _, elapsed = _window(now, period)
+                wait = max(1, math.ceil(period * (1 - elapsed)))
+                retry_after = max(retry_after or 0, wait)
+        if retry_after is not None:
+            self.rejected += 1
+            return retry_after
+
+        self.allowed += 1
+        for store_key, period in allowed_hits:
+            try:
+                await self.store.hit(store_key, period, now)
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Rate limit store failed to record an attempt: %s", e)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            **self.store.stats(),
+        }
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: Optional["RateLimiter"] = None):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiter or rate_limiter
+        if (scope["type"] != "http" or not limiter.enabled or scope["method"] != "POST"
+                or scope["path"] not in limiter.limits):
+            await self.app(scope, receive, send)
+            return
+
+        # Read at most MAX_BODY_BYTES; a larger body is refused without reading the rest.
+        chunks, size, more_body = [], 0, True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                await self.app(scope, _replay(chunks, False, message, receive), send)
+                return
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more_body = message.get("more_body", False)
+            if size > MAX_BODY_BYTES:
+                response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+                await response(scope, receive, send)
+                return
+
+        body = None
+        try:
+            body = json.loads(b"".join(chunks) or b"null")
+        except ValueError:
+            pass
+        retry_after = await limiter.check(scope["path"], limiter.client_ip(scope), body if isinstance(body, dict) else None)
+        if retry_after is not None:
+            response = JSONResponse(
+                {"detail": "Too many attempts, please try again later"},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, _replay(chunks, False, None, receive), send)
+
+
+def _replay(chunks, more_body, pending, receive):
+    """A receive() that hands the already-read chunks to the app before the live channel."""
+    queue = [{"type": "http.request", "body": b"".join(chunks), "more_body": more_body}]
+    if pending is not None:
+        queue.append(pending)
+
+    async def replay():
+        if queue:
+            return queue.pop(0)
+        return await receive()
+    return replay
+
+
+def make_store(kind: str):
+    if kind == "mongo":
+        return MongoRateLimitStore()
+    if kind != "memory":
+        logger.warning("Unknown RATE_LIMIT_STORE %r, using the in-memory store", kind)
+    return MemoryRateLimitStore(max_keys=int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000")))
+
+
+rate_limiter = RateLimiter(
+    load_limits(os.environ.get("RATE_LIMITS")),
+    store=make_store(os.environ.get("RATE_LIMIT_STORE", "memory")),
+    enabled=os.environ.get("RATE_LIMIT_ENABLED", "1") == "1",
+    trust_forwarded=os.environ.get("RATE_LIMIT_TRUST_FORWARDED", "0") == "1",
+)
@@ -1,24 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, Header
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 from models import UserCreate, User, UserLogin, Token, ParentOTPRequest, ParentOTPVerify
-from auth.jwt_handler import create_access_token, verify_token
-from auth.password import hash_password, verify_password
+from auth.jwt_handler import create_access_token, revoke_token, verify_token
+from auth.password import hash_password_async, verify_password_async, rehash_if_needed
 from auth.otp_service import otp_service
 from typing import Optional
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-async def get_current_user(authorization: Optional[str] = Header(None)):
+async def get_current_user(authorization: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     token = authorization.replace("Bearer ", "")
-    payload = verify_token(token)
+    payload = await verify_token(token, db)
     
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
@@ -30,7 +26,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
     return user
 
 @router.post("/register")
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     existing = await db.users.find_one({"institution_id": user_data.institution_id}, {"_id": 0})
     if existing:
         raise HTTPException(status_code=400, detail="Institution ID already registered")
@@ -41,7 +37,7 @@ async def register(user_data: UserCreate):
     
     user = User(**user_data.model_dump(exclude={"password"}))
     user_dict = user.model_dump()
-    user_dict["password_hash"] = hash_password(user_data.password)
+    user_dict["password_hash"] = await hash_password_async(user_data.password)
     user_dict["created_at"] = user_dict["created_at"].isoformat()
     if user_dict.get("last_login"):
         user_dict["last_login"] = user_dict["last_login"].isoformat()
@@ -66,13 +62,13 @@ async def register(user_data: UserCreate):
     return {"message": "Registration successful", "user_id": user.user_id}
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, db: AsyncIOMotorDatabase = Depends(get_db)):
     user = await db.users.find_one({"institution_id": credentials.institution_id}, {"_id": 0})
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(credentials.password, user["password_hash"]):
+    if not await verify_password_async(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if not user.get("is_active", True):
@@ -84,6 +80,15 @@ async def login(credentials: UserLogin):
         {"$set": {"last_login": datetime.utcnow().isoformat()}}
     )
     
+    # Move the stored hash to the configured bcrypt cost while we have the plain password.
+    # Only if it is still the hash we verified: a concurrent password change must win.
+    new_hash = await rehash_if_needed(credentials.password, user["password_hash"])
+    if new_hash:
+        await db.users.update_one(
+            {"user_id": user["user_id"], "password_hash": user["password_hash"]},
+            {"$set": {"password_hash": new_hash}}
+        )
+    
     token_data = {
         "user_id": user["user_id"],
         "role": user["role"],
@@ -100,13 +105,13 @@ async def login(credentials: UserLogin):
     }
 
 @router.post("/parent/send-otp")
-async def send_parent_otp(request: ParentOTPRequest):
+async def send_parent_otp(request: ParentOTPRequest, db: AsyncIOMotorDatabase = Depends(get_db)):
     students = await db.students.find({"parent_mobile": request.mobile}, {"_id": 0}).to_list(10)
     
     if not students:
         raise HTTPException(status_code=404, detail="No students linked to this mobile number")
     
-    otp = otp_service.generate_otp(request.mobile)
+    otp = await otp_service.generate_otp(db, request.mobile)
     
     return {
         "message": "OTP sent successfully",
@@ -115,8 +120,8 @@ async def send_parent_otp(request: ParentOTPRequest):
     }
 
 @router.post("/parent/verify-otp", response_model=Token)
-async def verify_parent_otp(request: ParentOTPVerify):
-    if not otp_service.verify_otp(request.mobile, request.otp):
+async def verify_parent_otp(request: ParentOTPVerify, db: AsyncIOMotorDatabase = Depends(get_db)):
+    if not await otp_service.verify_otp(db, request.mobile, request.otp):
         raise HTTPException(status_code=401, detail="Invalid or expired OTP")
     
     students = await db.students.find({"parent_mobile": request.mobile}, {"_id": 0}).to_list(10)
@@ -148,8 +153,20 @@ async def verify_parent_otp(request: ParentOTPVerify):
         }
     }
 
+@router.post("/logout")
+async def logout(authorization: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    token = authorization.replace("Bearer ", "")
+    if not await verify_token(token, db):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    await revoke_token(token, db)
+    return {"message": "Logged out"}
+
 @router.get("/me")
-async def get_me(current_user: dict = Depends(get_current_user)):
+async def get_me(current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] == "student":
         student = await db.students.find_one({"user_id": current_user["user_id"]}, {"_id": 0})
         current_user["student_profile"] = student
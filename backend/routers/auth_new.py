@@ -1,35 +1,39 @@
 from fastapi import APIRouter, HTTPException, Depends, Header
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 from models_new import StudentRegister, StudentLogin, StudentModel, Token, ParentOTPRequest, ParentOTPVerify
-from auth.jwt_handler import create_access_token, verify_token
-from auth.password import hash_password, verify_password
+from auth.jwt_handler import create_access_token, revoke_token, verify_token
+from auth.password import hash_password_async, verify_password_async, rehash_if_needed
 from auth.otp_service import otp_service
+from auth.principal_cache import principal_cache
 from typing import Optional
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-async def get_current_student(authorization: Optional[str] = Header(None)):
+async def get_current_student(authorization: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     token = authorization.replace("Bearer ", "")
-    payload = verify_token(token)
+    payload = await verify_token(token, db)
     
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    student = await db.students.find_one({"student_id": payload.get("student_id")}, {"_id": 0, "password_hash": 0})
+    student_id = payload.get("student_id")
+    student = principal_cache.get(student_id)
+    if student is not None:
+        return student
+    
+    student = await db.students.find_one({"student_id": student_id}, {"_id": 0, "password_hash": 0})
     if not student:
         raise HTTPException(status_code=401, detail="Student not found")
     
+    principal_cache.set(student_id, student)
     return student
 
 @router.post("/register")
-async def register_student(data: StudentRegister):
+async def register_student(data: StudentRegister, db: AsyncIOMotorDatabase = Depends(get_db)):
     existing = await db.students.find_one({"username": data.username}, {"_id": 0})
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
@@ -42,7 +46,7 @@ async def register_student(data: StudentRegister):
         name=data.name,
         username=data.username,
         mobile=data.mobile,
-        password_hash=hash_password(data.password),
+        password_hash=await hash_password_async(data.password),
         standard=data.standard
     )
     
@@ -58,15 +62,23 @@ async def register_student(data: StudentRegister):
     }
 
 @router.post("/login", response_model=Token)
-async def login_student(credentials: StudentLogin):
+async def login_student(credentials: StudentLogin, db: AsyncIOMotorDatabase = Depends(get_db)):
     student = await db.students.find_one({"username": credentials.username}, {"_id": 0})
     
     if not student:
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
-    if not verify_password(credentials.password, student["password_hash"]):
+    if not await verify_password_async(credentials.password, student["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
+    # Move the stored hash to the configured bcrypt cost while we have the plain password
+    new_hash = await rehash_if_needed(credentials.password, student["password_hash"])
+    if new_hash:
+        await db.students.update_one(
+            {"student_id": student["student_id"], "password_hash": student["password_hash"]},
+            {"$set": {"password_hash": new_hash}}
+        )
+    
     token_data = {
         "student_id": student["student_id"],
         "username": student["username"],
@@ -83,13 +95,13 @@ async def login_student(credentials: StudentLogin):
     }
 
 @router.post("/parent/send-otp")
-async def send_parent_otp(request: ParentOTPRequest):
+async def send_parent_otp(request: ParentOTPRequest, db: AsyncIOMotorDatabase = Depends(get_db)):
     students = await db.students.find({"mobile": request.mobile}, {"_id": 0, "password_hash": 0}).to_list(10)
     
     if not students:
         raise HTTPException(status_code=404, detail="No students found with this mobile number")
     
-    otp = otp_service.generate_otp(request.mobile)
+    otp = await otp_service.generate_otp(db, request.mobile)
     
     return {
         "message": "OTP sent successfully",
@@ -98,8 +110,8 @@ async def send_parent_otp(request: ParentOTPRequest):
     }
 
 @router.post("/parent/verify-otp", response_model=Token)
-async def verify_parent_otp(request: ParentOTPVerify):
-    if not otp_service.verify_otp(request.mobile, request.otp):
+async def verify_parent_otp(request: ParentOTPVerify, db: AsyncIOMotorDatabase = Depends(get_db)):
+    if not await otp_service.verify_otp(db, request.mobile, request.otp):
         raise HTTPException(status_code=401, detail="Invalid or expired OTP")
     
     students = await db.students.find({"mobile": request.mobile}, {"_id": 0, "password_hash": 0}).to_list(10)
@@ -124,6 +136,18 @@ async def verify_parent_otp(request: ParentOTPVerify):
         }
     }
 
+@router.post("/logout")
+async def logout(authorization: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    token = authorization.replace("Bearer ", "")
+    if not await verify_token(token, db):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    await revoke_token(token, db)
+    return {"message": "Logged out"}
+
 @router.get("/me")
 async def get_me(current_student: dict = Depends(get_current_student)):
     return current_student
@@ -1,21 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Depends, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 from models import CareerRoadmap, Resource
-from typing import List
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
+from pagination import find_page, limit_query, with_next_cursor
+from typing import List, Optional
 
 router = APIRouter(prefix="/career", tags=["Career"])
 
 @router.get("/roadmaps", response_model=List[CareerRoadmap])
-async def get_career_roadmaps():
-    roadmaps = await db.career_roadmaps.find({}, {"_id": 0}).to_list(100)
-    return roadmaps
+async def get_career_roadmaps(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, db: AsyncIOMotorDatabase = Depends(get_db)):
+    roadmaps, next_cursor = await find_page(db.career_roadmaps, {}, [("roadmap_id", 1)], cursor, limit)
+    return with_next_cursor(response, roadmaps, next_cursor, CareerRoadmap)
 
 @router.get("/roadmaps/{roadmap_id}", response_model=CareerRoadmap)
-async def get_roadmap(roadmap_id: str):
+async def get_roadmap(roadmap_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     roadmap = await db.career_roadmaps.find_one({"roadmap_id": roadmap_id}, {"_id": 0})
     if not roadmap:
         raise HTTPException(status_code=404, detail="Roadmap not found")
@@ -1,17 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from catalog import bump_version
+from fast_json import list_response
 from models import Course, CourseCreate, Quiz, QuizCreate
 from routers.auth import get_current_user
 from typing import List
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
 @router.get("", response_model=List[Course])
-async def get_courses(grade_level: str = None, subject: str = None):
+async def get_courses(grade_level: str = None, subject: str = None, db: AsyncIOMotorDatabase = Depends(get_db)):
     query = {}
     if grade_level:
         query["grade_level"] = grade_level
@@ -19,24 +18,24 @@ async def get_courses(grade_level: str = None, subject: str = None):
         query["subject"] = subject
     
     courses = await db.courses.find(query, {"_id": 0}).sort("order", 1).to_list(100)
-    return courses
+    return list_response(courses, model=Course)
 
 @router.get("/{course_id}", response_model=Course)
-async def get_course(course_id: str):
+async def get_course(course_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
 @router.get("/{course_id}/quiz", response_model=Quiz)
-async def get_course_quiz(course_id: str):
+async def get_course_quiz(course_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     quiz = await db.quizzes.find_one({"course_id": course_id}, {"_id": 0})
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found for this course")
     return quiz
 
 @router.post("", response_model=Course)
-async def create_course(course: CourseCreate, current_user: dict = Depends(get_current_user)):
+async def create_course(course: CourseCreate, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] not in ["admin", "teacher"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -45,10 +44,11 @@ async def create_course(course: CourseCreate, current_user: dict = Depends(get_c
     course_dict["created_at"] = course_dict["created_at"].isoformat()
     
     await db.courses.insert_one(course_dict)
+    await bump_version(db)
     return course_obj
 
 @router.post("/quiz", response_model=Quiz)
-async def create_quiz(quiz: QuizCreate, current_user: dict = Depends(get_current_user)):
+async def create_quiz(quiz: QuizCreate, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] not in ["admin", "teacher"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -61,4 +61,5 @@ async def create_quiz(quiz: QuizCreate, current_user: dict = Depends(get_current
     quiz_dict["created_at"] = quiz_dict["created_at"].isoformat()
     
     await db.quizzes.insert_one(quiz_dict)
+    await bump_version(db)
     return quiz_obj
@@ -1,24 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from catalog import course_catalog
+from badge_engine import check_and_award_badges
 from models_new import QuizSubmission
 from routers.auth_new import get_current_student
-from datetime import datetime
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
+from quiz_submission import record_submission
+from heartbeat_buffer import heartbeat_buffer
+from pagination import COURSE_ORDER, limit_query, page_list, with_next_cursor
+from typing import Optional
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
 @router.get("/stats")
-async def get_stats(current_student: dict = Depends(get_current_student)):
+async def get_stats(current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
     progress_list = await db.progress.find(
         {"student_id": current_student["student_id"]},
         {"_id": 0}
     ).to_list(100)
     
     completed_courses = sum(1 for p in progress_list if p.get("quiz_completed"))
-    total_courses = await db.courses.count_documents({"standard": current_student["standard"]})
+    total_courses = await course_catalog.count_for_standard(db, current_student["standard"])
     
     return {
         "name": current_student["name"],
@@ -32,29 +34,29 @@ async def get_stats(current_student: dict = Depends(get_current_student)):
     }
 
 @router.get("")
-async def get_my_courses(current_student: dict = Depends(get_current_student)):
+async def get_my_courses(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
     student_standard = current_student["standard"]
     
-    courses = await db.courses.find(
-        {"standard": student_standard},
-        {"_id": 0}
-    ).to_list(100)
+    courses, next_cursor = page_list(
+        await course_catalog.courses_for_standard(db, student_standard), COURSE_ORDER, cursor, limit
+    )
     
+    # Progress only for the courses on this page
     progress_list = await db.progress.find(
-        {"student_id": current_student["student_id"]},
+        {"student_id": current_student["student_id"], "course_id": {"$in": [c["course_id"] for c in courses]}},
         {"_id": 0}
-    ).to_list(100)
+    ).to_list(None)
     
     progress_map = {p["course_id"]: p for p in progress_list}
     
     for course in courses:
         course["progress"] = progress_map.get(course["course_id"], None)
     
-    return courses
+    return with_next_cursor(response, courses, next_cursor)
 
 @router.get("/{course_id}")
-async def get_course(course_id: str, current_student: dict = Depends(get_current_student)):
-    course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
+async def get_course(course_id: str, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    course = await course_catalog.get_course(db, course_id)
     
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -84,8 +86,8 @@ async def get_course(course_id: str, current_student: dict = Depends(get_current
     return course
 
 @router.post("/complete-video/{course_id}")
-async def complete_video(course_id: str, watch_duration: int, current_student: dict = Depends(get_current_student)):
-    course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
+async def complete_video(course_id: str, watch_duration: int, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    course = await course_catalog.get_course(db, course_id)
     
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -95,21 +97,13 @@ async def complete_video(course_id: str, watch_duration: int, current_student: d
     
     video_completed = watch_duration >= (course["duration_minutes"] * 0.9)
     
-    await db.progress.update_one(
-        {"student_id": current_student["student_id"], "course_id": course_id},
-        {"$set": {
-            "video_completed": video_completed,
-            "watch_duration": watch_duration,
-            "updated_at": datetime.utcnow().isoformat()
-        }},
-        upsert=True
-    )
+    await heartbeat_buffer.record(db, current_student["student_id"], course_id, watch_duration, video_completed)
     
     return {"video_completed": video_completed, "quiz_unlocked": video_completed}
 
 @router.get("/quiz/{course_id}")
-async def get_quiz(course_id: str, current_student: dict = Depends(get_current_student)):
-    course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
+async def get_quiz(course_id: str, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    course = await course_catalog.get_course(db, course_id)
     
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -125,7 +119,7 @@ async def get_quiz(course_id: str, current_student: dict = Depends(get_current_s
     if not progress or not progress.get("video_completed"):
         raise HTTPException(status_code=400, detail="Complete video first")
     
-    quiz = await db.quizzes.find_one({"course_id": course_id}, {"_id": 0})
+    quiz = await course_catalog.get_public_quiz(db, course_id)
     
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -133,64 +127,27 @@ async def get_quiz(course_id: str, current_student: dict = Depends(get_current_s
     return quiz
 
 @router.post("/submit-quiz")
-async def submit_quiz(submission: QuizSubmission, current_student: dict = Depends(get_current_student)):
-    quiz = await db.quizzes.find_one({"quiz_id": submission.quiz_id}, {"_id": 0})
+async def submit_quiz(submission: QuizSubmission, idempotency_key: Optional[str] = Header(None), current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    answer_key = await course_catalog.get_answer_key(db, submission.quiz_id)
     
-    if not quiz:
+    if not answer_key:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    course = await db.courses.find_one({"course_id": quiz["course_id"]}, {"_id": 0})
+    course = await course_catalog.get_course(db, answer_key.course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
     
     if course["standard"] != current_student["standard"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    correct_answers = 0
-    total_questions = len(quiz["questions"])
-    
-    for question in quiz["questions"]:
-        q_text = question["question"]
-        if submission.answers.get(q_text) == question["correct_answer"]:
-            correct_answers += 1
-    
-    score = int((correct_answers / total_questions) * 100)
-    passed = score >= quiz["passing_score"]
+    graded = answer_key.grade(submission.answers)
+    correct_answers = graded["correct_answers"]
+    total_questions = graded["total_questions"]
+    score = graded["score"]
+    passed = score >= answer_key.passing_score
     credits_earned = course["credits"] if passed else 0
     
-    await db.progress.update_one(
-        {"student_id": current_student["student_id"], "course_id": quiz["course_id"]},
-        {"$set": {
-            "quiz_completed": True,
-            "score": score,
-            "credits_earned": credits_earned,
-            "completed_at": datetime.utcnow().isoformat() if passed else None,
-            "updated_at": datetime.utcnow().isoformat()
-        }}
-    )
-    
-    if passed:
-        new_credits = current_student.get("total_credits", 0) + credits_earned
-        new_level = (new_credits // 500) + 1
-        
-        await db.students.update_one(
-            {"student_id": current_student["student_id"]},
-            {"$set": {
-                "total_credits": new_credits,
-                "level": new_level
-            }}
-        )
-        
-        return {
-            "score": score,
-            "total": 100,
-            "passed": passed,
-            "credits_earned": credits_earned,
-            "correct_answers": correct_answers,
-            "total_questions": total_questions,
-            "new_credits": new_credits,
-            "new_level": new_level
-        }
-    
-    return {
+    result = {
         "score": score,
         "total": 100,
         "passed": passed,
@@ -198,4 +155,17 @@ async def submit_quiz(submission: QuizSubmission, current_student: dict = Depend
         "correct_answers": correct_answers,
         "total_questions": total_questions
     }
-
+    
+    outcome = await record_submission(
+        db, current_student["student_id"], answer_key.course_id, result, passed, credits_earned,
+        idempotency_key=idempotency_key or submission.idempotency_key
+    )
+    
+    if outcome["status"] == "replayed":
+        return outcome["result"]
+    
+    if outcome["credits_awarded"]:
+        await check_and_award_badges(db, current_student["student_id"], outcome["total_credits"], outcome["level"])
+        return {**result, "new_credits": outcome["total_credits"], "new_level": outcome["level"]}
+    
+    return {**result, "credits_earned": 0}
@@ -1,14 +1,11 @@
-from fastapi import APIRouter
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
+from fastapi import APIRouter, Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 
 router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 
 @router.get("")
-async def get_leaderboard(institution: str = None, limit: int = 50):
+async def get_leaderboard(institution: str = None, limit: int = 50, db: AsyncIOMotorDatabase = Depends(get_db)):
     pipeline = [
         {
             "$lookup": {
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from models import OfflineQuizBatch
+from offline_grading import grade_and_apply
+from routers.auth import get_current_user
+import os
+
+router = APIRouter(prefix="/offline", tags=["Offline Sync"])
+
+MAX_RECORDS = int(os.environ.get("OFFLINE_BULK_MAX_RECORDS", "5000"))
+
+@router.post("/quiz-submissions")
+async def submit_offline_quizzes(batch: OfflineQuizBatch, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    if current_user["role"] not in ["teacher", "admin"]:
+        raise HTTPException(status_code=403, detail="Only teachers can upload offline submissions")
+
+    if len(batch.records) > MAX_RECORDS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_RECORDS} records per upload")
+
+    results = await grade_and_apply(
+        db, [record.model_dump() for record in batch.records], current_user.get("institution_id")
+    )
+
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+
+    return {"total": len(results), "summary": summary, "results": results}
@@ -1,15 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from query_budget import budget
 from routers.auth import get_current_user
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
 
 router = APIRouter(prefix="/parent", tags=["Parent"])
 
 @router.get("/children")
-async def get_children(current_user: dict = Depends(get_current_user)):
+@budget(4)
+async def get_children(current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "parent":
         raise HTTPException(status_code=403, detail="Only parents can access this")
     
@@ -19,14 +18,19 @@ async def get_children(current_user: dict = Depends(get_current_user)):
         {"_id": 0}
     ).to_list(10)
     
+    users = await db.users.find(
+        {"user_id": {"$in": [s["user_id"] for s in students]}},
+        {"_id": 0, "password_hash": 0}
+    ).to_list(None)
+    users_by_id = {u["user_id"]: u for u in users}
     for student in students:
-        user = await db.users.find_one({"user_id": student["user_id"]}, {"_id": 0, "password_hash": 0})
-        student["user_info"] = user
+        student["user_info"] = users_by_id.get(student["user_id"])
     
     return students
 
 @router.get("/progress/{student_id}")
-async def get_child_progress(student_id: str, current_user: dict = Depends(get_current_user)):
+@budget(5)
+async def get_child_progress(student_id: str, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "parent":
         raise HTTPException(status_code=403, detail="Only parents can access this")
     
@@ -42,9 +46,13 @@ async def get_child_progress(student_id: str, current_user: dict = Depends(get_c
         {"_id": 0}
     ).sort("last_accessed", -1).to_list(50)
     
+    courses = await db.courses.find(
+        {"course_id": {"$in": list({p["course_id"] for p in progress_list})}},
+        {"_id": 0}
+    ).to_list(None)
+    courses_by_id = {c["course_id"]: c for c in courses}
     for progress in progress_list:
-        course = await db.courses.find_one({"course_id": progress["course_id"]}, {"_id": 0})
-        progress["course_info"] = course
+        progress["course_info"] = courses_by_id.get(progress["course_id"])
     
     return {
         "student": student,
@@ -52,7 +60,8 @@ async def get_child_progress(student_id: str, current_user: dict = Depends(get_c
     }
 
 @router.get("/activity/{student_id}")
-async def get_child_activity(student_id: str, current_user: dict = Depends(get_current_user)):
+@budget(6)
+async def get_child_activity(student_id: str, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "parent":
         raise HTTPException(status_code=403, detail="Only parents can access this")
     
@@ -64,8 +73,13 @@ async def get_child_activity(student_id: str, current_user: dict = Depends(get_c
         {"_id": 0}
     ).sort("last_accessed", -1).limit(10).to_list(10)
     
+    courses = await db.courses.find(
+        {"course_id": {"$in": list({p["course_id"] for p in recent_progress})}},
+        {"_id": 0, "course_id": 1, "title": 1}
+    ).to_list(None)
+    courses_by_id = {c["course_id"]: c for c in courses}
     for item in recent_progress:
-        course = await db.courses.find_one({"course_id": item["course_id"]}, {"_id": 0})
+        course = courses_by_id.get(item["course_id"])
         item["course_title"] = course.get("title") if course else "Unknown Course"
     
     recent_badges = await db.student_badges.find(
@@ -73,8 +87,13 @@ async def get_child_activity(student_id: str, current_user: dict = Depends(get_c
         {"_id": 0}
     ).sort("earned_at", -1).limit(5).to_list(5)
     
+    badges = await db.badges.find(
+        {"badge_id": {"$in": list({b["badge_id"] for b in recent_badges})}},
+        {"_id": 0, "badge_id": 1, "name": 1, "icon": 1}
+    ).to_list(None)
+    badges_by_id = {b["badge_id"]: b for b in badges}
     for item in recent_badges:
-        badge = await db.badges.find_one({"badge_id": item["badge_id"]}, {"_id": 0})
+        badge = badges_by_id.get(item["badge_id"])
         item["badge_name"] = badge.get("name") if badge else "Unknown Badge"
         item["badge_icon"] = badge.get("icon") if badge else ""
     
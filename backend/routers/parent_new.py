@@ -1,20 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends, Header
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 from typing import Optional
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
 
 router = APIRouter(prefix="/parent", tags=["Parent"])
 
-async def get_current_parent(authorization: Optional[str] = Header(None)):
+async def get_current_parent(authorization: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     from auth.jwt_handler import verify_token
     token = authorization.replace("Bearer ", "")
-    payload = verify_token(token)
+    payload = await verify_token(token, db)
     
     if not payload or payload.get("role") != "parent":
         raise HTTPException(status_code=401, detail="Invalid parent token")
@@ -22,7 +19,7 @@ async def get_current_parent(authorization: Optional[str] = Header(None)):
     return payload
 
 @router.get("/children")
-async def get_children(current_parent: dict = Depends(get_current_parent)):
+async def get_children(current_parent: dict = Depends(get_current_parent), db: AsyncIOMotorDatabase = Depends(get_db)):
     mobile = current_parent["parent_mobile"]
     
     students = await db.students.find(
@@ -46,7 +43,7 @@ async def get_children(current_parent: dict = Depends(get_current_parent)):
     return students
 
 @router.get("/child-progress/{student_id}")
-async def get_child_progress(student_id: str, current_parent: dict = Depends(get_current_parent)):
+async def get_child_progress(student_id: str, current_parent: dict = Depends(get_current_parent), db: AsyncIOMotorDatabase = Depends(get_db)):
     if student_id not in current_parent.get("student_ids", []):
         raise HTTPException(status_code=403, detail="Not authorized to view this student")
     
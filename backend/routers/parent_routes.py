@@ -1,21 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, Header
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from query_budget import budget
+from catalog import course_catalog
 from typing import Optional
 from datetime import datetime, timezone
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
 
 router = APIRouter(prefix="/parent", tags=["Parent"])
 
-async def get_current_parent(authorization: Optional[str] = Header(None)):
+async def get_current_parent(authorization: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     from auth.jwt_handler import verify_token
     token = authorization.replace("Bearer ", "")
-    payload = verify_token(token)
+    payload = await verify_token(token, db)
     
     if not payload or payload.get("role") != "parent":
         raise HTTPException(status_code=401, detail="Invalid parent token")
@@ -24,25 +23,39 @@ async def get_current_parent(authorization: Optional[str] = Header(None)):
 
 
 @router.get("/children")
-async def get_children(current_parent: dict = Depends(get_current_parent)):
+# One aggregate, plus up to three when the course catalog reloads and a revocation check.
+@budget(5)
+async def get_children(current_parent: dict = Depends(get_current_parent), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get all children linked to parent's mobile number"""
     mobile = current_parent["parent_mobile"]
     
-    students = await db.students.find(
-        {"mobile": mobile},
-        {"_id": 0, "password_hash": 0}
-    ).to_list(10)
+    # One round trip: each child with its passed-quiz count, joined server-side
+    students = await db.students.aggregate([
+        {"$match": {"mobile": mobile}},
+        {"$limit": 10},
+        {"$lookup": {
+            "from": "progress",
+            "localField": "student_id",
+            "foreignField": "student_id",
+            "as": "progress"
+        }},
+        {"$addFields": {"completed_courses": {"$size": {"$filter": {
+            "input": "$progress",
+            "as": "p",
+            "cond": {"$eq": ["$$p.quiz_passed", True]}
+        }}}}},
+        {"$project": {"_id": 0, "password_hash": 0, "progress": 0}}
+    ]).to_list(10)
+    
+    # Course totals come from the in-memory catalog, once per standard
+    totals = {}
+    for standard in {s.get("standard") for s in students}:
+        totals[standard] = await course_catalog.count_for_standard(db, standard)
     
     children = []
     for student in students:
-        # Get progress stats
-        progress_list = await db.progress.find(
-            {"student_id": student["student_id"]},
-            {"_id": 0}
-        ).to_list(100)
-        
-        completed = sum(1 for p in progress_list if p.get("quiz_passed"))
-        total = await db.courses.count_documents({"standard": student["standard"]})
+        completed = student["completed_courses"]
+        total = totals[student.get("standard")]
         
         children.append({
             "student_id": student["student_id"],
@@ -65,7 +78,8 @@ async def get_children(current_parent: dict = Depends(get_current_parent)):
 
 
 @router.get("/progress/{student_id}")
-async def get_child_progress(student_id: str, current_parent: dict = Depends(get_current_parent)):
+@budget(4)
+async def get_child_progress(student_id: str, current_parent: dict = Depends(get_current_parent), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get detailed progress for a specific child"""
     if student_id not in current_parent.get("student_ids", []):
         raise HTTPException(status_code=403, detail="Not authorized to view this student")
@@ -84,12 +98,13 @@ async def get_child_progress(student_id: str, current_parent: dict = Depends(get
     ).sort("updated_at", -1).to_list(50)
     
     # Add course info to each progress item
+    courses = await db.courses.find(
+        {"course_id": {"$in": list({p["course_id"] for p in progress_list})}},
+        {"_id": 0}
+    ).to_list(None)
+    courses_by_id = {c["course_id"]: c for c in courses}
     for progress in progress_list:
-        course = await db.courses.find_one(
-            {"course_id": progress["course_id"]},
-            {"_id": 0}
-        )
-        progress["course_info"] = course
+        progress["course_info"] = courses_by_id.get(progress["course_id"])
     
     return {
         "student": {
@@ -106,7 +121,8 @@ async def get_child_progress(student_id: str, current_parent: dict = Depends(get
 
 
 @router.get("/activity/{student_id}")
-async def get_child_activity(student_id: str, current_parent: dict = Depends(get_current_parent)):
+@budget(5)
+async def get_child_activity(student_id: str, current_parent: dict = Depends(get_current_parent), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get recent activity for a specific child"""
     if student_id not in current_parent.get("student_ids", []):
         raise HTTPException(status_code=403, detail="Not authorized to view this student")
@@ -117,12 +133,15 @@ async def get_child_activity(student_id: str, current_parent: dict = Depends(get
         {"_id": 0}
     ).sort("updated_at", -1).to_list(10)
     
+    courses = await db.courses.find(
+        {"course_id": {"$in": list({p["course_id"] for p in progress_list})}},
+        {"_id": 0}
+    ).to_list(None)
+    courses_by_id = {c["course_id"]: c for c in courses}
+    
     recent_courses = []
     for progress in progress_list:
-        course = await db.courses.find_one(
-            {"course_id": progress["course_id"]},
-            {"_id": 0}
-        )
+        course = courses_by_id.get(progress["course_id"])
         if course:
             recent_courses.append({
                 "course_id": progress["course_id"],
@@ -142,12 +161,15 @@ async def get_child_activity(student_id: str, current_parent: dict = Depends(get
         {"_id": 0}
     ).sort("earned_at", -1).to_list(10)
     
+    badges = await db.badges.find(
+        {"badge_id": {"$in": list({sb["badge_id"] for sb in student_badges})}},
+        {"_id": 0}
+    ).to_list(None)
+    badges_by_id = {b["badge_id"]: b for b in badges}
+    
     recent_badges = []
     for sb in student_badges:
-        badge = await db.badges.find_one(
-            {"badge_id": sb["badge_id"]},
-            {"_id": 0}
-        )
+        badge = badges_by_id.get(sb["badge_id"])
         if badge:
             recent_badges.append({
                 "badge_id": badge["badge_id"],
@@ -1,18 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from badge_engine import check_and_award_badges
+from catalog import course_catalog
+from quiz_submission import record_submission
+from pagination import find_page, limit_query, with_next_cursor
+from heartbeat_buffer import heartbeat_buffer
 from models import Progress, ProgressUpdate, QuizSubmission
 from routers.auth import get_current_user
-from datetime import datetime
-from typing import List
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
+from typing import List, Optional
 
 router = APIRouter(prefix="/progress", tags=["Progress"])
 
 @router.post("/start")
-async def start_course(course_id: str, current_user: dict = Depends(get_current_user)):
+async def start_course(course_id: str, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students can start courses")
     
@@ -42,7 +43,7 @@ async def start_course(course_id: str, current_user: dict = Depends(get_current_
     return {"message": "Course started", "progress": progress_dict}
 
 @router.put("/video-complete")
-async def complete_video(course_id: str, watch_duration: int, current_user: dict = Depends(get_current_user)):
+async def complete_video(course_id: str, watch_duration: int, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students can update progress")
     
@@ -64,13 +65,9 @@ async def complete_video(course_id: str, watch_duration: int, current_user: dict
     
     video_completed = watch_duration >= (course["duration_minutes"] * 0.9)
     
-    await db.progress.update_one(
-        {"student_id": student["student_id"], "course_id": course_id},
-        {"$set": {
-            "video_completed": video_completed,
-            "watch_duration": watch_duration,
-            "last_accessed": datetime.utcnow().isoformat()
-        }}
+    await heartbeat_buffer.record(
+        db, student["student_id"], course_id, watch_duration, video_completed,
+        timestamp_field="last_accessed", upsert=False
     )
     
     return {
@@ -80,7 +77,7 @@ async def complete_video(course_id: str, watch_duration: int, current_user: dict
     }
 
 @router.post("/submit-quiz")
-async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(get_current_user)):
+async def submit_quiz(submission: QuizSubmission, idempotency_key: Optional[str] = Header(None), current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students can submit quizzes")
     
@@ -88,95 +85,44 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
     
-    quiz = await db.quizzes.find_one({"quiz_id": submission.quiz_id}, {"_id": 0})
-    if not quiz:
+    answer_key = await course_catalog.get_answer_key(db, submission.quiz_id)
+    if not answer_key:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    progress = await db.progress.find_one({
-        "student_id": student["student_id"],
-        "course_id": quiz["course_id"]
-    }, {"_id": 0})
-    
-    if not progress:
-        raise HTTPException(status_code=404, detail="Progress not found")
-    
-    if not progress.get("video_completed"):
-        raise HTTPException(status_code=400, detail="Complete the video first")
-    
-    score = 0
-    for question in quiz["questions"]:
-        question_id = question["question"]
-        if submission.answers.get(question_id) == question["correct_answer"]:
-            score += question["marks"]
+    score = answer_key.grade(submission.answers)["marks"]
+    quiz_passed = score >= answer_key.passing_marks
     
-    quiz_passed = score >= quiz["passing_marks"]
-    
-    course = await db.courses.find_one({"course_id": quiz["course_id"]}, {"_id": 0})
+    course = await course_catalog.get_course(db, answer_key.course_id)
     credits_earned = course["credits"] if quiz_passed else 0
     
-    await db.progress.update_one(
-        {"student_id": student["student_id"], "course_id": quiz["course_id"]},
-        {"$set": {
-            "quiz_attempts": progress.get("quiz_attempts", 0) + 1,
-            "quiz_passed": quiz_passed,
-            "quiz_score": score,
-            "credits_earned": credits_earned,
-            "completed_at": datetime.utcnow().isoformat() if quiz_passed else None,
-            "last_accessed": datetime.utcnow().isoformat()
-        }}
-    )
-    
-    if quiz_passed:
-        new_credits = student.get("total_credits", 0) + credits_earned
-        new_level = (new_credits // 500) + 1
-        
-        await db.students.update_one(
-            {"student_id": student["student_id"]},
-            {"$set": {
-                "total_credits": new_credits,
-                "level": new_level
-            }}
-        )
-        
-        await check_and_award_badges(student["student_id"], new_credits, new_level)
-    
-    return {
+    result = {
         "score": score,
-        "total": quiz["total_marks"],
+        "total": answer_key.total_marks,
         "passed": quiz_passed,
         "credits_earned": credits_earned,
         "message": "Congratulations! You passed!" if quiz_passed else "Keep trying!"
     }
-
-async def check_and_award_badges(student_id: str, total_credits: int, level: int):
-    badges = await db.badges.find({}, {"_id": 0}).to_list(100)
-    
-    for badge in badges:
-        already_earned = await db.student_badges.find_one({
-            "student_id": student_id,
-            "badge_id": badge["badge_id"]
-        })
-        
-        if already_earned:
-            continue
-        
-        criteria = badge["criteria"]
-        should_award = False
-        
-        if criteria["type"] == "credits" and total_credits >= criteria["threshold"]:
-            should_award = True
-        elif criteria["type"] == "level" and level >= criteria["threshold"]:
-            should_award = True
-        
-        if should_award:
-            from models import StudentBadge
-            student_badge = StudentBadge(student_id=student_id, badge_id=badge["badge_id"])
-            badge_dict = student_badge.model_dump()
-            badge_dict["earned_at"] = badge_dict["earned_at"].isoformat()
-            await db.student_badges.insert_one(badge_dict)
+    
+    outcome = await record_submission(
+        db, student["student_id"], answer_key.course_id, result, quiz_passed, credits_earned,
+        idempotency_key=idempotency_key or submission.idempotency_key,
+        score_field="quiz_score",
+        timestamp_field="last_accessed",
+        inc={"quiz_attempts": 1},
+        not_found="Progress not found"
+    )
+    
+    if outcome["status"] == "replayed":
+        return outcome["result"]
+    
+    if outcome["credits_awarded"]:
+        await check_and_award_badges(db, student["student_id"], outcome["total_credits"], outcome["level"])
+        return result
+    
+    return {**result, "credits_earned": 0}
 
 @router.get("/my-progress", response_model=List[Progress])
-async def get_my_progress(current_user: dict = Depends(get_current_user)):
+async def get_my_progress(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students can view progress")
     
@@ -184,9 +130,8 @@ async def get_my_progress(current_user: dict = Depends(get_current_user)):
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
     
-    progress_list = await db.progress.find(
-        {"student_id": student["student_id"]},
-        {"_id": 0}
-    ).to_list(100)
+    progress_list, next_cursor = await find_page(
+        db.progress, {"student_id": student["student_id"]}, [("course_id", 1)], cursor, limit
+    )
     
-    return progress_list
+    return with_next_cursor(response, progress_list, next_cursor, Progress)
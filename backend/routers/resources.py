@@ -1,16 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Depends, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 from models import Resource
-from typing import List
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
+from pagination import find_page, limit_query, with_next_cursor
+from typing import List, Optional
 
 router = APIRouter(prefix="/resources", tags=["Resources"])
 
 @router.get("", response_model=List[Resource])
-async def get_resources(grade_level: str = None, type: str = None, subject: str = None):
+async def get_resources(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, grade_level: str = None, type: str = None, subject: str = None, db: AsyncIOMotorDatabase = Depends(get_db)):
     query = {}
     if grade_level:
         query["grade_level"] = grade_level
@@ -19,11 +17,11 @@ async def get_resources(grade_level: str = None, type: str = None, subject: str
     if subject:
         query["subject"] = subject
     
-    resources = await db.resources.find(query, {"_id": 0}).to_list(100)
-    return resources
+    resources, next_cursor = await find_page(db.resources, query, [("resource_id", 1)], cursor, limit)
+    return with_next_cursor(response, resources, next_cursor, Resource)
 
 @router.get("/{resource_id}", response_model=Resource)
-async def get_resource(resource_id: str):
+async def get_resource(resource_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     resource = await db.resources.find_one({"resource_id": resource_id}, {"_id": 0})
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
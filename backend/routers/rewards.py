@@ -1,22 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Depends, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 from models import Badge, Certificate
 from routers.auth import get_current_user
-from typing import List
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
+from pagination import find_page, limit_query, with_next_cursor
+from typing import List, Optional
 
 router = APIRouter(prefix="/rewards", tags=["Rewards"])
 
 @router.get("/badges", response_model=List[Badge])
-async def get_all_badges():
-    badges = await db.badges.find({}, {"_id": 0}).to_list(100)
-    return badges
+async def get_all_badges(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, db: AsyncIOMotorDatabase = Depends(get_db)):
+    badges, next_cursor = await find_page(db.badges, {}, [("badge_id", 1)], cursor, limit)
+    return with_next_cursor(response, badges, next_cursor, Badge)
 
 @router.get("/my-badges")
-async def get_my_badges(current_user: dict = Depends(get_current_user)):
+async def get_my_badges(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students have badges")
     
@@ -24,27 +22,26 @@ async def get_my_badges(current_user: dict = Depends(get_current_user)):
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
     
-    student_badges = await db.student_badges.find(
-        {"student_id": student["student_id"]},
-        {"_id": 0}
-    ).to_list(100)
+    student_badges, next_cursor = await find_page(
+        db.student_badges, {"student_id": student["student_id"]}, [("badge_id", 1)], cursor, limit
+    )
     
     badge_ids = [sb["badge_id"] for sb in student_badges]
     badges = await db.badges.find(
         {"badge_id": {"$in": badge_ids}},
         {"_id": 0}
-    ).to_list(100)
+    ).to_list(None)
     
-    for badge in badges:
-        for sb in student_badges:
-            if sb["badge_id"] == badge["badge_id"]:
-                badge["earned_at"] = sb["earned_at"]
-                break
+    badges_by_id = {b["badge_id"]: b for b in badges}
+    badges = []
+    for sb in student_badges:
+        if sb["badge_id"] in badges_by_id:
+            badges.append({**badges_by_id[sb["badge_id"]], "earned_at": sb["earned_at"]})
     
-    return badges
+    return with_next_cursor(response, badges, next_cursor)
 
 @router.get("/certificates")
-async def get_my_certificates(current_user: dict = Depends(get_current_user)):
+async def get_my_certificates(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students have certificates")
     
@@ -52,15 +49,14 @@ async def get_my_certificates(current_user: dict = Depends(get_current_user)):
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
     
-    certificates = await db.certificates.find(
-        {"student_id": student["student_id"]},
-        {"_id": 0}
-    ).to_list(100)
+    certificates, next_cursor = await find_page(
+        db.certificates, {"student_id": student["student_id"]}, [("certificate_id", 1)], cursor, limit
+    )
     
-    return certificates
+    return with_next_cursor(response, certificates, next_cursor)
 
 @router.get("/stats")
-async def get_stats(current_user: dict = Depends(get_current_user)):
+async def get_stats(current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
     if current_user["role"] != "student":
         raise HTTPException(status_code=403, detail="Only students have stats")
     
@@ -1,36 +1,45 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from catalog import course_catalog
+from badge_engine import check_and_award_badges
+from quiz_submission import record_submission
+from heartbeat_buffer import heartbeat_buffer
+from pagination import COURSE_ORDER, find_page, limit_query, page_list, with_next_cursor
+from auth.principal_cache import principal_cache
 from typing import Optional, List
 from datetime import datetime, timezone
-import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
 
 router = APIRouter(tags=["Student"])
 
-async def get_current_student(authorization: Optional[str] = Header(None)):
+async def get_current_student(authorization: Optional[str] = Header(None), db: AsyncIOMotorDatabase = Depends(get_db)):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     from auth.jwt_handler import verify_token
     token = authorization.replace("Bearer ", "")
-    payload = verify_token(token)
+    payload = await verify_token(token, db)
     
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    student = await db.students.find_one({"student_id": payload.get("student_id")}, {"_id": 0, "password_hash": 0})
+    student_id = payload.get("student_id")
+    student = principal_cache.get(student_id)
+    if student is not None:
+        return student
+    
+    student = await db.students.find_one({"student_id": student_id}, {"_id": 0, "password_hash": 0})
     if not student:
         raise HTTPException(status_code=401, detail="Student not found")
     
+    principal_cache.set(student_id, student)
     return student
 
 
 # ============ PROGRESS ROUTES ============
 @router.post("/progress/start")
-async def start_course(course_id: str, current_student: dict = Depends(get_current_student)):
-    course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
+async def start_course(course_id: str, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    course = await course_catalog.get_course(db, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
@@ -63,22 +72,15 @@ async def start_course(course_id: str, current_student: dict = Depends(get_curre
 
 
 @router.put("/progress/video-complete")
-async def complete_video(course_id: str, watch_duration: int, current_student: dict = Depends(get_current_student)):
-    course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
+async def complete_video(course_id: str, watch_duration: int, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    course = await course_catalog.get_course(db, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
     video_completed = watch_duration >= (course.get("duration_minutes", 10) * 0.9)
     
-    await db.progress.update_one(
-        {"student_id": current_student["student_id"], "course_id": course_id},
-        {"$set": {
-            "video_completed": video_completed,
-            "watch_duration": watch_duration,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }},
-        upsert=True
-    )
+    # Completion is written now so the quiz unlocks; plain heartbeats are coalesced
+    await heartbeat_buffer.record(db, current_student["student_id"], course_id, watch_duration, video_completed)
     
     return {
         "message": "Video progress updated",
@@ -88,80 +90,28 @@ async def complete_video(course_id: str, watch_duration: int, current_student: d
 
 
 @router.post("/progress/submit-quiz")
-async def submit_quiz(submission: dict, current_student: dict = Depends(get_current_student)):
+async def submit_quiz(submission: dict, idempotency_key: Optional[str] = Header(None), current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
     quiz_id = submission.get("quiz_id")
     answers = submission.get("answers", {})
+    idempotency_key = idempotency_key or submission.get("idempotency_key")
     
-    quiz = await db.quizzes.find_one({"quiz_id": quiz_id}, {"_id": 0})
-    if not quiz:
+    answer_key = await course_catalog.get_answer_key(db, quiz_id)
+    if not answer_key:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    course = await db.courses.find_one({"course_id": quiz["course_id"]}, {"_id": 0})
+    course = await course_catalog.get_course(db, answer_key.course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    # Check video completion
-    progress = await db.progress.find_one({
-        "student_id": current_student["student_id"],
-        "course_id": quiz["course_id"]
-    }, {"_id": 0})
-    
-    if not progress or not progress.get("video_completed"):
-        raise HTTPException(status_code=400, detail="Complete the video first")
-    
     # Calculate score
-    correct_answers = 0
-    total_questions = len(quiz["questions"])
-    
-    for question in quiz["questions"]:
-        q_text = question["question"]
-        if answers.get(q_text) == question["correct_answer"]:
-            correct_answers += 1
-    
-    score = int((correct_answers / total_questions) * 100) if total_questions > 0 else 0
-    passed = score >= quiz.get("passing_score", 60)
+    graded = answer_key.grade(answers)
+    correct_answers = graded["correct_answers"]
+    total_questions = graded["total_questions"]
+    score = graded["score"]
+    passed = score >= answer_key.passing_score
     credits_earned = course.get("credits", 10) if passed else 0
     
-    # Update progress
-    await db.progress.update_one(
-        {"student_id": current_student["student_id"], "course_id": quiz["course_id"]},
-        {"$set": {
-            "quiz_completed": True,
-            "quiz_passed": passed,
-            "score": score,
-            "credits_earned": credits_earned,
-            "completed_at": datetime.now(timezone.utc).isoformat() if passed else None,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
-    
-    if passed:
-        new_credits = current_student.get("total_credits", 0) + credits_earned
-        new_level = (new_credits // 500) + 1
-        
-        await db.students.update_one(
-            {"student_id": current_student["student_id"]},
-            {"$set": {
-                "total_credits": new_credits,
-                "level": new_level
-            }}
-        )
-        
-        # Award badges
-        await check_and_award_badges(current_student["student_id"], new_credits, new_level)
-        
-        return {
-            "score": score,
-            "total": 100,
-            "passed": passed,
-            "credits_earned": credits_earned,
-            "correct_answers": correct_answers,
-            "total_questions": total_questions,
-            "new_credits": new_credits,
-            "new_level": new_level
-        }
-    
-    return {
+    result = {
         "score": score,
         "total": 100,
         "passed": passed,
@@ -169,52 +119,35 @@ async def submit_quiz(submission: dict, current_student: dict = Depends(get_curr
         "correct_answers": correct_answers,
         "total_questions": total_questions
     }
-
-
-async def check_and_award_badges(student_id: str, total_credits: int, level: int):
-    badges = await db.badges.find({}, {"_id": 0}).to_list(100)
-    
-    for badge in badges:
-        already_earned = await db.student_badges.find_one({
-            "student_id": student_id,
-            "badge_id": badge["badge_id"]
-        })
-        
-        if already_earned:
-            continue
-        
-        criteria = badge.get("criteria", {})
-        should_award = False
-        
-        if criteria.get("type") == "credits" and total_credits >= criteria.get("threshold", 0):
-            should_award = True
-        elif criteria.get("type") == "level" and level >= criteria.get("threshold", 0):
-            should_award = True
-        
-        if should_award:
-            import uuid
-            student_badge = {
-                "id": str(uuid.uuid4()),
-                "student_id": student_id,
-                "badge_id": badge["badge_id"],
-                "earned_at": datetime.now(timezone.utc).isoformat()
-            }
-            await db.student_badges.insert_one(student_badge)
+    
+    # Video check, progress update and credit award happen atomically in here
+    outcome = await record_submission(
+        db, current_student["student_id"], answer_key.course_id, result, passed, credits_earned,
+        idempotency_key=idempotency_key
+    )
+    
+    if outcome["status"] == "replayed":
+        return outcome["result"]
+    
+    if outcome["credits_awarded"]:
+        await check_and_award_badges(db, current_student["student_id"], outcome["total_credits"], outcome["level"])
+        return {**result, "new_credits": outcome["total_credits"], "new_level": outcome["level"]}
+    
+    return {**result, "credits_earned": 0}
 
 
 @router.get("/progress/my-progress")
-async def get_my_progress(current_student: dict = Depends(get_current_student)):
-    progress_list = await db.progress.find(
-        {"student_id": current_student["student_id"]},
-        {"_id": 0}
-    ).to_list(100)
+async def get_my_progress(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    progress_list, next_cursor = await find_page(
+        db.progress, {"student_id": current_student["student_id"]}, [("course_id", 1)], cursor, limit
+    )
     
-    return progress_list
+    return with_next_cursor(response, progress_list, next_cursor)
 
 
 # ============ REWARDS ROUTES ============
 @router.get("/rewards/stats")
-async def get_stats(current_student: dict = Depends(get_current_student)):
+async def get_stats(current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
     completed_courses = await db.progress.count_documents({
         "student_id": current_student["student_id"],
         "quiz_passed": True
@@ -237,11 +170,10 @@ async def get_stats(current_student: dict = Depends(get_current_student)):
 
 
 @router.get("/rewards/my-badges")
-async def get_my_badges(current_student: dict = Depends(get_current_student)):
-    student_badges = await db.student_badges.find(
-        {"student_id": current_student["student_id"]},
-        {"_id": 0}
-    ).to_list(100)
+async def get_my_badges(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    student_badges, next_cursor = await find_page(
+        db.student_badges, {"student_id": current_student["student_id"]}, [("badge_id", 1)], cursor, limit
+    )
     
     badge_ids = [sb["badge_id"] for sb in student_badges]
     
@@ -251,43 +183,43 @@ async def get_my_badges(current_student: dict = Depends(get_current_student)):
     badges = await db.badges.find(
         {"badge_id": {"$in": badge_ids}},
         {"_id": 0}
-    ).to_list(100)
+    ).to_list(None)
     
-    for badge in badges:
-        for sb in student_badges:
-            if sb["badge_id"] == badge["badge_id"]:
-                badge["earned_at"] = sb["earned_at"]
-                break
+    badges_by_id = {b["badge_id"]: b for b in badges}
+    badges = []
+    for sb in student_badges:
+        if sb["badge_id"] in badges_by_id:
+            badges.append({**badges_by_id[sb["badge_id"]], "earned_at": sb["earned_at"]})
     
-    return badges
+    return with_next_cursor(response, badges, next_cursor)
 
 
 # ============ COURSES ROUTES ============
 @router.get("/courses")
-async def get_my_courses(current_student: dict = Depends(get_current_student)):
+async def get_my_courses(response: Response, limit: int = limit_query(), cursor: Optional[str] = None, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
     student_standard = current_student["standard"]
     
-    courses = await db.courses.find(
-        {"standard": student_standard},
-        {"_id": 0}
-    ).to_list(100)
+    courses, next_cursor = page_list(
+        await course_catalog.courses_for_standard(db, student_standard), COURSE_ORDER, cursor, limit
+    )
     
+    # Progress only for the courses on this page
     progress_list = await db.progress.find(
-        {"student_id": current_student["student_id"]},
+        {"student_id": current_student["student_id"], "course_id": {"$in": [c["course_id"] for c in courses]}},
         {"_id": 0}
-    ).to_list(100)
+    ).to_list(None)
     
     progress_map = {p["course_id"]: p for p in progress_list}
     
     for course in courses:
         course["progress"] = progress_map.get(course["course_id"], None)
     
-    return courses
+    return with_next_cursor(response, courses, next_cursor)
 
 
 @router.get("/courses/{course_id}")
-async def get_course(course_id: str, current_student: dict = Depends(get_current_student)):
-    course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
+async def get_course(course_id: str, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    course = await course_catalog.get_course(db, course_id)
     
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -323,8 +255,8 @@ async def get_course(course_id: str, current_student: dict = Depends(get_current
 
 
 @router.get("/courses/{course_id}/quiz")
-async def get_quiz(course_id: str, current_student: dict = Depends(get_current_student)):
-    course = await db.courses.find_one({"course_id": course_id}, {"_id": 0})
+async def get_quiz(course_id: str, current_student: dict = Depends(get_current_student), db: AsyncIOMotorDatabase = Depends(get_db)):
+    course = await course_catalog.get_course(db, course_id)
     
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -340,7 +272,7 @@ async def get_quiz(course_id: str, current_student: dict = Depends(get_current_s
     if not progress or not progress.get("video_completed"):
         raise HTTPException(status_code=400, detail="Complete video first")
     
-    quiz = await db.quizzes.find_one({"course_id": course_id}, {"_id": 0})
+    quiz = await course_catalog.get_public_quiz(db, course_id)
     
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
@@ -1,47 +1,154 @@
-from fastapi import APIRouter, HTTPException, Depends
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from query_budget import budget
 from routers.auth import get_current_user
+from pagination import after, decode_cursor, page
+from catalog import course_catalog
+from class_analytics import refresh_institution
+import progress_export
+from typing import Optional
 import os
-
-client = AsyncIOMotorClient(os.environ['MONGO_URL'])
-db = client[os.environ['DB_NAME']]
+import time
 
 router = APIRouter(prefix="/teacher", tags=["Teacher"])
 
+ROSTER_SORTS = {
+    "name": [("full_name", 1), ("user_id", 1)],
+    "credits": [("total_credits", -1), ("user_id", 1)],
+}
+
+ROSTER_STATS_TTL_SECONDS = float(os.environ.get("ROSTER_STATS_TTL_SECONDS", "60"))
+
+# institution_id -> (expires_at, totals); the stats are institution-wide, so every page shares them.
+roster_stats_cache = {}
+
+
+async def roster_stats(db, institution_id: str) -> dict:
+    cached = roster_stats_cache.get(institution_id)
+    if cached and time.monotonic() < cached[0]:
+        return cached[1]
+    
+    result = await db.users.aggregate([
+        {"$match": {"role": "student", "institution_id": institution_id}},
+        {"$lookup": {"from": "students", "localField": "user_id", "foreignField": "user_id", "as": "student"}},
+        {"$unwind": "$student"},
+        {"$group": {
+            "_id": None,
+            "total_students": {"$sum": 1},
+            "active_students": {"$sum": {"$cond": [{"$gt": ["$student.total_credits", 0]}, 1, 0]}},
+            "total_credits": {"$sum": {"$ifNull": ["$student.total_credits", 0]}}
+        }}
+    ]).to_list(1)
+    totals = result[0] if result else {"total_students": 0, "active_students": 0, "total_credits": 0}
+    roster_stats_cache[institution_id] = (time.monotonic() + ROSTER_STATS_TTL_SECONDS, totals)
+    return totals
+
 @router.get("/students")
-async def get_teacher_students(current_user: dict = Depends(get_current_user)):
+@budget(7)
+async def get_teacher_students(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sort: str = Query("name", pattern="^(name|credits)$"),
+    grade: Optional[str] = None,
+    stream: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
     if current_user["role"] != "teacher":
         raise HTTPException(status_code=403, detail="Only teachers can access this")
     
     teacher_institution = current_user.get("institution_id")
+    order = ROSTER_SORTS[sort]
+    keyset = after(order, decode_cursor(cursor, order))
+    
+    filters = {}
+    if grade:
+        filters["grade"] = grade
+    if stream:
+        filters["stream"] = stream
+    
+    join = [
+        {"$lookup": {
+            "from": "students",
+            "localField": "user_id",
+            "foreignField": "user_id",
+            "as": "student"
+        }},
+        {"$unwind": "$student"},
+        {"$addFields": {
+            "grade": "$student.grade",
+            "stream": "$student.stream",
+            "total_credits": {"$ifNull": ["$student.total_credits", 0]},
+            "level": {"$ifNull": ["$student.level", 1]}
+        }},
+    ]
+    members = {"role": "student", "institution_id": teacher_institution}
+    if sort == "name":
+        # Walks the role_institution_name index in order and stops at the page,
+        # so only the rows pulled through the $limit are joined.
+        pipeline = [{"$match": {**members, **keyset}}, {"$sort": dict(order)}, *join]
+        if filters:
+            pipeline.append({"$match": filters})
+    else:
+        # Credits live on the student profile, so this sort has to join the institution first.
+        pipeline = [{"$match": members}, *join, {"$match": {**filters, **keyset}}, {"$sort": dict(order)}]
+    rows = await db.users.aggregate([
+        *pipeline,
+        {"$limit": limit + 1},
+        {"$project": {"_id": 0, "password_hash": 0, "student": 0}}
+    ]).to_list(limit + 1)
     
-    users = await db.users.find(
-        {"role": "student", "institution_id": teacher_institution},
-        {"_id": 0, "password_hash": 0}
-    ).to_list(100)
-    
-    students_data = []
-    for user in users:
-        student = await db.students.find_one({"user_id": user["user_id"]}, {"_id": 0})
-        if student:
-            combined = {
-                **user,
-                "grade": student.get("grade"),
-                "stream": student.get("stream"),
-                "total_credits": student.get("total_credits", 0),
-                "level": student.get("level", 1)
-            }
-            students_data.append(combined)
-    
-    active_students = len([s for s in students_data if s.get("total_credits", 0) > 0])
+    students_data, next_cursor = page(rows, order, limit)
+    totals = await roster_stats(db, teacher_institution)
     
     stats = {
-        "active_students": active_students,
-        "total_courses": await db.courses.count_documents({}),
-        "avg_completion": 0 if not students_data else int(sum(s.get("total_credits", 0) for s in students_data) / len(students_data) / 50)
+        "total_students": totals["total_students"],
+        "active_students": totals["active_students"],
+        "total_courses": await course_catalog.count(db),
+        "avg_completion": 0 if not totals["total_students"] else int(totals["total_credits"] / totals["total_students"] / 50)
     }
     
     return {
         "students": students_data,
-        "stats": stats
+        "stats": stats,
+        "next_cursor": next_cursor
     }
+
+
+@router.get("/analytics")
+@budget(9)
+async def get_class_analytics(current_user: dict = Depends(get_current_user), db: AsyncIOMotorDatabase = Depends(get_db)):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Only teachers can access this")
+    
+    analytics = await db.class_analytics.find_one({"institution_id": current_user.get("institution_id")}, {"_id": 0})
+    if analytics:
+        return analytics
+    
+    # First visit before the job has covered this institution
+    return await refresh_institution(db, current_user.get("institution_id"))
+
+
+@router.get("/export/progress")
+async def export_progress(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(progress_export.DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "teacher":
+        raise HTTPException(status_code=403, detail="Only teachers can access this")
+    
+    institution_id = current_user.get("institution_id")
+    if format == "csv":
+        body, media_type = progress_export.csv_chunks(db, institution_id, batch_size), "text/csv"
+    else:
+        body, media_type = progress_export.ndjson(db, institution_id, batch_size), "application/x-ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="progress-{institution_id}.{format}"'}
+    )
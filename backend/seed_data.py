@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 from datetime import datetime, timedelta
+from catalog import bump_version
+import badge_engine
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -315,6 +317,7 @@ async def seed_data():
     ]
     
     await db.quizzes.insert_many(quizzes)
+    await bump_version(db)
     print(f"✅ Created {len(quizzes)} quizzes")
     
     print("🏆 Creating badges...")
@@ -362,6 +365,7 @@ async def seed_data():
     ]
     
     await db.badges.insert_many(badges)
+    await badge_engine.bump_version(db)
     print(f"✅ Created {len(badges)} badges")
     
     print("💼 Creating career roadmaps...")
@@ -8,6 +8,7 @@ from datetime import datetime
 import sys
 sys.path.insert(0, '/app/backend')
 from auth.password import hash_password
+from catalog import bump_version
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -88,6 +89,7 @@ async def seed_data():
     
     await db.courses.insert_many(courses)
     await db.quizzes.insert_many(quizzes)
+    await bump_version(db)
     
     print(f"✅ Created {len(courses)} courses")
     
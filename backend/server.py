@@ -1,6 +1,15 @@
-from fastapi import FastAPI
+"""EduBridge v2 API.
+
+Run with ``uvicorn server:app`` or, to skip building a module-level app,
+``uvicorn server:create_app --factory``. Importing this module does no work:
+routers are imported when an app is created, the Mongo client is opened by
+the lifespan, and pandas/NumPy are only imported by the code paths that use
+them. benchmarks/cold_start.py tracks the cost.
+"""
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.responses import PlainTextResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from dotenv import load_dotenv
 from pathlib import Path
 import os
@@ -9,43 +18,84 @@ import logging
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+from database import lifespan, get_db, get_pool_stats
+import query_budget
 
-app = FastAPI(title="EduBridge API", version="2.0.0")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app() -> FastAPI:
+    app = FastAPI(title="EduBridge API", version="2.0.0", lifespan=lifespan)
+
+    from metrics import MetricsMiddleware
+    from query_budget import QueryBudgetMiddleware
+    from rate_limit import RateLimitMiddleware
+
+    # Added before CORS so CORS stays outermost and 429s still carry its headers.
+    app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    if query_budget.mode != "off":
+        app.add_middleware(QueryBudgetMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
+    )
+
+    from routers import auth_new, student_routes, parent_routes
+
+    app.include_router(auth_new.router, prefix="/api")
+    app.include_router(student_routes.router, prefix="/api")
+    app.include_router(parent_routes.router, prefix="/api")
 
-from routers import auth_new, student_routes, parent_routes
+    @app.get("/api")
+    async def root():
+        return {"message": "EduBridge API", "version": "2.0.0", "status": "active"}
 
-app.include_router(auth_new.router, prefix="/api")
-app.include_router(student_routes.router, prefix="/api")
-app.include_router(parent_routes.router, prefix="/api")
+    @app.get("/api/health")
+    async def health_check(db: AsyncIOMotorDatabase = Depends(get_db)):
+        try:
+            await db.command("ping")
+            return {"status": "healthy", "database": "connected"}
+        except Exception as e:
+            return {"status": "unhealthy", "error": str(e)}
 
-@app.get("/api")
-async def root():
-    return {"message": "EduBridge API", "version": "2.0.0", "status": "active"}
+    @app.get("/api/health/pool")
+    async def pool_stats():
+        return get_pool_stats()
 
-@app.get("/api/health")
-async def health_check():
-    try:
-        await db.command("ping")
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+    @app.get("/api/metrics", response_class=PlainTextResponse)
+    async def metrics_endpoint():
+        import metrics
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/api/health/cache")
+    async def cache_stats():
+        from auth.principal_cache import principal_cache
+        from auth.token_cache import token_cache
+        from heartbeat_buffer import heartbeat_buffer
+        from auth.otp_service import otp_service
+        from rate_limit import rate_limiter
+        return {
+            "principal": principal_cache.stats(),
+            "tokens": token_cache.stats(),
+            "heartbeats": heartbeat_buffer.stats(),
+            "otp": otp_service.stats(),
+            "rate_limit": rate_limiter.stats(),
+        }
+
+    return app
+
+
+def __getattr__(name):
+    # ``server:app`` keeps working, but the app is only built when asked for.
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
@@ -1,6 +1,12 @@
-from fastapi import FastAPI
+"""EduBridge v1 API.
+
+Run with ``uvicorn server_old:app`` or ``uvicorn server_old:create_app --factory``.
+Like server.py, importing this module only defines the factory.
+"""
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.responses import PlainTextResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from dotenv import load_dotenv
 from pathlib import Path
 import os
@@ -9,50 +15,77 @@ import logging
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+from database import lifespan, get_db, get_pool_stats
+import query_budget
 
-app = FastAPI(title="EduBridge API", version="1.0.0")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app() -> FastAPI:
+    app = FastAPI(title="EduBridge API", version="1.0.0", lifespan=lifespan)
+
+    from metrics import MetricsMiddleware
+    from query_budget import QueryBudgetMiddleware
+    from rate_limit import RateLimitMiddleware
+
+    # Added before CORS so CORS stays outermost and 429s still carry its headers.
+    app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    if query_budget.mode != "off":
+        app.add_middleware(QueryBudgetMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
+    )
+
+    from routers import auth, courses, progress, rewards, career, parent, resources, leaderboard, teacher, offline_sync
+
+    app.include_router(auth.router, prefix="/api")
+    app.include_router(courses.router, prefix="/api")
+    app.include_router(progress.router, prefix="/api")
+    app.include_router(rewards.router, prefix="/api")
+    app.include_router(career.router, prefix="/api")
+    app.include_router(parent.router, prefix="/api")
+    app.include_router(teacher.router, prefix="/api")
+    app.include_router(resources.router, prefix="/api")
+    app.include_router(leaderboard.router, prefix="/api")
+    app.include_router(offline_sync.router, prefix="/api")
+
+    @app.get("/api")
+    async def root():
+        return {"message": "EduBridge API v1.0", "status": "active"}
 
-from routers import auth, courses, progress, rewards, career, parent, resources, leaderboard, teacher
-
-app.include_router(auth.router, prefix="/api")
-app.include_router(courses.router, prefix="/api")
-app.include_router(progress.router, prefix="/api")
-app.include_router(rewards.router, prefix="/api")
-app.include_router(career.router, prefix="/api")
-app.include_router(parent.router, prefix="/api")
-app.include_router(teacher.router, prefix="/api")
-app.include_router(resources.router, prefix="/api")
-app.include_router(leaderboard.router, prefix="/api")
-
-@app.get("/api")
-async def root():
-    return {"message": "EduBridge API v1.0", "status": "active"}
-
-@app.get("/api/health")
-async def health_check():
-    try:
-        await db.command("ping")
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+    @app.get("/api/health")
+    async def health_check(db: AsyncIOMotorDatabase = Depends(get_db)):
+        try:
+            await db.command("ping")
+            return {"status": "healthy", "database": "connected"}
+        except Exception as e:
+            return {"status": "unhealthy", "error": str(e)}
+
+    @app.get("/api/health/pool")
+    async def pool_stats():
+        return get_pool_stats()
+
+    @app.get("/api/metrics", response_class=PlainTextResponse)
+    async def metrics_endpoint():
+        import metrics
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+def __getattr__(name):
+    # ``server_old:app`` keeps working, but the app is only built when asked for.
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
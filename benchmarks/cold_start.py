@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Worker cold start: import time and time to the first successful request.
+
+Each run starts a fresh interpreter, imports the server module, builds the
+app with create_app() and serves GET /api in-process (httpx ASGITransport,
+no lifespan, so no Mongo is needed). Reports the median of each phase and
+which heavy optional modules were loaded along the way:
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --module server_old --max-first-request-ms 1500
+
+With --max-first-request-ms the exit status is 1 when the median is over
+budget, so CI can track regressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+HEAVY_MODULES = ["pandas", "numpy", "boto3"]
+
+PROBE = r"""
+import time
+started = time.perf_counter()
+import asyncio, json, sys
+import {module} as server
+imported = time.perf_counter()
+app = server.create_app()
+created = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://probe") as http:
+        response = await http.get("/api")
+        response.raise_for_status()
+
+asyncio.run(first_request())
+served = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - started) * 1000,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once(module: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "edubridge_bench")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args) -> int:
+    samples = [run_once(args.module) for _ in range(args.runs)]
+    report = {"module": args.module, "runs": args.runs, "python": sys.version.split()[0]}
+    for phase in ("import_ms", "create_app_ms", "first_request_ms"):
+        values = [s[phase] for s in samples]
+        report[phase] = {"median": round(statistics.median(values), 1), "max": round(max(values), 1)}
+    report["heavy_modules_loaded"] = sorted({m for s in samples for m in s["heavy_modules"]})
+
+    over_budget = (
+        args.max_first_request_ms is not None
+        and report["first_request_ms"]["median"] > args.max_first_request_ms
+    )
+    report["within_budget"] = not over_budget
+    print(json.dumps(report, indent=2))
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="server", choices=["server", "server_old"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-first-request-ms", type=float, default=None)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Compare the validated and fast JSON paths for catalog list endpoints.
+
+Seeds a 1,000-item catalog, then fetches each full listing in-process
+(httpx ASGITransport, no network) with the fast path off and then on.
+Paged endpoints serve at most MAX_PAGE_SIZE rows per response, so one
+sample follows X-Next-Cursor until all 1,000 items have arrived.
+/api/courses is not paged: the route stops at ``to_list(100)``, so only
+COURSES_LIST_CAP courses are seeded. The in-memory stand-in ignores that
+cap, and real Mongo returns the same 100. Reports p50/p99 wall latency,
+CPU time, item count and bytes per full listing:
+
+    python benchmarks/json_responses.py                  # in-memory Mongo stand-in
+    python benchmarks/json_responses.py --mongo-url mongodb://localhost:27017
+
+With the in-memory stand-in, query cost is Python work too, so compare the
+deltas rather than the absolute numbers.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+import fast_json  # noqa: E402
+from database import get_db  # noqa: E402
+from routers import career, courses, resources  # noqa: E402
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER  # noqa: E402
+from timing import percentile  # noqa: E402
+
+# Paged endpoints are walked at their largest page.
+ENDPOINTS = {
+    "resources": "/api/resources?limit=%d" % MAX_PAGE_SIZE,
+    "roadmaps": "/api/career/roadmaps?limit=%d" % MAX_PAGE_SIZE,
+    "courses": "/api/courses",
+}
+
+# GET /api/courses returns at most this many courses (routers/courses.py).
+COURSES_LIST_CAP = 100
+
+
+async def seed(db, n: int):
+    await db.resources.delete_many({})
+    await db.career_roadmaps.delete_many({})
+    await db.courses.delete_many({})
+    await db.resources.insert_many([{
+        "resource_id": "r%05d" % i, "grade_level": "10", "type": "video", "title": "Resource %d" % i,
+        "subject": "Maths", "url": "https://example.com/r/%d" % i, "thumbnail": "https://example.com/t.png",
+        "year": 2024, "description": "Practice material " * 4, "created_at": "2024-01-01T00:00:00"
+    } for i in range(n)])
+    await db.career_roadmaps.insert_many([{
+        "roadmap_id": "m%05d" % i, "title": "Roadmap %d" % i, "skills": ["python", "sql", "statistics"],
+        "milestones": [{"step": s, "title": "Milestone %d" % s} for s in range(5)],
+        "job_roles": ["analyst", "engineer"], "avg_salary": "8-12 LPA"
+    } for i in range(n)])
+    await db.courses.insert_many([{
+        "course_id": "c%05d" % i, "title": "Course %d" % i, "grade_level": "10", "subject": "Maths",
+        "video_url": "https://example.com/v/%d" % i, "duration_minutes": 12, "credits": 100,
+        "description": "Course description " * 4, "thumbnail": "https://example.com/t.png", "order": i,
+        "created_by": "teacher-1", "created_at": "2024-01-01T00:00:00"
+    } for i in range(min(n, COURSES_LIST_CAP))])
+
+
+async def fetch_all(http, path: str) -> tuple:
+    """Every item of a listing, following cursors; returns (items, pages, bytes)."""
+    items, pages, size, cursor = 0, 0, 0, None
+    while True:
+        page = path if not cursor else "%s%scursor=%s" % (path, "&" if "?" in path else "?", quote(cursor))
+        response = await http.get(page)
+        response.raise_for_status()
+        items += len(response.json())
+        pages += 1
+        size += len(response.content)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return items, pages, size
+
+
+async def measure(http, path: str, requests: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await fetch_all(http, path)
+    wall, cpu = [], []
+    for _ in range(requests):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        items, pages, size = await fetch_all(http, path)
+        cpu.append(time.process_time() - cpu_started)
+        wall.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(wall, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(wall, 0.99) * 1000, 2),
+        "cpu_ms_per_listing": round(statistics.mean(cpu) * 1000, 2),
+        "items": items,
+        "pages": pages,
+        "bytes": size,
+    }
+
+
+async def main(args):
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        db = AsyncIOMotorClient(args.mongo_url)[args.db_name]
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        db = AsyncMongoMockClient()[args.db_name]
+    await seed(db, args.items)
+
+    app = FastAPI()
+    for module in (career, courses, resources):
+        app.include_router(module.router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: db
+
+    report = {"items": args.items, "requests": args.requests, "orjson": fast_json.orjson is not None, "endpoints": {}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for name, path in ENDPOINTS.items():
+            results = {}
+            for mode, enabled in (("validated", False), ("fast", True)):
+                fast_json.enabled = enabled
+                results[mode] = await measure(http, path, args.requests, args.warmup)
+            results["cpu_saved_pct"] = round(
+                100 * (1 - results["fast"]["cpu_ms_per_listing"] / results["validated"]["cpu_ms_per_listing"]), 1
+            )
+            report["endpoints"][name] = results
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--db-name", default="edubridge_bench")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Load test the v2 API with simulated student and parent sessions.
+
+Runs entirely on this machine. The app is served in-process (httpx
+ASGITransport, no sockets) from server.create_app() against either the
+in-memory Mongo stand-in or a local mongod. It seeds a synthetic school,
+then runs virtual users until --duration runs out:
+
+* a student session logs in, lists courses, opens one, sends video
+  heartbeats up to completion, fetches and submits the quiz, then checks
+  badges and stats;
+* a parent session requests and verifies an OTP, lists the children and
+  opens one child's activity.
+
+Every request is timed by endpoint template. The report (throughput,
+status counts and p50/p90/p95/p99 latency per endpoint) is printed and
+saved as JSON. Pass an earlier report as --baseline to get the change
+per endpoint:
+
+    python benchmarks/load_test.py --duration 30 --student-users 40 --parent-users 10
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017 --baseline benchmarks/results/load-<ts>.json
+
+With --mongo-url the --db-name database (default edubridge_load) is
+dropped and re-seeded. Rate limiting is off unless --rate-limit is given:
+every virtual user has its own client address, but the run measures
+capacity, not throttling. Seeded passwords use --bcrypt-rounds (default
+4), which is also made the configured cost so logins don't rehash;
+benchmarks/login_storm.py covers the cost of real bcrypt rounds. Each
+parent user gets its own slice of mobiles, because a second send-otp for
+the same mobile replaces the first OTP, so --parent-users can't exceed the
+number of seeded parents (about --students / 2.5).
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import httpx  # noqa: E402
+
+from auth import password  # noqa: E402
+from catalog import bump_version, course_catalog  # noqa: E402
+from timing import percentile  # noqa: E402
+
+PASSWORD = "demo123"
+STANDARDS = ["6", "8", "10"]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.sessions = defaultdict(int)
+        self.failed_sessions = defaultdict(int)
+
+    async def call(self, http, method: str, template: str, path: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await http.request(method, path, **kwargs)
+        name = "%s %s" % (method, template)
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][response.status_code] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            samples = self.latencies[name]
+            statuses = self.statuses[name]
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": sum(n for status, n in statuses.items() if status >= 400),
+                "statuses": {str(status): n for status, n in sorted(statuses.items())},
+                "rps": round(len(samples) / elapsed, 1),
+                "mean_ms": round(statistics.mean(samples) * 1000, 2),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+                "p90_ms": round(percentile(samples, 0.90) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2),
+            }
+        requests = sum(e["requests"] for e in endpoints.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": requests,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "throughput_rps": round(requests / elapsed, 1),
+            "sessions": dict(self.sessions),
+            "failed_sessions": dict(self.failed_sessions),
+            "endpoints": endpoints,
+        }
+
+
+async def seed(db, args, rng) -> dict:
+    for name in ("students", "courses", "quizzes", "progress", "badges", "student_badges", "catalog_meta"):
+        await db[name].delete_many({})
+
+    courses, quizzes = [], []
+    for standard in STANDARDS:
+        for i in range(args.courses_per_standard):
+            course_id, quiz_id = str(uuid.uuid4()), str(uuid.uuid4())
+            title, subject = "Course %s-%d" % (standard, i), ["Science", "Mathematics", "English"][i % 3]
+            courses.append({
+                "course_id": course_id, "standard": standard, "subject": subject, "title": title,
+                "description": "Learn %s" % title, "video_url": "https://example.com/v/%s" % course_id,
+                "duration_minutes": 10 + i, "credits": 50, "thumbnail": "https://example.com/t.png",
+                "quiz_id": quiz_id, "created_at": datetime.utcnow().isoformat()
+            })
+            quizzes.append({
+                "quiz_id": quiz_id, "course_id": course_id, "standard": standard, "subject": subject,
+                "questions": [
+                    {"question": "What is the main topic?", "options": [title, "Something else", "Not sure", "Other"],
+                     "correct_answer": title},
+                    {"question": "Which subject?", "options": [subject, "History", "Geography", "Art"],
+                     "correct_answer": subject},
+                    {"question": "What class?", "options": [standard, "All classes", "No class", "Unknown"],
+                     "correct_answer": standard},
+                ],
+                "passing_score": 60
+            })
+    await db.courses.insert_many(courses)
+    await db.quizzes.insert_many(quizzes)
+    await db.badges.insert_many([
+        {"badge_id": "badge-%d" % threshold, "name": "%d credits" % threshold, "description": "", "icon": "*",
+         "criteria": {"type": "credits", "threshold": threshold}, "rarity": "common"}
+        for threshold in (50, 200, 500, 1000)
+    ])
+    await bump_version(db)
+
+    password_hash = password.hash_password(PASSWORD, rounds=args.bcrypt_rounds)
+    students, parent, siblings = [], 0, rng.choice((2, 3))
+    for i in range(args.students):
+        # Two or three children share each parent mobile.
+        if siblings == 0:
+            parent, siblings = parent + 1, rng.choice((2, 3))
+        siblings -= 1
+        students.append({
+            "student_id": "load-s%05d" % i, "name": "Student %d" % i, "username": "load%05d" % i,
+            "mobile": "8%09d" % parent, "password_hash": password_hash,
+            "standard": STANDARDS[i % len(STANDARDS)], "total_credits": 0, "level": 1, "role": "student",
+            "created_at": datetime.utcnow().isoformat()
+        })
+    await db.students.insert_many(students)
+
+    return {
+        "usernames": [s["username"] for s in students],
+        "mobiles": sorted({s["mobile"] for s in students}),
+    }
+
+
+async def student_session(http, recorder: Recorder, username: str, rng, args):
+    response = await recorder.call(http, "POST", "/api/auth/login", "/api/auth/login",
+                                   json={"username": username, "password": PASSWORD})
+    if response.status_code != 200:
+        return False
+    headers = {"Authorization": "Bearer %s" % response.json()["access_token"]}
+
+    response = await recorder.call(http, "GET", "/api/courses", "/api/courses", headers=headers)
+    if response.status_code != 200 or not response.json():
+        return False
+    course = rng.choice(response.json())
+    course_id = course["course_id"]
+
+    await recorder.call(http, "GET", "/api/courses/{course_id}", "/api/courses/%s" % course_id, headers=headers)
+
+    duration = course.get("duration_minutes", 10)
+    for step in range(1, args.heartbeats + 1):
+        await recorder.call(http, "PUT", "/api/progress/video-complete", "/api/progress/video-complete",
+                            params={"course_id": course_id, "watch_duration": duration * step // args.heartbeats},
+                            headers=headers)
+        await asyncio.sleep(rng.uniform(0, args.think_time))
+
+    response = await recorder.call(http, "GET", "/api/courses/{course_id}/quiz", "/api/courses/%s/quiz" % course_id,
+                                   headers=headers)
+    if response.status_code == 200:
+        quiz = response.json()
+        answers = {}
+        for question in quiz["questions"]:
+            # Students mostly know the answer; the first option is the correct one in the seed.
+            options = question["options"]
+            answers[question["question_id"]] = options[0] if rng.random() < args.correct_rate else rng.choice(options)
+        await recorder.call(http, "POST", "/api/progress/submit-quiz", "/api/progress/submit-quiz",
+                            json={"quiz_id": quiz["quiz_id"], "answers": answers},
+                            headers={**headers, "Idempotency-Key": str(uuid.uuid4())})
+
+    await recorder.call(http, "GET", "/api/rewards/my-badges", "/api/rewards/my-badges", headers=headers)
+    await recorder.call(http, "GET", "/api/rewards/stats", "/api/rewards/stats", headers=headers)
+    return True
+
+
+async def parent_session(http, recorder: Recorder, mobile: str, rng, args):
+    response = await recorder.call(http, "POST", "/api/auth/parent/send-otp", "/api/auth/parent/send-otp",
+                                   json={"mobile": mobile})
+    if response.status_code != 200:
+        return False
+    await asyncio.sleep(rng.uniform(0, args.think_time))
+    response = await recorder.call(http, "POST", "/api/auth/parent/verify-otp", "/api/auth/parent/verify-otp",
+                                   json={"mobile": mobile, "otp": response.json()["otp"]})
+    if response.status_code != 200:
+        return False
+    headers = {"Authorization": "Bearer %s" % response.json()["access_token"]}
+
+    response = await recorder.call(http, "GET", "/api/parent/children", "/api/parent/children", headers=headers)
+    if response.status_code != 200 or not response.json():
+        return False
+    child = rng.choice(response.json())
+    await recorder.call(http, "GET", "/api/parent/activity/{student_id}", "/api/parent/activity/%s" % child["student_id"],
+                        headers=headers)
+    return True
+
+
+async def virtual_user(app, kind: str, number: int, pool: list, recorder: Recorder, deadline: float, args):
+    rng = random.Random("%s-%d-%d" % (kind, number, args.seed))
+    session = student_session if kind == "student" else parent_session
+    transport = httpx.ASGITransport(app=app, client=("10.%d.%d.%d" % (kind == "parent", number // 250, number % 250 + 1), 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as http:
+        while time.perf_counter() < deadline:
+            ok = await session(http, recorder, rng.choice(pool), rng, args)
+            recorder.sessions[kind] += 1
+            if not ok:
+                recorder.failed_sessions[kind] += 1
+            await asyncio.sleep(rng.uniform(0, args.think_time))
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    changes = {"throughput_rps_pct": _pct(baseline["throughput_rps"], report["throughput_rps"]), "endpoints": {}}
+    for name, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before:
+            changes["endpoints"][name] = {
+                "rps_pct": _pct(before["rps"], current["rps"]),
+                "p95_ms_pct": _pct(before["p95_ms"], current["p95_ms"]),
+                "p99_ms_pct": _pct(before["p99_ms"], current["p99_ms"]),
+            }
+    return changes
+
+
+def _pct(before, after):
+    return round(100 * (after - before) / before, 1) if before else None
+
+
+async def main(args):
+    import server
+    from database import get_db
+    from heartbeat_buffer import heartbeat_buffer
+    from rate_limit import rate_limiter
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+        await client.drop_database(args.db_name)
+        db = client[args.db_name]
+        from indexes import ensure_indexes
+        await ensure_indexes(db)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        db = AsyncMongoMockClient()[args.db_name]
+
+    rng = random.Random(args.seed)
+    pools = await seed(db, args, rng)
+    course_catalog.invalidate()
+    if args.parent_users > len(pools["mobiles"]):
+        # Each parent user needs a mobile of its own; an empty slice would have nothing to log in with.
+        raise SystemExit("--parent-users %d exceeds the %d parent mobiles seeded for --students %d; "
+                         "lower --parent-users or raise --students"
+                         % (args.parent_users, len(pools["mobiles"]), args.students))
+
+    app = server.create_app()
+    app.dependency_overrides[get_db] = lambda: db
+    rate_limiter.enabled = args.rate_limit
+    password.BCRYPT_ROUNDS = args.bcrypt_rounds
+    heartbeat_buffer.start(db)
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(virtual_user(app, "student", i, pools["usernames"], recorder, deadline, args) for i in range(args.student_users)),
+        *(virtual_user(app, "parent", i, pools["mobiles"][i::args.parent_users], recorder, deadline, args)
+          for i in range(args.parent_users)),
+    )
+    elapsed = time.perf_counter() - started
+    await heartbeat_buffer.stop()
+
+    report = {
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {
+            "store": "mongod" if args.mongo_url else "in-process",
+            "duration_s": args.duration, "student_users": args.student_users, "parent_users": args.parent_users,
+            "students": args.students, "courses_per_standard": args.courses_per_standard,
+            "heartbeats": args.heartbeats, "think_time_s": args.think_time, "rate_limit": args.rate_limit,
+            "bcrypt_rounds": args.bcrypt_rounds, "seed": args.seed,
+        },
+        **recorder.report(elapsed),
+    }
+    if args.baseline:
+        report["vs_baseline"] = compare(report, json.loads(Path(args.baseline).read_text()))
+
+    output = Path(args.output) if args.output else RESULTS_DIR / ("load-%s.json" % datetime.now().strftime("%Y%m%d-%H%M%S"))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    print("Saved %s" % output, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--student-users", type=int, default=40, help="concurrent student sessions")
+    parser.add_argument("--parent-users", type=int, default=10, help="concurrent parent sessions")
+    parser.add_argument("--students", type=int, default=500, help="seeded student accounts")
+    parser.add_argument("--courses-per-standard", type=int, default=6)
+    parser.add_argument("--heartbeats", type=int, default=5, help="video heartbeats per student session")
+    parser.add_argument("--think-time", type=float, default=0.05, help="max pause between steps, seconds")
+    parser.add_argument("--correct-rate", type=float, default=0.8, help="chance a quiz answer is right")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the auth rate limiter on")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo-url", default=None, help="local mongod; default is the in-process stand-in")
+    parser.add_argument("--db-name", default="edubridge_load")
+    parser.add_argument("--output", default=None, help="report path (default benchmarks/results/load-<time>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    asyncio.run(main(parser.parse_args()))
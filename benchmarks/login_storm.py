@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Login storm: how badly does bcrypt hurt the rest of the worker?
+
+Fires a burst of concurrent student logins at POST /api/auth/login. At the
+same time a probe calls a cheap authenticated route (GET /api/auth/me,
+served from the principal cache) at a fixed interval. Runs once with bcrypt
+inline on the event loop and once with the bounded hashing pool. Reports
+login throughput, 503s and the probe's p50/p99:
+
+    python benchmarks/login_storm.py --logins 200 --rounds 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import bcrypt  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+from auth.jwt_handler import create_access_token  # noqa: E402
+from auth.password import hashing_pool  # noqa: E402
+from database import get_db  # noqa: E402
+from routers import auth_new  # noqa: E402
+from timing import percentile  # noqa: E402
+
+PASSWORD = "demo123"
+
+
+async def storm(http, args) -> dict:
+    done = asyncio.Event()
+    probe_latencies = []
+    token = create_access_token({"student_id": "probe"})
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            response = await http.get("/api/auth/me", headers={"Authorization": "Bearer %s" % token})
+            response.raise_for_status()
+            probe_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(args.probe_interval)
+
+    async def login(i):
+        response = await http.post("/api/auth/login", json={"username": "user%d" % (i % args.users), "password": PASSWORD})
+        return response.status_code
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(args.probe_interval * 5)
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*(login(i) for i in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    ok = statuses.count(200)
+    return {
+        "logins_ok": ok,
+        "logins_503": statuses.count(503),
+        "elapsed_s": round(elapsed, 2),
+        "logins_per_s": round(ok / elapsed, 1),
+        "probe_requests": len(probe_latencies),
+        "probe_p50_ms": round(percentile(probe_latencies, 0.50) * 1000, 2),
+        "probe_p99_ms": round(percentile(probe_latencies, 0.99) * 1000, 2),
+        "probe_max_ms": round(max(probe_latencies, default=0) * 1000, 2),
+    }
+
+
+async def main(args):
+    db = AsyncMongoMockClient()["edubridge_bench"]
+    password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(args.rounds)).decode()
+    await db.students.insert_many([{
+        "student_id": "s%d" % i, "username": "user%d" % i, "name": "User %d" % i, "mobile": "9%09d" % i,
+        "standard": "10", "password_hash": password_hash, "total_credits": 0, "level": 1
+    } for i in range(args.users)])
+    await db.students.insert_one({"student_id": "probe", "username": "probe", "standard": "10"})
+
+    app = FastAPI()
+    app.include_router(auth_new.router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: db
+
+    report = {"logins": args.logins, "bcrypt_rounds": args.rounds, "pool": hashing_pool.stats(), "runs": {}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        for mode, enabled in (("inline", False), ("pooled", True)):
+            hashing_pool.enabled = enabled
+            report["runs"][mode] = await storm(http, args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost of the seeded hashes")
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,7 @@
+"""Shared helpers for the benchmark scripts in this directory."""
+
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of ``samples`` for ``q`` in [0, 1]; 0.0 when there are none."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
@@ -0,0 +1,117 @@
+import asyncio
+import inspect
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "edubridge_test")
+os.environ.setdefault("MONGO_ENSURE_INDEXES", "0")
+
+from fastapi import FastAPI  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+
+class YieldingCollection:
+    """Gives the event loop a turn before every awaited operation.
+
+    mongomock runs each call synchronously, so without this concurrent
+    requests would never interleave and races would go unnoticed. Every
+    operation is also logged as (collection, method) on the database's
+    ``commands`` list, so tests can pin how many queries an endpoint issues.
+    """
+
+    def __init__(self, collection, commands):
+        self._collection = collection
+        self._commands = commands
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        if not inspect.iscoroutinefunction(attr):
+            def log(*args, **kwargs):
+                self._commands.append((self._collection.name, name))
+                return attr(*args, **kwargs)
+            return log
+
+        async def call(*args, **kwargs):
+            self._commands.append((self._collection.name, name))
+            await asyncio.sleep(0)
+            return await attr(*args, **kwargs)
+        return call
+
+
+class YieldingDatabase:
+    def __init__(self, db):
+        self._db = db
+        self.commands = []
+
+    def __getattr__(self, name):
+        return YieldingCollection(getattr(self._db, name), self.commands)
+
+    def __getitem__(self, name):
+        return YieldingCollection(self._db[name], self.commands)
+
+    async def command(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return await self._db.command(*args, **kwargs)
+
+
+@pytest.fixture
+def db():
+    from auth.principal_cache import principal_cache
+    from auth.token_cache import token_cache
+    from badge_engine import badge_engine
+    from catalog import course_catalog
+    from indexes import INDEXES, ensure_indexes
+    from routers.teacher import roster_stats_cache
+
+    raw = AsyncMongoMockClient()["edubridge_test"]
+    asyncio.run(ensure_indexes(raw, {name: INDEXES[name] for name in ("progress", "student_badges")}))
+    principal_cache.clear()
+    token_cache.clear()
+    badge_engine.invalidate()
+    course_catalog.invalidate()
+    roster_stats_cache.clear()
+    return YieldingDatabase(raw)
+
+
+@pytest.fixture
+def make_app(db):
+    """Build an app serving ``routers`` under /api with get_db overridden.
+
+    get_db answers ``database`` when given (e.g. a query_budget trace),
+    otherwise the test database.
+    """
+    from database import get_db
+
+    def make(*routers, database=None):
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router, prefix="/api")
+        target = db if database is None else database
+        app.dependency_overrides[get_db] = lambda: target
+        return app
+    return make
+
+
+class Clock:
+    """A settable stand-in for time.time / time.monotonic."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
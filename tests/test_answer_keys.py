@@ -0,0 +1,53 @@
+from answer_keys import compile_quiz
+
+QUIZ = {
+    "quiz_id": "q1",
+    "course_id": "c1",
+    "questions": [
+        {"question": "Capital of India?", "options": ["Mumbai", "Delhi"], "correct_answer": "Delhi", "marks": 2},
+        {"question": "2+2?", "options": ["3", "4", "5"], "correct_answer": "4"},
+        {"question_id": "colour", "question": "Sky colour?", "options": ["Blue", "Green"], "correct_answer": "Blue"},
+    ],
+    "passing_score": 60,
+    "passing_marks": 3,
+}
+
+
+def test_grades_answers_keyed_by_question_text():
+    graded = compile_quiz(QUIZ).grade({"Capital of India?": "Delhi", "2+2?": "5", "Sky colour?": "Blue"})
+    assert graded == {"correct_answers": 2, "total_questions": 3, "score": 66, "marks": 3}
+
+
+def test_grades_answers_keyed_by_id_with_option_indexes():
+    graded = compile_quiz(QUIZ).grade({"0": 1, "1": 1, "colour": 0})
+    assert graded["correct_answers"] == 3
+    assert graded["marks"] == 4
+
+
+def test_unknown_questions_and_options_score_nothing():
+    graded = compile_quiz(QUIZ).grade({"Not a question": "Delhi", "2+2?": "four"})
+    assert graded["correct_answers"] == 0
+
+
+def test_public_payload_has_ids_and_no_answers():
+    public = compile_quiz(QUIZ).public
+    assert [q["question_id"] for q in public["questions"]] == ["0", "1", "colour"]
+    assert all("correct_answer" not in q for q in public["questions"])
+    assert QUIZ["questions"][0]["correct_answer"] == "Delhi"
+
+
+def test_out_of_range_indexes_never_match_a_missing_correct_answer():
+    quiz = {"quiz_id": "q2", "course_id": "c1", "questions": [
+        {"question": "Pick one", "options": ["a", "b"], "correct_answer": "not an option"},
+        {"question": "2+2?", "options": ["3", "4"], "correct_answer": "4"},
+    ]}
+    answer_key = compile_quiz(quiz)
+    assert answer_key.choices({"Pick one": -2, "2+2?": 2}) == [-1, -1]
+    assert answer_key.choices({"Pick one": 10 ** 30, "2+2?": -1}) == [-1, -1]
+    assert answer_key.grade({"Pick one": -2, "2+2?": 1})["correct_answers"] == 1
+
+
+def test_missing_passing_marks_defaults_to_passing_score_of_total():
+    quiz = {k: v for k, v in QUIZ.items() if k != "passing_marks"}
+    assert compile_quiz(quiz).passing_marks == 3
+    assert compile_quiz({**quiz, "passing_score": 50}).passing_marks == 2
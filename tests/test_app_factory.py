@@ -0,0 +1,38 @@
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+@pytest.mark.parametrize("module", ["server", "server_old"])
+def test_startup_skips_heavy_modules(module):
+    probe = (
+        "import json, sys\n"
+        "import %s as server\n"
+        "loaded_on_import = 'routers' in sys.modules\n"
+        "server.create_app()\n"
+        "print(json.dumps([loaded_on_import, [m for m in ('pandas', 'numpy') if m in sys.modules]]))\n"
+    ) % module
+    output = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, capture_output=True,
+                            text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == [False, []]
+
+
+def test_create_app_builds_independent_apps():
+    import server
+
+    first, second = server.create_app(), server.create_app()
+    assert first is not second
+    assert server.app is server.app
+
+    async def run():
+        transport = httpx.ASGITransport(app=first)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get("/api")
+    assert asyncio.run(run()).json()["version"] == "2.0.0"
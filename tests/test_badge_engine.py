@@ -0,0 +1,72 @@
+import asyncio
+
+import badge_engine as badge_engine_module
+from badge_engine import BadgeEngine, CRITERIA, bump_version, compile_badges, criterion
+
+
+def test_credit_and_level_predicates():
+    rules = dict(compile_badges([
+        {"badge_id": "rich", "criteria": {"type": "credits", "threshold": 500}},
+        {"badge_id": "veteran", "criteria": {"type": "level", "threshold": 3}},
+    ]))
+    assert rules["rich"]({"total_credits": 500}) and not rules["rich"]({"total_credits": 499})
+    assert not rules["rich"]({})
+    assert rules["veteran"]({"level": 3}) and not rules["veteran"]({})
+
+
+def test_registered_criteria_are_compiled_and_unknown_ones_skipped():
+    @criterion("streak")
+    def _streak(threshold):
+        return lambda stats: stats.get("streak", 0) >= threshold
+
+    try:
+        rules = compile_badges([
+            {"badge_id": "streaker", "criteria": {"type": "streak", "threshold": 7}},
+            {"badge_id": "mystery", "criteria": {"type": "unknown"}},
+            {"badge_id": "empty"},
+        ])
+        assert [badge_id for badge_id, _ in rules] == ["streaker"]
+        assert rules[0][1]({"streak": 7})
+    finally:
+        del CRITERIA["streak"]
+
+
+def test_concurrent_awards_tolerate_duplicate_keys(db):
+    async def run():
+        await db.badges.insert_many([
+            {"badge_id": "b1", "criteria": {"type": "credits", "threshold": 10}},
+            {"badge_id": "b2", "criteria": {"type": "credits", "threshold": 20}},
+        ])
+        engine = BadgeEngine()
+        stats = {"s1": {"total_credits": 50}, "s2": {"total_credits": 15}}
+        # Both calls read "nothing held" before either inserts, so the second hits the unique index.
+        first, second = await asyncio.gather(engine.award_many(db, stats), engine.award_many(db, stats))
+
+        awarded = [(sid, b) for result in (first, second) for sid, ids in result.items() for b in ids]
+        assert sorted(awarded) == [("s1", "b1"), ("s1", "b2"), ("s2", "b1")]
+        assert await db.student_badges.count_documents({}) == 3
+        assert await engine.award_many(db, stats) == {}
+    asyncio.run(run())
+
+
+def test_badge_writes_reach_other_workers(db, monkeypatch, clock):
+    monkeypatch.setattr(badge_engine_module.time, "monotonic", clock)
+
+    async def run():
+        await db.badges.insert_one({"badge_id": "b1", "criteria": {"type": "credits", "threshold": 10}})
+        writer, reader = BadgeEngine(version_check_seconds=5), BadgeEngine(version_check_seconds=5)
+        assert await reader.evaluate(db, {"total_credits": 100}) == ["b1"]
+
+        await db.badges.insert_one({"badge_id": "b2", "criteria": {"type": "level", "threshold": 2}})
+        monkeypatch.setattr(badge_engine_module, "badge_engine", writer)
+        await bump_version(db)
+        assert await reader.evaluate(db, {"total_credits": 100, "level": 2}) == ["b1"]
+
+        clock.now += 5
+        assert await reader.evaluate(db, {"total_credits": 100, "level": 2}) == ["b1", "b2"]
+
+        db.commands.clear()
+        clock.now += 5
+        await reader.evaluate(db, {})
+        assert db.commands == [("catalog_meta", "find_one")]
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+import asyncio
+
+import catalog as catalog_module
+from catalog import CourseCatalog, bump_version
+
+
+async def seed(db):
+    await db.courses.insert_one({"course_id": "c1", "standard": "6", "title": "Algebra", "tags": ["maths"]})
+    await db.quizzes.insert_one({
+        "quiz_id": "q1", "course_id": "c1",
+        "questions": [{"question_id": "x", "question": "2+2?", "options": ["3", "4"], "correct_answer": "4"}],
+    })
+
+
+def test_reads_are_isolated_from_the_cached_catalog(db):
+    async def run():
+        await seed(db)
+        catalog = CourseCatalog()
+
+        course = await catalog.get_course(db, "c1")
+        course["tags"].append("changed")
+        (await catalog.courses_for_standard(db, "6"))[0]["tags"].append("changed")
+        quiz = await catalog.get_public_quiz(db, "c1")
+        quiz["questions"][0]["options"].append("5")
+
+        assert (await catalog.get_course(db, "c1"))["tags"] == ["maths"]
+        assert (await catalog.courses_for_standard(db, "6"))[0]["tags"] == ["maths"]
+        assert (await catalog.get_public_quiz(db, "c1"))["questions"][0]["options"] == ["3", "4"]
+    asyncio.run(run())
+
+
+def test_version_bump_reaches_other_workers(db, monkeypatch, clock):
+    monkeypatch.setattr(catalog_module.time, "monotonic", clock)
+
+    async def run():
+        await seed(db)
+        reader = CourseCatalog(version_check_seconds=5)
+        assert await reader.count_for_standard(db, "6") == 1
+
+        await db.courses.insert_one({"course_id": "c2", "standard": "6", "title": "Geometry"})
+        await bump_version(db)
+        db.commands.clear()
+        assert await reader.count_for_standard(db, "6") == 1
+        assert db.commands == []
+
+        clock.now += 5
+        assert await reader.count_for_standard(db, "6") == 2
+        assert db.commands == [("catalog_meta", "find_one"), ("courses", "find"), ("quizzes", "find")]
+    asyncio.run(run())
+
+
+def test_unchanged_catalog_is_reloaded_after_the_refresh_interval(db, monkeypatch, clock):
+    monkeypatch.setattr(catalog_module.time, "monotonic", clock)
+
+    async def run():
+        await seed(db)
+        catalog = CourseCatalog(refresh_seconds=600, version_check_seconds=5)
+        await catalog.ensure_fresh(db)
+        await db.courses.insert_one({"course_id": "c2", "standard": "6", "title": "Geometry"})
+
+        clock.now += 5
+        assert await catalog.count_for_standard(db, "6") == 1
+        clock.now += 600
+        assert await catalog.count_for_standard(db, "6") == 2
+    asyncio.run(run())
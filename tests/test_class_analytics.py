@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from auth.jwt_handler import create_access_token
+import class_analytics
+from class_analytics import compute, refresh
+from routers import teacher
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(teacher.router)
+
+
+async def seed(db):
+    await db.courses.insert_many([
+        {"course_id": "c1", "title": "Algebra", "subject": "Maths"},
+        {"course_id": "c2", "title": "Optics", "subject": "Physics"},
+    ])
+    await db.quizzes.insert_one({"quiz_id": "q1", "course_id": "c1", "questions": [], "total_marks": 20})
+    for institution in ("A", "B"):
+        await db.users.insert_one({"user_id": "teacher-" + institution, "role": "teacher", "institution_id": institution})
+    students = [("s1", "A", 0), ("s2", "A", 600), ("s3", "A", 1200), ("s4", "B", 50)]
+    for student_id, institution, credits in students:
+        await db.users.insert_one({"user_id": "u-" + student_id, "role": "student", "institution_id": institution})
+        await db.students.insert_one({"student_id": student_id, "user_id": "u-" + student_id, "total_credits": credits})
+    await db.progress.insert_many([
+        # v1 rows carry raw marks in quiz_score plus last_accessed, v2 rows a percentage in score plus updated_at.
+        {"student_id": "s1", "course_id": "c1", "video_completed": True, "quiz_completed": True, "quiz_passed": False,
+         "quiz_score": 8, "watch_duration": 10, "last_accessed": "2024-01-01T00:00:00"},
+        {"student_id": "s2", "course_id": "c1", "video_completed": True, "quiz_completed": True, "quiz_passed": True,
+         "score": 100, "watch_duration": 20, "updated_at": "2024-01-01T00:00:00+00:00"},
+        {"student_id": "s3", "course_id": "c2", "video_completed": False, "watch_duration": 3,
+         "updated_at": "2024-01-01T00:00:00+00:00"},
+        {"student_id": "s4", "course_id": "c2", "video_completed": True, "quiz_completed": True, "quiz_passed": True,
+         "score": 90, "watch_duration": 30, "updated_at": "2024-01-01T00:00:00+00:00"},
+    ])
+
+
+def get_analytics(app, institution):
+    token = create_access_token({"user_id": "teacher-" + institution})
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get("/api/teacher/analytics", headers={"Authorization": "Bearer %s" % token})
+    return run()
+
+
+def test_analytics_are_precomputed_per_institution(db, app):
+    async def run():
+        await seed(db)
+        assert sorted(await refresh(db)) == ["A", "B"]
+
+        db.commands.clear()
+        body = (await get_analytics(app, "A")).json()
+        assert db.commands == [("revoked_tokens", "find_one"), ("users", "find_one"), ("class_analytics", "find_one")]
+        assert (body["students"], body["active_students"]) == (3, 2)
+        courses = {c["course_id"]: c for c in body["courses"]}
+        assert courses["c1"]["learners"] == 2
+        assert courses["c1"]["completion_rate"] == 0.5
+        assert courses["c1"]["avg_score"] == 70.0
+        assert courses["c1"]["avg_watch_minutes"] == 15.0
+        assert courses["c1"]["score_histogram"][4] == 1 and courses["c1"]["score_histogram"][9] == 1
+        assert courses["c2"]["avg_score"] is None
+        assert courses["c2"]["video_completion_rate"] == 0.0
+        assert body["credit_histogram"] == {"bucket_size": 500, "counts": [1, 1, 1]}
+        assert sum(body["score_distribution"]["counts"]) == 2
+    asyncio.run(run())
+
+
+def test_incremental_refresh_only_touches_changed_institutions(db, app):
+    async def run():
+        await seed(db)
+        await refresh(db)
+        assert await refresh(db) == []
+
+        await db.progress.update_one(
+            {"student_id": "s4"}, {"$set": {"score": 50, "updated_at": "2999-01-01T00:00:00+00:00"}}
+        )
+        assert await refresh(db) == ["B"]
+        body = (await get_analytics(app, "B")).json()
+        assert body["courses"][0]["avg_score"] == 50.0
+    asyncio.run(run())
+
+
+def test_first_visit_computes_on_demand(db, app, monkeypatch):
+    threads = []
+
+    def recording(*args):
+        threads.append(threading.current_thread())
+        return compute(*args)
+    monkeypatch.setattr(class_analytics, "compute", recording)
+
+    async def run():
+        await seed(db)
+        body = (await get_analytics(app, "B")).json()
+        assert body["students"] == 1
+        assert await db.class_analytics.count_documents({}) == 1
+        # The pandas work ran in the executor, not on the event loop's thread.
+        assert threads and threads[0] is not threading.current_thread()
+    asyncio.run(run())
+
+
+def test_v1_marks_are_scaled_to_percentages():
+    progress = [
+        {"student_id": "s1", "course_id": "c1", "quiz_completed": True, "quiz_score": 15},
+        {"student_id": "s2", "course_id": "c1", "quiz_completed": True, "score": 50},
+        {"student_id": "s3", "course_id": "c2", "quiz_completed": True, "quiz_score": 15},
+    ]
+    courses = {c["course_id"]: c for c in compute([], progress, {}, {"c1": 30})["courses"]}
+    assert courses["c1"]["avg_score"] == 50.0
+    # No quiz total for c2, so its raw marks can't be compared with percentages.
+    assert courses["c2"]["avg_score"] is None
@@ -0,0 +1,87 @@
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+from pydantic import TypeAdapter
+
+import fast_json
+from models import CareerRoadmap, Course, Resource
+from pagination import NEXT_CURSOR_HEADER
+from routers import career, courses, resources
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    monkeypatch.setattr(fast_json, "enabled", True)
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(*(module.router for module in (career, courses, resources)))
+
+
+async def seed(db, n=30):
+    for i in range(n):
+        await db.resources.insert_one({
+            "resource_id": "r%03d" % i, "grade_level": "10", "type": "video", "title": "Résumé %d" % i,
+            "subject": "Maths", "url": "https://example.com", "thumbnail": "", "description": "",
+            "created_at": "2024-01-01T00:00:00"
+        })
+        await db.career_roadmaps.insert_one({
+            "roadmap_id": "m%03d" % i, "title": "Roadmap %d" % i, "skills": ["a"], "milestones": [{"step": 1}],
+            "job_roles": ["dev"], "avg_salary": "10 LPA"
+        })
+        await db.courses.insert_one({
+            "course_id": "c%03d" % i, "title": "Course %d" % i, "grade_level": "10", "subject": "Maths",
+            "video_url": "", "duration_minutes": 10, "credits": 100, "description": "", "thumbnail": "",
+            "order": i, "created_by": "teacher-1", "created_at": "2024-01-01T00:00:00"
+        })
+
+
+def get(app, path, params=None):
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get(path, params=params)
+    return run()
+
+
+@pytest.mark.parametrize("path, model", [
+    ("/api/resources", Resource),
+    ("/api/career/roadmaps", CareerRoadmap),
+    ("/api/courses", Course),
+])
+def test_fast_output_matches_response_models(db, app, fast, path, model):
+    async def run():
+        await seed(db)
+        response = await get(app, path, {"limit": 10} if "courses" not in path else None)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        rows = response.json()
+        assert len(rows) == (30 if "courses" in path else 10)
+        TypeAdapter(List[model]).validate_python(rows)
+    asyncio.run(run())
+
+
+def test_fast_path_keeps_cursor_header_and_unicode(db, app, fast):
+    async def run():
+        await seed(db)
+        response = await get(app, "/api/resources", {"limit": 10})
+        assert response.headers[NEXT_CURSOR_HEADER]
+        assert "Résumé 0" in response.text
+    asyncio.run(run())
+
+
+def test_fast_path_drops_fields_outside_the_response_model(db, app, fast):
+    async def run():
+        await seed(db, n=2)
+        await db.resources.update_many({}, {"$set": {"internal_notes": "staff only"}})
+        await db.courses.update_many({}, {"$set": {"answer_sheet": ["4"]}})
+        resources = (await get(app, "/api/resources")).json()
+        courses = (await get(app, "/api/courses")).json()
+        assert all("internal_notes" not in r for r in resources)
+        assert all("answer_sheet" not in c for c in courses)
+        assert set(resources[0]) <= set(Resource.model_fields)
+    asyncio.run(run())
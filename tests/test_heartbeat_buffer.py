@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timezone
+
+from heartbeat_buffer import HeartbeatBuffer
+
+
+async def progress(db, course_id="c1"):
+    return await db.progress.find_one({"student_id": "s1", "course_id": course_id}, {"_id": 0})
+
+
+def test_heartbeats_are_coalesced_until_flush(db):
+    async def run():
+        buffer = HeartbeatBuffer(flush_interval_seconds=60, max_loss_seconds=60)
+        buffer.start(db)
+        for seconds in (10, 20, 30):
+            await buffer.record(db, "s1", "c1", seconds, False)
+        await buffer.record(db, "s1", "c2", 5, False)
+        assert await progress(db) is None
+        assert buffer.stats()["pending"] == 2
+
+        assert await buffer.flush() == 2
+        doc = await progress(db)
+        assert doc["watch_duration"] == 30
+        assert doc["video_completed"] is False
+        assert (await progress(db, "c2"))["watch_duration"] == 5
+        await buffer.stop()
+    asyncio.run(run())
+
+
+def test_flushed_heartbeats_carry_the_flush_time(db):
+    # A change scan that starts between record and flush must still see the write.
+    async def run():
+        buffer = HeartbeatBuffer(flush_interval_seconds=60, max_loss_seconds=60)
+        buffer.start(db)
+        await buffer.record(db, "s1", "c1", 10, False)
+        watermark = datetime.now(timezone.utc).isoformat()
+        await asyncio.sleep(0.001)
+        await buffer.flush()
+        assert (await progress(db))["updated_at"] > watermark
+        await buffer.stop()
+    asyncio.run(run())
+
+
+def test_completion_is_written_immediately_and_never_undone(db):
+    async def run():
+        buffer = HeartbeatBuffer(flush_interval_seconds=60, max_loss_seconds=60)
+        buffer.start(db)
+        await buffer.record(db, "s1", "c1", 30, False)
+        await buffer.record(db, "s1", "c1", 540, True)
+        doc = await progress(db)
+        assert doc["video_completed"] is True
+        assert doc["watch_duration"] == 540
+
+        # A rewind after completing keeps the quiz unlocked.
+        await buffer.record(db, "s1", "c1", 100, False)
+        await buffer.record(db, "s1", "c1", 560, True)
+        assert buffer.stats()["sync_writes"] == 1
+        await buffer.stop()
+        doc = await progress(db)
+        assert doc["video_completed"] is True
+        assert doc["watch_duration"] == 560
+    asyncio.run(run())
+
+
+def test_loss_window_triggers_flush_and_stop_drains(db):
+    async def run():
+        buffer = HeartbeatBuffer(flush_interval_seconds=60, max_loss_seconds=0)
+        buffer.start(db)
+        await buffer.record(db, "s1", "c1", 10, False)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert (await progress(db))["watch_duration"] == 10
+
+        buffer.max_loss_seconds = 60
+        await buffer.record(db, "s1", "c1", 20, False)
+        await buffer.stop()
+        assert (await progress(db))["watch_duration"] == 20
+        assert buffer.stats()["pending"] == 0
+    asyncio.run(run())
+
+
+def test_writes_through_when_not_running(db):
+    async def run():
+        buffer = HeartbeatBuffer()
+        await buffer.record(db, "s1", "c1", 10, False)
+        assert (await progress(db))["watch_duration"] == 10
+    asyncio.run(run())
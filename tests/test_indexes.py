@@ -0,0 +1,35 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from class_analytics import changed_institutions
+from indexes import INDEXES, ensure_indexes
+
+
+class RecordingProgress:
+    def __init__(self):
+        self.filters = []
+
+    async def distinct(self, field, query):
+        self.filters.append(query)
+        return []
+
+
+class RecordingDatabase:
+    def __init__(self):
+        self.progress = RecordingProgress()
+
+
+def test_ensure_indexes_covers_every_branch_of_the_change_scan():
+    async def run():
+        db = AsyncMongoMockClient()["edubridge_indexes"]
+        report = await ensure_indexes(db, {"progress": INDEXES["progress"]})
+        assert {"updated_at", "last_accessed"} <= set(report["progress"]["created"])
+        leading = {next(iter(info["key"]))[0] for info in (await db.progress.index_information()).values()}
+
+        recording = RecordingDatabase()
+        await changed_institutions(recording, "2024-01-01T00:00:00")
+        branches = recording.progress.filters[0]["$or"]
+        # Each $or branch is planned on its own; one without an index turns the scan into a collection scan.
+        assert {field for branch in branches for field in branch} <= leading
+    asyncio.run(run())
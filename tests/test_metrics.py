@@ -0,0 +1,68 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+from pymongo import monitoring
+
+import metrics
+from database import get_db
+
+
+@pytest.fixture
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_requests_are_labelled_by_route_template(db, fresh_metrics):
+    import server
+
+    app = server.create_app()
+    app.dependency_overrides[get_db] = lambda: db
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            for course_id in ("c1", "c2"):
+                await http.get("/api/courses/%s" % course_id)
+            await http.get("/api/no-such-route")
+            return await http.get("/api/metrics")
+    response = asyncio.run(run())
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics.http_request_duration.count(("GET", "/api/courses/{course_id}")) == 2
+    assert metrics.http_requests.get(("GET", "/api/courses/{course_id}", "401")) == 2
+    assert metrics.http_requests.get(("GET", "unmatched", "404")) == 1
+    body = response.text
+    assert 'edubridge_http_request_duration_seconds_bucket{method="GET",route="/api/courses/{course_id}",le="+Inf"} 2' in body
+    # The scrape itself is still in flight while it renders.
+    assert "edubridge_http_requests_in_flight 1" in body
+    assert metrics.in_flight == 0
+
+
+def test_command_listener_records_collection_and_command(fresh_metrics):
+    listener = metrics.CommandMetrics()
+    address = ("localhost", 27017)
+    listener.started(monitoring.CommandStartedEvent({"find": "students", "filter": {}}, "edubridge", 1, address, 1))
+    listener.succeeded(monitoring.CommandSucceededEvent(timedelta(milliseconds=3), {"ok": 1}, "find", 1, address, 1))
+    listener.started(monitoring.CommandStartedEvent({"getMore": 7, "collection": "progress"}, "edubridge", 2, address, 2))
+    listener.failed(monitoring.CommandFailedEvent(timedelta(milliseconds=1), {"ok": 0}, "getMore", 2, address, 2))
+
+    assert metrics.mongo_command_duration.count(("students", "find")) == 1
+    assert metrics.mongo_command_failures.get(("progress", "getMore")) == 1
+    body = metrics.render()
+    assert 'edubridge_mongo_command_duration_seconds_bucket{collection="students",command="find",le="0.0025"} 0' in body
+    assert 'edubridge_mongo_command_duration_seconds_bucket{collection="students",command="find",le="0.005"} 1' in body
+    assert listener._pending == {}
+
+
+def test_pool_checkout_wait_is_timed(fresh_metrics):
+    listener = metrics.PoolWaitMetrics()
+    address = ("localhost", 27017)
+    listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+    listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 1))
+    # A check-out that was never started on this thread isn't counted.
+    listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 2))
+    assert metrics.mongo_pool_checkout_wait.count(("localhost:27017",)) == 1
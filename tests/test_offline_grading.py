@@ -0,0 +1,185 @@
+import asyncio
+
+import httpx
+import pytest
+
+from answer_keys import compile_quiz
+from auth.jwt_handler import create_access_token
+from catalog import course_catalog
+from offline_grading import grade_batch
+from routers import offline_sync
+
+# v1 documents, shaped like models.py and seed_data.py.
+QUIZ = {
+    "quiz_id": "q0",
+    "course_id": "c0",
+    "title": "Sums",
+    "questions": [
+        {"question": "2+2?", "options": ["3", "4"], "correct_answer": "4", "marks": 2},
+        {"question": "3+3?", "options": ["6", "7"], "correct_answer": "6", "marks": 1},
+    ],
+    "passing_marks": 2,
+    "total_marks": 3
+}
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(offline_sync.router)
+
+
+def user(user_id, role, institution_id):
+    return {
+        "user_id": user_id, "institution_id": institution_id, "email": "%s@school.test" % user_id,
+        "full_name": user_id.title(), "mobile": "9000000000", "role": role, "is_active": True
+    }
+
+
+async def seed(db, students=3):
+    await db.users.insert_one(user("teacher-1", "teacher", "T1"))
+    await db.courses.insert_one({
+        "course_id": "c0", "title": "Sums", "grade_level": "6-10", "subject": "Mathematics",
+        "credits": 300, "duration_minutes": 10, "order": 1, "created_by": "teacher-1"
+    })
+    await db.quizzes.insert_one(dict(QUIZ))
+    for i in range(students):
+        await db.users.insert_one(user("u%d" % i, "student", "T1"))
+        await db.students.insert_one({
+            "student_id": "s%d" % i, "user_id": "u%d" % i, "grade": "8", "grade_year": 2024,
+            "parent_mobile": "9000000001", "institution_name": "Test School", "total_credits": 0, "level": 1
+        })
+    await db.badges.insert_one({"badge_id": "starter", "criteria": {"type": "credits", "threshold": 100}})
+    await course_catalog.ensure_fresh(db)
+
+
+def upload(app, records):
+    headers = {"Authorization": "Bearer %s" % create_access_token({"user_id": "teacher-1"})}
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as http:
+            return await http.post("/api/offline/quiz-submissions", json={"records": records})
+    return run()
+
+
+def test_grade_batch_matches_single_grading():
+    key = compile_quiz(QUIZ)
+    sheets = [{"2+2?": "4", "3+3?": "6"}, {"2+2?": "3"}, {"0": 1, "1": 1}, {}]
+    graded = grade_batch(key, sheets)
+    for row, answers in enumerate(sheets):
+        single = key.grade(answers)
+        assert graded["score"][row] == single["score"]
+        assert graded["correct_answers"][row] == single["correct_answers"]
+        assert graded["marks"][row] == single["marks"]
+        assert graded["passed"][row] == (single["marks"] >= QUIZ["passing_marks"])
+
+
+def test_bulk_upload_awards_each_pass_once(db, app):
+    async def run():
+        await seed(db)
+        records = [
+            {"student_id": "s0", "quiz_id": "q0", "answers": {"2+2?": "3"}, "idempotency_key": "a"},
+            {"student_id": "s0", "quiz_id": "q0", "answers": {"2+2?": "4", "3+3?": "6"}, "idempotency_key": "b"},
+            {"student_id": "s0", "quiz_id": "q0", "answers": {"2+2?": "4", "3+3?": "6"}, "idempotency_key": "c"},
+            {"student_id": "s1", "quiz_id": "q0", "answers": {"2+2?": "4", "3+3?": "6"}},
+            {"student_id": "s2", "quiz_id": "q0", "answers": {"2+2?": "3"}},
+            {"student_id": "ghost", "quiz_id": "q0", "answers": {}},
+            {"student_id": "s1", "quiz_id": "missing", "answers": {}},
+        ]
+        response = await upload(app, records)
+        assert response.status_code == 200
+        body = response.json()
+        statuses = [r["status"] for r in body["results"]]
+        assert statuses == ["graded", "graded", "already_passed", "graded", "graded", "error", "error"]
+
+        s0 = await db.students.find_one({"student_id": "s0"})
+        s2 = await db.students.find_one({"student_id": "s2"})
+        assert s0["total_credits"] == 300
+        assert s2["total_credits"] == 0
+        progress = await db.progress.find_one({"student_id": "s0", "course_id": "c0"})
+        assert progress["quiz_passed"] is True
+        assert progress["quiz_score"] == 3
+        assert progress["quiz_attempts"] == 3
+        assert "last_accessed" in progress and "score" not in progress and "updated_at" not in progress
+        assert progress["submission_keys"] == ["a", "b", "c"]
+        assert await db.student_badges.count_documents({"badge_id": "starter"}) == 2
+
+        # Uploading the same batch again replays keyed records and awards nothing.
+        replay = (await upload(app, records[:3])).json()
+        assert [r["status"] for r in replay["results"]] == ["replayed"] * 3
+        # Each key answers with its own attempt, not the latest one.
+        assert [r["passed"] for r in replay["results"]] == [False, True, True]
+        assert [r["credits_earned"] for r in replay["results"]] == [0, 300, 0]
+        assert (await db.students.find_one({"student_id": "s0"}))["total_credits"] == 300
+    asyncio.run(run())
+
+
+def test_bulk_upload_requires_teacher(db, app):
+    async def run():
+        await seed(db)
+        await db.users.update_one({"user_id": "teacher-1"}, {"$set": {"role": "student"}})
+        response = await upload(app, [])
+        assert response.status_code == 403
+    asyncio.run(run())
+
+
+def test_students_of_other_institutions_are_forbidden(db, app):
+    async def run():
+        await seed(db, students=2)
+        await db.users.update_one({"user_id": "u1"}, {"$set": {"institution_id": "T2"}})
+        records = [
+            {"student_id": "s0", "quiz_id": "q0", "answers": {"2+2?": "4", "3+3?": "6"}},
+            {"student_id": "s1", "quiz_id": "q0", "answers": {"2+2?": "4", "3+3?": "6"}},
+        ]
+        body = (await upload(app, records)).json()
+        assert [r["status"] for r in body["results"]] == ["graded", "forbidden"]
+        assert (await db.students.find_one({"student_id": "s1"}))["total_credits"] == 0
+        assert await db.progress.find_one({"student_id": "s1"}) is None
+    asyncio.run(run())
+
+
+def test_offline_pass_does_not_require_the_video(db, app):
+    # Unlike record_submission, a teacher-attested sheet counts without video progress.
+    async def run():
+        await seed(db, students=2)
+        await db.progress.insert_one({"student_id": "s1", "course_id": "c0", "video_completed": True, "quiz_passed": False})
+        records = [{"student_id": sid, "quiz_id": "q0", "answers": {"2+2?": "4", "3+3?": "6"}} for sid in ("s0", "s1")]
+        body = (await upload(app, records)).json()
+        assert [r["status"] for r in body["results"]] == ["graded", "graded"]
+
+        created = await db.progress.find_one({"student_id": "s0", "course_id": "c0"})
+        assert created["quiz_passed"] is True and created["video_completed"] is False
+        existing = await db.progress.find_one({"student_id": "s1", "course_id": "c0"})
+        assert existing["quiz_passed"] is True and existing["video_completed"] is True
+    asyncio.run(run())
+
+
+def test_out_of_range_answers_grade_as_wrong(db, app):
+    async def run():
+        await seed(db, students=1)
+        records = [{"student_id": "s0", "quiz_id": "q0", "answers": {"2+2?": 10 ** 30, "3+3?": -(2 ** 40)}}]
+        response = await upload(app, records)
+        assert response.status_code == 200
+        assert response.json()["results"][0]["correct_answers"] == 0
+    asyncio.run(run())
+
+
+def test_grades_by_v1_passing_marks(db, app):
+    # Half the questions but two of three marks: a v1 pass, though under the v2 60% rule it would fail.
+    async def run():
+        await seed(db, students=1)
+        body = (await upload(app, [{"student_id": "s0", "quiz_id": "q0", "answers": {"2+2?": "4"}}])).json()
+        assert body["results"][0]["score"] == 2
+        assert body["results"][0]["total"] == 3
+        assert body["results"][0]["passed"] is True
+        assert (await db.students.find_one({"student_id": "s0"}))["total_credits"] == 300
+    asyncio.run(run())
+
+
+def test_mounted_on_the_v1_app():
+    import server
+    import server_old
+
+    paths = lambda app: {route.path for route in app.routes}
+    assert "/api/offline/quiz-submissions" in paths(server_old.create_app())
+    assert "/api/offline/quiz-submissions" not in paths(server.create_app())
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from auth.otp_service import MemoryOTPStore, MongoOTPStore, OTPService
+
+
+def test_memory_store_sweeps_expired_and_caps_size():
+    async def run():
+        store = MemoryOTPStore(max_entries=3)
+        service = OTPService(store, ttl_seconds=0)
+        await service.generate_otp(None, "9000000001")
+        assert store.sweep() == 1
+        assert store.stats()["entries"] == 0
+
+        service.ttl_seconds = 300
+        for i in range(5):
+            await service.generate_otp(None, "900000000%d" % i)
+        stats = store.stats()
+        assert stats["entries"] == 3
+        assert stats["evicted"] == 2
+        # The oldest OTPs were evicted first.
+        assert not await service.verify_otp(None, "9000000000", "000000")
+        assert "9000000004" in store._entries
+    asyncio.run(run())
+
+
+def test_memory_sweeper_runs_in_background():
+    async def run():
+        store = MemoryOTPStore(sweep_interval_seconds=0.01)
+        await OTPService(store, ttl_seconds=0).generate_otp(None, "9000000001")
+        store.start()
+        await asyncio.sleep(0.05)
+        await store.stop()
+        assert store.stats()["entries"] == 0
+        assert store.stats()["expired"] == 1
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("make_store", [MemoryOTPStore, MongoOTPStore])
+def test_attempts_are_limited(db, make_store):
+    async def run():
+        service = OTPService(make_store(), max_attempts=3)
+        otp = await service.generate_otp(db, "9000000001")
+        wrong = "000000" if otp != "000000" else "111111"
+        for _ in range(3):
+            assert not await service.verify_otp(db, "9000000001", wrong)
+        assert not await service.verify_otp(db, "9000000001", otp)
+    asyncio.run(run())
+
+
+def test_mongo_store_is_shared_between_workers(db):
+    async def run():
+        sender, verifier = OTPService(MongoOTPStore()), OTPService(MongoOTPStore())
+        otp = await sender.generate_otp(db, "9000000001")
+        assert await verifier.verify_otp(db, "9000000001", otp)
+        # Single use.
+        assert not await sender.verify_otp(db, "9000000001", otp)
+        assert await db.otp_codes.count_documents({}) == 0
+    asyncio.run(run())
+
+
+def test_mongo_store_rejects_expired_codes(db):
+    async def run():
+        service = OTPService(MongoOTPStore(), ttl_seconds=-1)
+        otp = await service.generate_otp(db, "9000000001")
+        assert not await service.verify_otp(db, "9000000001", otp)
+    asyncio.run(run())
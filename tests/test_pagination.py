@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+import pytest
+
+from auth.jwt_handler import create_access_token
+from catalog import course_catalog
+from pagination import COURSE_ORDER, NEXT_CURSOR_HEADER, after, decode_cursor, encode_cursor, find_page, page_list
+from routers import career, resources, rewards, student_routes
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(*(module.router for module in (student_routes, career, resources, rewards)))
+
+
+async def walk(app, path, token, limit, params=None):
+    """Follow X-Next-Cursor until the last page; returns every item and the page count."""
+    transport = httpx.ASGITransport(app=app)
+    items, pages, cursor = [], 0, None
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        while True:
+            query = {**(params or {}), "limit": limit, **({"cursor": cursor} if cursor else {})}
+            response = await http.get(path, params=query, headers={"Authorization": "Bearer %s" % token})
+            assert response.status_code == 200, response.text
+            assert len(response.json()) <= limit
+            items += response.json()
+            pages += 1
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                return items, pages
+
+
+def test_cursor_round_trip_and_keyset_filter():
+    sort = [("earned_at", -1), ("badge_id", 1)]
+    values = decode_cursor(encode_cursor(["2024-01-01", "b7"]), sort)
+    assert values == ["2024-01-01", "b7"]
+    assert after(sort, values) == {"$or": [
+        {"earned_at": {"$lt": "2024-01-01"}},
+        {"earned_at": None},
+        {"earned_at": "2024-01-01", "badge_id": {"$gt": "b7"}}
+    ]}
+
+
+def test_student_lists_page_past_the_old_cap(db, app):
+    async def run():
+        await db.students.insert_one({"student_id": "s1", "standard": "6", "total_credits": 0, "level": 1})
+        for i in range(130):
+            await db.courses.insert_one({"course_id": "c%03d" % i, "standard": "6", "title": "Course %d" % i})
+            await db.progress.insert_one({"student_id": "s1", "course_id": "c%03d" % i, "quiz_passed": False})
+            await db.badges.insert_one({"badge_id": "b%03d" % i, "name": "Badge %d" % i})
+            await db.student_badges.insert_one({"student_id": "s1", "badge_id": "b%03d" % i, "earned_at": "2024-01-01"})
+        await course_catalog.ensure_fresh(db)
+        token = create_access_token({"student_id": "s1"})
+
+        progress, pages = await walk(app, "/api/progress/my-progress", token, 50)
+        assert [p["course_id"] for p in progress] == ["c%03d" % i for i in range(130)]
+        assert pages == 3
+
+        courses, _ = await walk(app, "/api/courses", token, 40)
+        assert len({c["course_id"] for c in courses}) == 130
+        assert all(c["progress"]["course_id"] == c["course_id"] for c in courses)
+
+        badges, _ = await walk(app, "/api/rewards/my-badges", token, 100)
+        assert [b["badge_id"] for b in badges] == ["b%03d" % i for i in range(130)]
+        assert all(b["earned_at"] == "2024-01-01" for b in badges)
+    asyncio.run(run())
+
+
+def test_catalog_lists_page_with_filters(db, app):
+    async def run():
+        for i in range(7):
+            await db.resources.insert_one({
+                "resource_id": "r%d" % i, "grade_level": "10" if i % 2 else "12", "type": "video",
+                "subject": "Maths", "title": "R%d" % i, "description": "", "url": "", "thumbnail": ""
+            })
+            await db.career_roadmaps.insert_one({
+                "roadmap_id": "m%d" % i, "title": "Roadmap %d" % i, "skills": [], "milestones": [],
+                "job_roles": [], "avg_salary": ""
+            })
+        token = create_access_token({"student_id": "s1"})
+
+        filtered, pages = await walk(app, "/api/resources", token, 2, {"grade_level": "10"})
+        assert [r["resource_id"] for r in filtered] == ["r1", "r3", "r5"]
+        assert pages == 2
+
+        roadmaps, pages = await walk(app, "/api/career/roadmaps", token, 3)
+        assert len(roadmaps) == 7 and pages == 3
+    asyncio.run(run())
+
+
+def test_null_sort_keys_keep_their_place():
+    sort = [("created_at", 1), ("course_id", 1)]
+    assert after(sort, [None, "c1"]) == {"$or": [
+        {"created_at": {"$ne": None}},
+        {"created_at": None, "course_id": {"$gt": "c1"}}
+    ]}
+    # Nothing sorts after a null in descending order except ties broken by the next key.
+    assert after([("earned_at", -1), ("badge_id", 1)], [None, "b1"]) == {"earned_at": None, "badge_id": {"$gt": "b1"}}
+
+
+def test_course_pages_follow_authored_order_with_undated_courses_first():
+    courses = [
+        {"course_id": "z", "created_at": "2024-01-01"},
+        {"course_id": "a", "created_at": "2024-03-01"},
+        {"course_id": "m", "created_at": "2024-02-01"},
+        {"course_id": "y"},
+        {"course_id": "b", "created_at": None},
+    ]
+    seen, cursor = [], None
+    while True:
+        rows, cursor = page_list(courses, COURSE_ORDER, cursor, 2)
+        seen += [c["course_id"] for c in rows]
+        if not cursor:
+            break
+    assert seen == ["b", "y", "z", "m", "a"]
+
+
+def test_find_page_walks_past_null_keys_in_both_directions(db):
+    async def run():
+        for i in range(6):
+            await db.student_badges.insert_one({
+                "student_id": "s1", "badge_id": "b%d" % i, "earned_at": None if i % 3 == 0 else "2024-01-0%d" % i
+            })
+        for sort in ([("earned_at", -1), ("badge_id", 1)], [("earned_at", 1), ("badge_id", 1)]):
+            seen, cursor = [], None
+            while True:
+                rows, cursor = await find_page(db.student_badges, {"student_id": "s1"}, sort, cursor, 2)
+                seen += [r["badge_id"] for r in rows]
+                if not cursor:
+                    break
+            assert sorted(seen) == ["b%d" % i for i in range(6)] and len(seen) == 6
+    asyncio.run(run())
@@ -0,0 +1,129 @@
+import asyncio
+
+import httpx
+import pytest
+
+from auth.jwt_handler import create_access_token
+from catalog import course_catalog
+from routers import parent, parent_routes
+
+MOBILE = "9000000001"
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(parent_routes.router)
+
+
+async def seed(db):
+    children = [("s1", "6"), ("s2", "6"), ("s3", "8")]
+    for student_id, standard in children:
+        await db.students.insert_one({
+            "student_id": student_id,
+            "name": "Child %s" % student_id,
+            "username": student_id,
+            "mobile": MOBILE,
+            "standard": standard,
+            "password_hash": "secret",
+            "total_credits": 100,
+            "level": 1
+        })
+    await db.students.insert_one({"student_id": "other", "mobile": "9999999999", "standard": "6"})
+    for i in range(4):
+        await db.courses.insert_one({"course_id": "six-%d" % i, "standard": "6", "title": "Six %d" % i, "subject": "Maths"})
+    await db.courses.insert_one({"course_id": "eight-0", "standard": "8", "title": "Eight", "subject": "Science"})
+    await db.progress.insert_many([
+        {"student_id": "s1", "course_id": "six-0", "quiz_passed": True, "updated_at": "2024-01-01"},
+        {"student_id": "s1", "course_id": "six-1", "quiz_passed": True, "updated_at": "2024-01-02"},
+        {"student_id": "s1", "course_id": "six-2", "quiz_passed": False, "updated_at": "2024-01-03"},
+        {"student_id": "s3", "course_id": "eight-0", "quiz_passed": True, "updated_at": "2024-01-04"},
+        {"student_id": "other", "course_id": "six-0", "quiz_passed": True, "updated_at": "2024-01-05"},
+    ])
+    for i in range(3):
+        await db.badges.insert_one({"badge_id": "b%d" % i, "name": "Badge %d" % i, "icon": "*"})
+        await db.student_badges.insert_one({"student_id": "s1", "badge_id": "b%d" % i, "earned_at": "2024-01-0%d" % (i + 1)})
+    await course_catalog.ensure_fresh(db)
+    db.commands.clear()
+    return [student_id for student_id, _ in children]
+
+
+def get(app, path, student_ids, token=None):
+    token = token or create_access_token({"role": "parent", "parent_mobile": MOBILE, "student_ids": student_ids})
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get(path, headers={"Authorization": "Bearer %s" % token})
+    return run()
+
+
+def test_children_summary(db, app):
+    async def run():
+        student_ids = await seed(db)
+        response = await get(app, "/api/parent/children", student_ids)
+        assert response.status_code == 200
+        children = {c["student_id"]: c for c in response.json()}
+        assert set(children) == {"s1", "s2", "s3"}
+        assert (children["s1"]["completed_courses"], children["s1"]["total_courses"]) == (2, 4)
+        assert children["s1"]["progress_percentage"] == 50
+        assert (children["s2"]["completed_courses"], children["s2"]["total_courses"]) == (0, 4)
+        assert (children["s3"]["completed_courses"], children["s3"]["total_courses"]) == (1, 1)
+        assert children["s3"]["progress_percentage"] == 100
+        assert "password_hash" not in response.text
+    asyncio.run(run())
+
+
+def test_children_summary_is_one_query(db, app):
+    async def run():
+        student_ids = await seed(db)
+        await get(app, "/api/parent/children", student_ids)
+        assert db.commands == [("revoked_tokens", "find_one"), ("students", "aggregate")]
+    asyncio.run(run())
+
+
+def test_progress_and_activity_join_in_batches(db, app):
+    async def run():
+        student_ids = await seed(db)
+        token = create_access_token({"role": "parent", "parent_mobile": MOBILE, "student_ids": student_ids})
+        response = await get(app, "/api/parent/progress/s1", student_ids, token=token)
+        assert [p["course_info"]["title"] for p in response.json()["progress"]] == ["Six 2", "Six 1", "Six 0"]
+        assert db.commands == [("revoked_tokens", "find_one"), ("students", "find_one"), ("progress", "find"), ("courses", "find")]
+
+        # The token is cached now, so the next request skips the revocation check.
+        db.commands.clear()
+        response = await get(app, "/api/parent/activity/s1", student_ids, token=token)
+        body = response.json()
+        assert len(body["recent_courses"]) == 3
+        assert [b["badge_id"] for b in body["recent_badges"]] == ["b2", "b1", "b0"]
+        assert db.commands == [
+            ("progress", "find"), ("courses", "find"), ("student_badges", "find"), ("badges", "find")
+        ]
+    asyncio.run(run())
+
+
+def test_v1_parent_endpoints_join_in_batches(db, make_app):
+    async def run():
+        student_ids = await seed(db)
+        for student_id in student_ids:
+            await db.students.update_one({"student_id": student_id}, {"$set": {"user_id": "u-" + student_id}})
+            await db.users.insert_one({"user_id": "u-" + student_id, "full_name": student_id, "password_hash": "x"})
+        await db.users.insert_one({"user_id": "parent-1", "role": "parent", "student_ids": student_ids})
+        token = create_access_token({"user_id": "parent-1"})
+        v1 = make_app(parent.router)
+        db.commands.clear()
+
+        response = await get(v1, "/api/parent/children", student_ids, token=token)
+        assert sorted(c["user_info"]["full_name"] for c in response.json()) == student_ids
+        assert db.commands == [("revoked_tokens", "find_one"), ("users", "find_one"), ("students", "find"), ("users", "find")]
+
+        db.commands.clear()
+        await get(v1, "/api/parent/progress/s1", student_ids, token=token)
+        assert db.commands == [("users", "find_one"), ("students", "find_one"), ("progress", "find"), ("courses", "find")]
+
+        db.commands.clear()
+        response = await get(v1, "/api/parent/activity/s1", student_ids, token=token)
+        assert {b["badge_name"] for b in response.json()["recent_badges"]} == {"Badge 0", "Badge 1", "Badge 2"}
+        assert db.commands == [
+            ("users", "find_one"), ("progress", "find"), ("courses", "find"), ("student_badges", "find"), ("badges", "find")
+        ]
+    asyncio.run(run())
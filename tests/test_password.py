@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from auth import password
+from auth.password import HashingPool, hash_password_async, verify_password_async
+from routers import auth, auth_new
+
+
+def test_async_hash_round_trip():
+    async def run():
+        hashed = await hash_password_async("demo123")
+        assert await verify_password_async("demo123", hashed)
+        assert not await verify_password_async("wrong", hashed)
+    asyncio.run(run())
+
+
+def test_saturated_pool_rejects_fast_and_loop_stays_free():
+    release = threading.Event()
+
+    async def run():
+        pool = HashingPool(workers=1, queue_limit=1)
+        blocked = [asyncio.create_task(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert pool.in_flight == 2
+
+        # The loop still runs other work while both slots are taken...
+        ticks = 0
+        for _ in range(10):
+            await asyncio.sleep(0)
+            ticks += 1
+        assert ticks == 10
+
+        # ...and a third caller is turned away immediately.
+        with pytest.raises(HTTPException) as rejected:
+            await pool.run(release.wait, 5)
+        assert rejected.value.status_code == 503
+        assert pool.stats()["rejected"] == 1
+
+        release.set()
+        assert await asyncio.gather(*blocked) == [True, True]
+        assert pool.in_flight == 0
+    asyncio.run(run())
+
+
+def test_hash_rounds_and_needs_rehash(monkeypatch):
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 5)
+    assert password.hash_rounds(password.hash_password("x")) == 5
+    assert password.hash_rounds("not-a-hash") is None
+    assert not password.needs_rehash(password.hash_password("x"))
+    assert password.needs_rehash(password.hash_password("x", rounds=4))
+
+
+def test_login_rehashes_to_configured_cost(db, make_app, monkeypatch):
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 5)
+    app = make_app(auth_new.router)
+
+    async def run():
+        await db.students.insert_one({
+            "student_id": "s1", "username": "asha", "name": "Asha", "mobile": "9000000001",
+            "standard": "10", "password_hash": password.hash_password("demo123", rounds=4),
+            "total_credits": 0, "level": 1
+        })
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            response = await http.post("/api/auth/login", json={"username": "asha", "password": "demo123"})
+            assert response.status_code == 200
+
+            stored = (await db.students.find_one({"student_id": "s1"}))["password_hash"]
+            assert password.hash_rounds(stored) == 5
+            assert password.verify_password("demo123", stored)
+
+            # Already at the configured cost: the next login leaves the hash alone.
+            response = await http.post("/api/auth/login", json={"username": "asha", "password": "demo123"})
+            assert response.status_code == 200
+            assert (await db.students.find_one({"student_id": "s1"}))["password_hash"] == stored
+    asyncio.run(run())
+
+
+def test_v1_rehash_never_overwrites_a_concurrent_password_change(db, make_app, monkeypatch):
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 5)
+    app = make_app(auth.router)
+    changed = password.hash_password("changed-meanwhile", rounds=5)
+
+    async def change_then_rehash(plain, stored):
+        # The password is changed between verification and the rehash write.
+        await db.users.update_one({"user_id": "u1"}, {"$set": {"password_hash": changed}})
+        return await password.rehash_if_needed(plain, stored)
+    monkeypatch.setattr(auth, "rehash_if_needed", change_then_rehash)
+
+    async def run():
+        await db.users.insert_one({
+            "user_id": "u1", "institution_id": "INST", "role": "teacher",
+            "password_hash": password.hash_password("demo123", rounds=4)
+        })
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            response = await http.post("/api/auth/login", json={"institution_id": "INST", "password": "demo123"})
+        assert response.status_code == 200
+        user = await db.users.find_one({"user_id": "u1"})
+        assert user["password_hash"] == changed
+        assert user["last_login"]
+    asyncio.run(run())
+
+
+def test_calibrate_stays_within_bounds():
+    result = password.calibrate(target_ms=0.0, min_rounds=4, max_rounds=5, samples=1)
+    assert result["rounds"] == 4
+    assert set(result["timings_ms"]) <= {4, 5}
@@ -0,0 +1,53 @@
+import asyncio
+
+from auth import principal_cache as principal_cache_module
+from auth.principal_cache import PrincipalCache, principal_cache
+from quiz_submission import _award_credits
+
+
+def test_entries_expire_after_the_ttl(monkeypatch, clock):
+    monkeypatch.setattr(principal_cache_module.time, "monotonic", clock)
+    cache = PrincipalCache(ttl_seconds=30)
+    cache.set("s1", {"student_id": "s1"})
+
+    clock.now += 29
+    assert cache.get("s1") == {"student_id": "s1"}
+    clock.now += 1
+    assert cache.get("s1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PrincipalCache(max_entries=2)
+    cache.set("s1", {"student_id": "s1"})
+    cache.set("s2", {"student_id": "s2"})
+    cache.get("s1")
+    cache.set("s3", {"student_id": "s3"})
+
+    assert cache.get("s2") is None
+    assert cache.get("s1") is not None and cache.get("s3") is not None
+    assert cache.evictions == 1
+
+
+def test_callers_cannot_mutate_the_cached_copy():
+    cache = PrincipalCache()
+    student = {"student_id": "s1", "interests": ["maths"]}
+    cache.set("s1", student)
+    student["interests"].append("set after caching")
+
+    first = cache.get("s1")
+    first["interests"].append("changed by a handler")
+    first["name"] = "changed"
+    assert cache.get("s1") == {"student_id": "s1", "interests": ["maths"]}
+
+
+def test_awarding_credits_invalidates_the_principal(db):
+    async def run():
+        await db.students.insert_one({"student_id": "s1", "total_credits": 0, "level": 1})
+        principal_cache.set("s1", {"student_id": "s1", "total_credits": 0, "level": 1})
+        before = principal_cache.invalidations
+
+        await _award_credits(db, "s1", 100)
+        assert principal_cache.get("s1") is None
+        assert principal_cache.invalidations == before + 1
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+import asyncio
+import csv
+import io
+import json
+
+import httpx
+import pytest
+
+import progress_export
+from auth.jwt_handler import create_access_token
+from routers import teacher
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(teacher.router)
+
+
+async def seed(db, students=5, courses=3):
+    await db.users.insert_one({"user_id": "teacher-1", "role": "teacher", "institution_id": "INST"})
+    for c in range(courses):
+        await db.courses.insert_one({"course_id": "c%d" % c, "title": "Course %d" % c, "subject": "Maths"})
+    for i in range(students):
+        await db.users.insert_one({"user_id": "u%d" % i, "role": "student", "institution_id": "INST", "full_name": "Student %d" % i})
+        await db.students.insert_one({"student_id": "s%d" % i, "user_id": "u%d" % i, "grade": "10", "stream": None})
+        for c in range(courses):
+            await db.progress.insert_one({
+                "student_id": "s%d" % i, "course_id": "c%d" % c, "video_completed": True,
+                "quiz_passed": c == 0, "quiz_score": 80, "last_accessed": "2024-01-01T00:00:00"
+            })
+    await db.users.insert_one({"user_id": "ux", "role": "student", "institution_id": "OTHER", "full_name": "Elsewhere"})
+    await db.students.insert_one({"student_id": "sx", "user_id": "ux"})
+    await db.progress.insert_one({"student_id": "sx", "course_id": "c0"})
+
+
+def export(app, fmt, batch_size=2):
+    token = create_access_token({"user_id": "teacher-1"})
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get(
+                "/api/teacher/export/progress",
+                params={"format": fmt, "batch_size": batch_size},
+                headers={"Authorization": "Bearer %s" % token}
+            )
+    return run()
+
+
+def test_ndjson_export_joins_students_and_courses(db, app):
+    async def run():
+        await seed(db)
+        response = await export(app, "ndjson")
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 15
+        assert {r["student_id"] for r in rows} == {"s0", "s1", "s2", "s3", "s4"}
+        row = next(r for r in rows if r["student_id"] == "s1" and r["course_id"] == "c0")
+        assert row["student_name"] == "Student 1"
+        assert row["course_title"] == "Course 0"
+        assert row["score"] == 80 and row["quiz_passed"] is True
+        assert row["updated_at"] == "2024-01-01T00:00:00"
+    asyncio.run(run())
+
+
+def test_csv_export_streams_in_batches(db, app):
+    async def run():
+        await seed(db)
+        response = await export(app, "csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 15
+        assert rows[0].keys() == set(progress_export.COLUMNS)
+
+        chunks = [chunk async for chunk in progress_export.csv_chunks(db, "INST", batch_size=2)]
+        assert chunks[0].startswith("student_id,student_name")
+        assert all(chunk.count("\n") <= 2 for chunk in chunks[1:])
+        assert sum(chunk.count("\n") for chunk in chunks) == 16
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import pytest
+
+from auth.jwt_handler import create_access_token
+from catalog import course_catalog
+from routers import progress
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(progress.router)
+
+
+async def seed(db, quiz=None):
+    await db.users.insert_one({"user_id": "u1", "role": "student"})
+    await db.students.insert_one({"student_id": "s1", "user_id": "u1", "total_credits": 0, "level": 1})
+    await db.courses.insert_one({"course_id": "c1", "title": "Algebra", "credits": 50, "duration_minutes": 10})
+    await db.quizzes.insert_one({
+        "quiz_id": "q1",
+        "course_id": "c1",
+        "questions": [{"question": "2+2?", "options": ["3", "4"], "correct_answer": "4", "marks": 10}],
+        "total_marks": 10,
+        "passing_marks": 10,
+        **(quiz or {})
+    })
+    await course_catalog.ensure_fresh(db)
+
+
+def submit(app, answer="4"):
+    headers = {"Authorization": "Bearer %s" % create_access_token({"user_id": "u1"})}
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as http:
+            return await http.post("/api/progress/submit-quiz", json={"quiz_id": "q1", "answers": {"2+2?": answer}})
+    return run()
+
+
+def test_submission_without_progress_is_not_found(db, app):
+    async def run():
+        await seed(db)
+        response = await submit(app)
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Progress not found"
+    asyncio.run(run())
+
+
+def test_submission_before_the_video_is_rejected(db, app):
+    async def run():
+        await seed(db)
+        await db.progress.insert_one({"student_id": "s1", "course_id": "c1", "video_completed": False})
+        response = await submit(app)
+        assert response.status_code == 400
+    asyncio.run(run())
+
+
+def test_quiz_without_passing_marks_does_not_pass_everything(db, app):
+    async def run():
+        await seed(db)
+        await db.quizzes.update_one({"quiz_id": "q1"}, {"$unset": {"passing_marks": ""}})
+        course_catalog.invalidate()
+        await db.progress.insert_one({"student_id": "s1", "course_id": "c1", "video_completed": True, "quiz_passed": False})
+
+        failed = (await submit(app, answer="3")).json()
+        assert failed["passed"] is False and failed["credits_earned"] == 0
+        assert (await db.students.find_one({"student_id": "s1"}))["total_credits"] == 0
+
+        passed = (await submit(app)).json()
+        assert passed["passed"] is True and passed["credits_earned"] == 50
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, Depends
+
+from auth.jwt_handler import create_access_token
+from database import get_db
+from query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, budget, shape, trace
+from routers import parent_new, parent_routes
+
+MOBILE = "9000000001"
+
+two_queries_router = APIRouter(prefix="/budget")
+
+
+@two_queries_router.get("/two-queries")
+@budget(1)
+async def two_queries(db=Depends(get_db)):
+    await db.students.find_one({"student_id": "s1"})
+    await db.courses.find_one({"course_id": "c1"})
+    return {}
+
+
+def with_budget(app, mode="raise"):
+    app.add_middleware(QueryBudgetMiddleware, mode=mode)
+    return app
+
+
+def get(app, path):
+    token = create_access_token({"role": "parent", "parent_mobile": MOBILE, "student_ids": ["s1"]})
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get(path, headers={"Authorization": "Bearer %s" % token})
+    return run()
+
+
+async def seed(db):
+    await db.students.insert_one({"student_id": "s1", "name": "Asha", "mobile": MOBILE, "standard": "6"})
+    for i in range(3):
+        await db.courses.insert_one({"course_id": "c%d" % i, "standard": "6", "title": "Course %d" % i})
+        await db.progress.insert_one({"student_id": "s1", "course_id": "c%d" % i, "quiz_passed": i > 0, "updated_at": "2024-01-0%d" % (i + 1)})
+        await db.badges.insert_one({"badge_id": "b%d" % i, "name": "Badge %d" % i})
+        await db.student_badges.insert_one({"student_id": "s1", "badge_id": "b%d" % i, "earned_at": "2024-01-0%d" % (i + 1)})
+
+
+def test_shape_ignores_values():
+    assert shape({"course_id": "c1"}) == shape({"course_id": "c2"}) == "{course_id: ?}"
+    assert shape({"student_id": {"$in": ["a", "b"]}}) == shape({"student_id": {"$in": ["c"]}}) == "{student_id: {$in: [?]}}"
+    assert shape([{"$match": {"mobile": "1"}}, {"$limit": 10}]) == "[{$limit: ?}, {$match: {mobile: ?}}]"
+
+
+def test_batched_parent_routes_stay_within_budget(db, make_app):
+    async def run():
+        await seed(db)
+        app = with_budget(make_app(parent_routes.router, database=trace(db)))
+        for path in ("/api/parent/children", "/api/parent/progress/s1", "/api/parent/activity/s1"):
+            assert (await get(app, path)).status_code == 200
+    asyncio.run(run())
+
+
+def test_find_one_loop_is_flagged(db, make_app):
+    async def run():
+        await seed(db)
+        app = with_budget(make_app(parent_new.router, database=trace(db)))
+        with pytest.raises(QueryBudgetExceeded, match=r"courses\.find_one\(\{course_id: \?\}\) ran 3 times"):
+            await get(app, "/api/parent/child-progress/s1")
+    asyncio.run(run())
+
+
+def test_over_budget_is_logged_in_log_mode(db, make_app, caplog):
+    async def run():
+        app = with_budget(make_app(two_queries_router, database=trace(db)), mode="log")
+        with caplog.at_level("WARNING", logger="query_budget"):
+            assert (await get(app, "/api/budget/two-queries")).status_code == 200
+        assert "2 Mongo commands, budget is 1" in caplog.text
+    asyncio.run(run())
+
+
+def test_commands_outside_a_request_are_not_recorded(db):
+    async def run():
+        await trace(db).students.find_one({"student_id": "s1"})
+        assert db.commands == [("students", "find_one")]
+    asyncio.run(run())
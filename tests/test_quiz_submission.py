@@ -0,0 +1,151 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from auth.jwt_handler import create_access_token
+from catalog import bump_version, course_catalog
+from routers import courses_new, student_routes
+
+STUDENT_ID = "student-1"
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(student_routes.router)
+
+
+async def seed(db, courses=1, credits=100, badges=()):
+    await db.students.insert_one({
+        "student_id": STUDENT_ID,
+        "name": "Asha",
+        "username": "asha",
+        "mobile": "9000000001",
+        "standard": "6",
+        "total_credits": 0,
+        "level": 1
+    })
+    for i in range(courses):
+        await db.courses.insert_one({"course_id": "c%d" % i, "standard": "6", "title": "Course %d" % i, "credits": credits, "duration_minutes": 10})
+        await db.quizzes.insert_one({
+            "quiz_id": "q%d" % i,
+            "course_id": "c%d" % i,
+            "questions": [{"question": "2+2?", "options": ["3", "4"], "correct_answer": "4"}],
+            "passing_score": 60
+        })
+        await db.progress.insert_one({"student_id": STUDENT_ID, "course_id": "c%d" % i, "video_completed": True, "quiz_passed": False})
+    for badge in badges:
+        await db.badges.insert_one(badge)
+    await course_catalog.ensure_fresh(db)
+
+
+def client(app):
+    headers = {"Authorization": "Bearer %s" % create_access_token({"student_id": STUDENT_ID})}
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers)
+
+
+def submit(http, quiz_id, answer="4", key=None):
+    headers = {"Idempotency-Key": key} if key else {}
+    return http.post("/api/progress/submit-quiz", json={"quiz_id": quiz_id, "answers": {"2+2?": answer}}, headers=headers)
+
+
+def test_concurrent_submissions_award_credits_once(db, app):
+    async def run():
+        await seed(db, badges=[{"badge_id": "first", "criteria": {"type": "credits", "threshold": 50}}])
+        async with client(app) as http:
+            responses = await asyncio.gather(*[submit(http, "q0", key="k%d" % i) for i in range(50)])
+        assert all(r.status_code == 200 for r in responses)
+        assert sum(r.json()["credits_earned"] for r in responses) == 100
+
+        student = await db.students.find_one({"student_id": STUDENT_ID})
+        assert student["total_credits"] == 100
+        assert await db.student_badges.count_documents({"student_id": STUDENT_ID}) == 1
+    asyncio.run(run())
+
+
+def test_concurrent_submissions_across_courses_conserve_credits(db, app):
+    async def run():
+        await seed(db, courses=12, credits=100)
+        attempts = ["q%d" % (i % 12) for i in range(60)]
+        random.Random(7).shuffle(attempts)
+        async with client(app) as http:
+            responses = await asyncio.gather(*[submit(http, quiz_id) for quiz_id in attempts])
+        assert all(r.status_code == 200 for r in responses)
+
+        student = await db.students.find_one({"student_id": STUDENT_ID})
+        assert student["total_credits"] == 1200
+        assert sum(r.json()["credits_earned"] for r in responses) == 1200
+        assert student["level"] == 3
+    asyncio.run(run())
+
+
+def test_retry_with_same_idempotency_key_replays_result(db, app):
+    async def run():
+        await seed(db)
+        async with client(app) as http:
+            first = await submit(http, "q0", key="retry-me")
+            second = await submit(http, "q0", key="retry-me")
+        assert first.json()["credits_earned"] == 100
+        assert second.json()["credits_earned"] == 100
+        assert second.json()["score"] == first.json()["score"]
+
+        student = await db.students.find_one({"student_id": STUDENT_ID})
+        assert student["total_credits"] == 100
+    asyncio.run(run())
+
+
+def test_replay_returns_the_result_stored_for_that_key(db, app):
+    async def run():
+        await seed(db)
+        async with client(app) as http:
+            failed = await submit(http, "q0", answer="3", key="attempt-1")
+            await submit(http, "q0", key="attempt-2")
+            replayed = await submit(http, "q0", answer="3", key="attempt-1")
+        assert failed.json()["passed"] is False
+        assert replayed.json() == failed.json()
+    asyncio.run(run())
+
+
+def test_failed_retake_keeps_pass_and_credits(db, app):
+    async def run():
+        await seed(db)
+        async with client(app) as http:
+            await submit(http, "q0")
+            retake = await submit(http, "q0", answer="3")
+        assert retake.json()["passed"] is False
+        assert retake.json()["credits_earned"] == 0
+
+        progress = await db.progress.find_one({"student_id": STUDENT_ID, "course_id": "c0"})
+        assert progress["quiz_passed"] is True
+        assert progress["score"] == 100
+        student = await db.students.find_one({"student_id": STUDENT_ID})
+        assert student["total_credits"] == 100
+    asyncio.run(run())
+
+
+def test_submission_requires_completed_video(db, app):
+    async def run():
+        await seed(db)
+        await db.progress.update_one({"course_id": "c0"}, {"$set": {"video_completed": False}})
+        async with client(app) as http:
+            response = await submit(http, "q0")
+        assert response.status_code == 400
+    asyncio.run(run())
+
+
+def test_v2_courses_route_awards_badges_and_rejects_orphan_quizzes(db, make_app):
+    app = make_app(courses_new.router)
+
+    async def run():
+        await seed(db, badges=[{"badge_id": "first", "criteria": {"type": "credits", "threshold": 50}}])
+        await db.quizzes.insert_one({"quiz_id": "orphan", "course_id": "gone", "questions": [], "passing_score": 60})
+        await bump_version(db)
+        async with client(app) as http:
+            passed = await http.post("/api/courses/submit-quiz", json={"quiz_id": "q0", "answers": {"2+2?": "4"}})
+            orphan = await http.post("/api/courses/submit-quiz", json={"quiz_id": "orphan", "answers": {}})
+        assert passed.status_code == 200 and passed.json()["new_credits"] == 100
+        assert await db.student_badges.count_documents({"student_id": STUDENT_ID, "badge_id": "first"}) == 1
+        assert orphan.status_code == 404
+    asyncio.run(run())
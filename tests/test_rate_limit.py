@@ -0,0 +1,156 @@
+import asyncio
+
+import httpx
+
+from auth.password import hash_password
+from rate_limit import (MAX_BODY_BYTES, MemoryRateLimitStore, MongoRateLimitStore, RateLimiter,
+                        RateLimitMiddleware, load_limits)
+from routers import auth_new
+
+
+def limited(app, limiter):
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return app
+
+
+def post(app, path, body, ip="10.0.0.1"):
+    transport = httpx.ASGITransport(app=app, client=(ip, 1234))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post(path, json=body)
+    return run()
+
+
+def test_sliding_window_weights_previous_window():
+    async def run():
+        store = MemoryRateLimitStore()
+        assert [await store.hit("k", 60, 1000 + i) for i in range(3)] == [1, 2, 3]
+        # Halfway into the next window the previous three count for half.
+        assert await store.hit("k", 60, 1050) == 1 + 3 * (1 - 1050 % 60 / 60)
+        # Two windows later nothing carries over.
+        assert await store.hit("k", 60, 1200) == 1
+    asyncio.run(run())
+
+
+def test_rejects_before_touching_the_database(db, make_app, clock):
+    limiter = RateLimiter(load_limits('{"/api/auth/login": {"ip": "100/60", "username": "2/60"}}'), clock=clock)
+    app = limited(make_app(auth_new.router), limiter)
+
+    async def run():
+        await db.students.insert_one({
+            "student_id": "s1", "username": "asha", "name": "Asha", "mobile": "9000000001",
+            "standard": "10", "password_hash": hash_password("demo123", rounds=4), "total_credits": 0, "level": 1
+        })
+        assert (await post(app, "/api/auth/login", {"username": "asha", "password": "demo123"})).status_code == 200
+        assert (await post(app, "/api/auth/login", {"username": "asha", "password": "x"}, ip="10.0.0.2")).status_code == 401
+
+        # The username limit follows the account across addresses.
+        db.commands.clear()
+        response = await post(app, "/api/auth/login", {"username": "Asha", "password": "demo123"}, ip="10.0.0.3")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert db.commands == []
+
+        # Other accounts are unaffected.
+        assert (await post(app, "/api/auth/login", {"username": "ravi", "password": "x"})).status_code == 401
+    asyncio.run(run())
+
+
+def test_ip_limit_and_window_rollover(db, make_app, clock):
+    limiter = RateLimiter(load_limits('{"/api/auth/parent/send-otp": {"ip": "2/60"}}'), clock=clock)
+    app = limited(make_app(auth_new.router), limiter)
+
+    async def run():
+        statuses = [(await post(app, "/api/auth/parent/send-otp", {"mobile": "90000000%02d" % i})).status_code
+                    for i in range(3)]
+        assert statuses == [404, 404, 429]
+        assert (await post(app, "/api/auth/parent/send-otp", {"mobile": "9000000009"}, ip="10.0.0.9")).status_code == 404
+        clock.now += 180
+        assert (await post(app, "/api/auth/parent/send-otp", {"mobile": "9000000001"})).status_code == 404
+        assert limiter.stats()["rejected"] == 1
+    asyncio.run(run())
+
+
+def test_unlimited_routes_and_disabled_limiter_pass_through(db, make_app):
+    limiter = RateLimiter(load_limits('{"/api/auth/register": null, "/api/auth/login": {"ip": "1/60"}}'))
+    app = limited(make_app(auth_new.router), limiter)
+
+    async def run():
+        assert "/api/auth/register" not in limiter.limits
+        await post(app, "/api/auth/login", {"username": "a", "password": "x"})
+        assert (await post(app, "/api/auth/login", {"username": "a", "password": "x"})).status_code == 429
+        limiter.enabled = False
+        assert (await post(app, "/api/auth/login", {"username": "a", "password": "x"})).status_code == 401
+    asyncio.run(run())
+
+
+def test_mongo_store_is_shared_between_limiters(db, make_app, clock):
+    limits = load_limits('{"/api/auth/parent/verify-otp": {"mobile": "2/600"}}')
+    workers = [limited(make_app(auth_new.router), RateLimiter(limits, store=MongoRateLimitStore(db), clock=clock)) for _ in range(2)]
+
+    async def run():
+        body = {"mobile": "9000000001", "otp": "123456"}
+        statuses = [(await post(workers[i % 2], "/api/auth/parent/verify-otp", body)).status_code for i in range(3)]
+        assert statuses == [401, 401, 429]
+        assert await db.rate_limits.count_documents({}) == 1
+    asyncio.run(run())
+
+
+def test_rejected_attempts_do_not_extend_an_account_lockout(db, make_app, clock):
+    limiter = RateLimiter(load_limits('{"/api/auth/login": {"ip": "100/60", "username": "2/60"}}'), clock=clock)
+    app = limited(make_app(auth_new.router), limiter)
+
+    async def run():
+        attacker = {"username": "asha", "password": "guess"}
+        statuses = [(await post(app, "/api/auth/login", attacker, ip="10.6.6.%d" % i)).status_code for i in range(20)]
+        assert statuses[:2] == [401, 401] and set(statuses[2:]) == {429}
+
+        # One window on, only the two attempts that got through still weigh on the account.
+        clock.now += 60
+        assert (await post(app, "/api/auth/login", {"username": "asha", "password": "x"})).status_code == 401
+    asyncio.run(run())
+
+
+def test_oversized_body_is_refused_before_the_app():
+    chunk = b"x" * (MAX_BODY_BYTES // 2)
+    total = 10
+    consumed = []
+    sent = []
+
+    async def receive():
+        consumed.append(1)
+        return {"type": "http.request", "body": chunk, "more_body": len(consumed) < total}
+
+    async def app(scope, receive, send):
+        raise AssertionError("the app must not see an oversized body")
+
+    async def send(message):
+        sent.append(message)
+
+    limiter = RateLimiter(load_limits('{"/api/auth/login": {"ip": "100/60"}}'))
+    scope = {"type": "http", "method": "POST", "path": "/api/auth/login", "headers": [], "client": ("10.0.0.1", 1)}
+    asyncio.run(RateLimitMiddleware(app, limiter=limiter)(scope, receive, send))
+    assert len(consumed) == 3
+    assert sent[0]["status"] == 413
+
+
+def test_padded_body_cannot_skip_the_account_limit(db, make_app, clock):
+    limiter = RateLimiter(load_limits('{"/api/auth/login": {"ip": "100/60", "username": "2/60"}}'), clock=clock)
+    app = limited(make_app(auth_new.router), limiter)
+
+    async def run():
+        await db.students.insert_one({
+            "student_id": "s1", "username": "asha", "name": "Asha", "mobile": "9000000001",
+            "standard": "10", "password_hash": hash_password("demo123", rounds=4), "total_credits": 0, "level": 1
+        })
+        padded = {"username": "asha", "password": "guess", "pad": "x" * (20 * 1024)}
+        statuses = [(await post(app, "/api/auth/login", padded)).status_code for _ in range(6)]
+        assert set(statuses) == {413}
+
+        for _ in range(2):
+            assert (await post(app, "/api/auth/login", {"username": "asha", "password": "guess"})).status_code == 401
+        correct = {"username": "asha", "password": "demo123", "pad": "x" * (20 * 1024)}
+        assert (await post(app, "/api/auth/login", correct)).status_code == 413
+        assert (await post(app, "/api/auth/login", {"username": "asha", "password": "demo123"})).status_code == 429
+    asyncio.run(run())
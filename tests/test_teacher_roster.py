@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+import pytest
+
+from auth.jwt_handler import create_access_token
+from routers import teacher
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(teacher.router)
+
+
+async def seed(db, students=7):
+    await db.users.insert_one({"user_id": "teacher-1", "role": "teacher", "institution_id": "INST"})
+    for i in range(students):
+        user_id = "u%02d" % i
+        await db.users.insert_one({
+            "user_id": user_id, "role": "student", "institution_id": "INST",
+            "full_name": "Student %d" % (i % 3), "password_hash": "secret"
+        })
+        await db.students.insert_one({
+            "student_id": "s%02d" % i, "user_id": user_id,
+            "grade": "BTech" if i % 2 else "12", "stream": "CSE" if i < 4 else "ECE",
+            "total_credits": i * 100, "level": 1
+        })
+    await db.users.insert_one({"user_id": "elsewhere", "role": "student", "institution_id": "OTHER", "full_name": "X"})
+    await db.students.insert_one({"student_id": "sx", "user_id": "elsewhere", "total_credits": 900})
+    db.commands.clear()
+
+
+TOKEN = create_access_token({"user_id": "teacher-1"})
+
+
+def get(app, params=None, token=TOKEN):
+    transport = httpx.ASGITransport(app=app)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get("/api/teacher/students", params=params or {}, headers={"Authorization": "Bearer %s" % token})
+    return run()
+
+
+def test_keyset_pages_cover_the_roster_once(db, app):
+    async def run():
+        await seed(db)
+        seen, cursor = [], None
+        while True:
+            body = (await get(app, {"limit": 3, "sort": "credits", **({"cursor": cursor} if cursor else {})})).json()
+            seen += [s["total_credits"] for s in body["students"]]
+            assert body["stats"]["total_students"] == 7
+            assert body["stats"]["active_students"] == 6
+            assert body["stats"]["avg_completion"] == 6
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        assert seen == [600, 500, 400, 300, 200, 100, 0]
+        assert "password_hash" not in str(body)
+
+        names = []
+        body = (await get(app, {"limit": 4})).json()
+        names += [(s["full_name"], s["user_id"]) for s in body["students"]]
+        body = (await get(app, {"limit": 4, "cursor": body["next_cursor"]})).json()
+        names += [(s["full_name"], s["user_id"]) for s in body["students"]]
+        assert names == sorted(names) and len(set(names)) == 7
+    asyncio.run(run())
+
+
+def test_filters_and_cached_stats(db, app):
+    async def run():
+        await seed(db)
+        await db.courses.insert_many([{"course_id": "c1", "standard": "6"}, {"course_id": "c2", "standard": "7"}])
+        db.commands.clear()
+        body = (await get(app, {"grade": "BTech", "stream": "CSE"})).json()
+        assert sorted(s["user_id"] for s in body["students"]) == ["u01", "u03"]
+        assert body["stats"]["total_students"] == 7
+        assert body["stats"]["total_courses"] == 2
+        assert body["next_cursor"] is None
+        # A token this worker hasn't seen is checked against revoked_tokens once.
+        assert db.commands == [
+            ("revoked_tokens", "find_one"), ("users", "find_one"), ("users", "aggregate"), ("users", "aggregate"),
+            ("catalog_meta", "find_one"), ("courses", "find"), ("quizzes", "find"),
+        ]
+
+        # The next page reuses the institution's stats and the in-memory catalog.
+        db.commands.clear()
+        await get(app, {"limit": 2})
+        assert db.commands == [("users", "find_one"), ("users", "aggregate")]
+
+        assert (await get(app, {"cursor": "not-a-cursor"})).status_code == 400
+    asyncio.run(run())
+
+
+def test_name_order_is_backed_by_an_index():
+    from indexes import INDEXES
+    keys = [list(model.document["key"]) for model in INDEXES["users"]]
+    assert ["role", "institution_id"] + [field for field, _ in teacher.ROSTER_SORTS["name"]] in keys
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from datetime import timedelta, timezone
+
+import httpx
+
+from auth import jwt_handler
+from auth.jwt_handler import create_access_token, revoke_token, verify_token
+from auth.token_cache import TokenCache, token_cache
+from routers import auth_new
+
+
+def count_decodes(monkeypatch):
+    calls = []
+    decode = jwt_handler.jwt.decode
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return decode(*args, **kwargs)
+    monkeypatch.setattr(jwt_handler.jwt, "decode", counting)
+    return calls
+
+
+def test_verified_tokens_skip_the_decode(db, monkeypatch):
+    decodes = count_decodes(monkeypatch)
+
+    async def run():
+        token = create_access_token({"student_id": "s1"})
+        first = await verify_token(token, db)
+        first["student_id"] = "tampered"
+        assert (await verify_token(token, db))["student_id"] == "s1"
+        assert len(decodes) == 1
+        assert token_cache.stats()["hits"] >= 1
+        # Only the first verification looked for a revocation.
+        assert db.commands == [("revoked_tokens", "find_one")]
+
+        assert await verify_token(token + "x", db) is None
+        assert await verify_token(token + "x", db) is None
+        assert len(decodes) == 3
+    asyncio.run(run())
+
+
+def test_entries_end_at_token_exp(db, monkeypatch):
+    token = create_access_token({"student_id": "s1"}, expires_delta=timedelta(seconds=60))
+    expires_at = asyncio.run(verify_token(token, db))["exp"]
+    monkeypatch.setattr(time, "time", lambda: expires_at + 1)
+    assert token_cache.get(token_cache.digest(token)) is None
+
+
+def test_revoked_tokens_are_refused(db):
+    async def run():
+        token = create_access_token({"student_id": "s1"})
+        uncached = create_access_token({"student_id": "s2"})
+        assert await verify_token(token, db)
+        await revoke_token(token, db)
+        await revoke_token(uncached, db)
+        assert await verify_token(token, db) is None
+        assert await verify_token(uncached, db) is None
+        assert await verify_token(create_access_token({"student_id": "s3"}), db)
+
+        # The record expires with the token, through the revoked_tokens TTL index.
+        record = await db.revoked_tokens.find_one({"_id": token_cache.digest(token).hex()})
+        exp = jwt_handler.jwt.get_unverified_claims(token)["exp"]
+        assert record["expires_at"].replace(tzinfo=timezone.utc).timestamp() == exp
+    asyncio.run(run())
+
+
+def test_revocations_reach_other_workers_and_survive_restarts(db, monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    async def run():
+        token = create_access_token({"student_id": "s1"})
+        assert await verify_token(token, db)
+
+        # Another worker revokes it: nothing changes in this worker's memory.
+        other = TokenCache()
+        monkeypatch.setattr(jwt_handler, "token_cache", other)
+        await revoke_token(token, db)
+        monkeypatch.setattr(jwt_handler, "token_cache", token_cache)
+
+        # The cached entry is served until its revocation check is due.
+        assert await verify_token(token, db)
+        now[0] += token_cache.revocation_check_seconds
+        assert await verify_token(token, db) is None
+
+        # A restarted worker starts with an empty cache and still refuses it.
+        token_cache.clear()
+        assert await verify_token(token, db) is None
+    asyncio.run(run())
+
+
+def test_lru_is_bounded():
+    cache = TokenCache(max_entries=2)
+    exp = time.time() + 60
+    for i in range(3):
+        cache.set(cache.digest("t%d" % i), {"exp": exp, "i": i})
+    assert cache.get(cache.digest("t0")) is None
+    assert cache.get(cache.digest("t2"))["i"] == 2
+    assert cache.stats()["evictions"] == 1
+    # Without exp there is nothing to bound the entry by, so it isn't cached.
+    cache.set(cache.digest("forever"), {"i": 9})
+    assert cache.get(cache.digest("forever")) is None
+
+
+def test_revocations_are_pruned_in_expiry_order(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = TokenCache()
+    # A long-lived revocation first must not shield the short-lived ones behind it.
+    cache.revoke("long", expires_at=5000)
+    for i in range(5):
+        cache.revoke("short%d" % i, expires_at=1010)
+    assert cache.stats()["revoked"] == 6
+
+    now[0] = 1011
+    cache.revoke("fresh", expires_at=2000)
+    assert cache.stats()["revoked"] == 2
+    assert cache.is_revoked(cache.digest("long")) and cache.is_revoked(cache.digest("fresh"))
+
+
+def test_logout_revokes_the_token(db, make_app):
+    app = make_app(auth_new.router)
+    headers = {"Authorization": "Bearer %s" % create_access_token({"student_id": "s1"})}
+
+    async def run():
+        await db.students.insert_one({"student_id": "s1", "username": "asha", "standard": "6"})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as http:
+            assert (await http.get("/api/auth/me")).status_code == 200
+            assert (await http.post("/api/auth/logout")).status_code == 200
+            assert (await http.get("/api/auth/me")).status_code == 401
+            assert (await http.post("/api/auth/logout")).status_code == 401
+    asyncio.run(run())